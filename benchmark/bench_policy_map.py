@@ -0,0 +1,118 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Benchmark of the "show policy-map interface all" parser of xr_data_collector.
+
+Synthetic CLI output with the requested number of interfaces is generated
+and parsed with xr_data_collector.get_interface_policy_map. With --compare
+the output is also parsed with the previous (per line re.match and linear
+interface lookup) parser, and both results are checked to be identical.
+
+This script runs off the box, with a python having xmltodict installed.
+
+usage: bench_policy_map.py [-h] [-i INTERFACES] [-c CLASSES] [-r REPEAT] [--compare]
+
+Example:
+$ python3 benchmark/bench_policy_map.py -i 10000 --compare
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'exec'))
+import xr_data_collector
+from xr_fixtures import CliOutput, gen_policy_map_output
+
+
+def legacy_parse_interface_policy_map(output):
+    """
+    Previous implementation of the policy-map parser, kept as baseline
+    """
+    ret_list = list()
+    class_pattern = r'^Class (\S+)'
+    tx_pattern = r'^\s+Transmitted\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)'
+    total_pattern = r'^\s+Total Dropped\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)'
+    ecn_marked_pattern = r'^\s+RED ecn marked & transmitted\(packets/bytes\):\s+([0-9]+)/([0-9]+)'
+    intf_dict = dict()
+    class_dict = dict()
+    for line in output.split('\n'):
+        intf_match = re.match(xr_data_collector.RE_INTF_PATTERN + r'\s+(input|output):\s+(\S+)', line)
+        if intf_match:
+            for intf_dict in ret_list:
+                if intf_dict['interface-name'] == intf_match.group(1)+intf_match.group(2):
+                    break
+            else:
+                intf_dict = {'interface-name': intf_match.group(1)+intf_match.group(2),
+                             'input-rates': list(), 'output-rates': list(),
+                             'input-policy-name': '', 'output-policy-name': ''}
+                ret_list.append(intf_dict)
+            direction = intf_match.group(3)
+            intf_dict[direction + '-policy-name'] = intf_match.group(4)
+        class_match = re.match(class_pattern, line)
+        if class_match and intf_dict:
+            class_dict = {'class-name': class_match.group(1)}
+            intf_dict[direction + '-rates'].append(class_dict)
+        tx_match = re.match(tx_pattern, line)
+        if tx_match and class_dict:
+            class_dict['transmitted-packets'] = tx_match.group(1)
+            class_dict['transmitted-bytes'] = tx_match.group(2)
+            class_dict['transmitted-rate'] = tx_match.group(3)
+        total_match = re.match(total_pattern, line)
+        if total_match and class_dict:
+            class_dict['total-dropped-packets'] = total_match.group(1)
+            class_dict['total-dropped-bytes'] = total_match.group(2)
+            class_dict['total-dropped-rate'] = total_match.group(3)
+        ecn_marked_match = re.match(ecn_marked_pattern, line)
+        if ecn_marked_match and class_dict:
+            class_dict['ecn-marked-transmitted-packets'] = ecn_marked_match.group(1)
+            class_dict['ecn-marked-transmitted-bytes'] = ecn_marked_match.group(2)
+    return ret_list
+
+
+def best_time(func, repeat):
+    """
+    Run func repeat times and return the best wall time and the last result
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--interfaces', type=int, default=10000,
+                        help='Number of interfaces in the synthetic output')
+    parser.add_argument('-c', '--classes', type=int, default=4,
+                        help='Number of classes per policy')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also run the previous parser and compare the results')
+    args = parser.parse_args()
+
+    output = gen_policy_map_output(args.interfaces, args.classes)
+    cli_handle = CliOutput(output)
+    print('Output: {intfs} interfaces, {lines} lines, {size} bytes'.format(
+        intfs=args.interfaces, lines=output.count('\n') + 1, size=len(output)))
+
+    new_time, new_result = best_time(
+        lambda: xr_data_collector.get_interface_policy_map(cli_handle), args.repeat)
+    print('get_interface_policy_map : {t:.3f}s'.format(t=new_time))
+
+    if args.compare:
+        old_time, old_result = best_time(
+            lambda: legacy_parse_interface_policy_map(output), args.repeat)
+        print('previous parser          : {t:.3f}s ({x:.1f}x)'.format(t=old_time, x=old_time / new_time))
+        if old_result != new_result:
+            print('! Results differ')
+            sys.exit(1)
+        print('Results are identical')
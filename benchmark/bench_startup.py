@@ -0,0 +1,124 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Startup budget of the shared modules and report scripts.
+
+Each module is imported in a new python with -X importtime, the router
+modules being replaced by the stand-ins of fake_xr, and the cumulative
+import time of the module is compared with the budget. The direct imports
+costing the most are listed, to spot the dependencies to import lazily.
+
+The bytecode of the modules is compiled before measuring, as on the box
+after the first run of a script.
+
+usage: bench_startup.py [-h] [-r REPEAT] [-b BUDGET] [-t TOP] [modules ...]
+
+Example:
+$ python3 benchmark/bench_startup.py
+$ python3 benchmark/bench_startup.py -b 30 xr_data_collector
+"""
+
+import argparse
+import os
+import py_compile
+import subprocess
+import sys
+
+import fake_xr
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MODULES = ('xr_data_collector', 'xr_counter_rates', 'xr_snapshot', 'xr_timeseries',
+                   'show_interfaces_counters_q_rates', 'show_interfaces_counters_ecn')
+
+IMPORT_CODE = ('import sys; sys.path.insert(0, {benchmark_dir!r}); import fake_xr; fake_xr.install(); '
+               'import {module}')
+
+
+def compile_module(module):
+    """
+    Writes the bytecode of a module of the repo
+    """
+    for script_dir in fake_xr.SCRIPT_DIRS:
+        module_path = os.path.join(script_dir, module + '.py')
+        if os.path.exists(module_path):
+            py_compile.compile(module_path, doraise=True)
+            return
+    raise Exception('Module {module} not found'.format(module=module))
+
+
+def parse_importtime(output):
+    """
+    Parses -X importtime output
+    :return: list of (depth, name, self us, cumulative us) in output order,
+             each import following the imports it made
+    """
+    ret_list = list()
+    for line in output.split('\n'):
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        ret_list.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return ret_list
+
+
+def measure_import(module):
+    """
+    :return: (cumulative import time in us, list of (cumulative us, name)
+              of the direct imports of the module)
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                             IMPORT_CODE.format(benchmark_dir=BENCHMARK_DIR, module=module)],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        raise Exception('Import of {module} failed:\n{err}'.format(module=module, err=result.stderr))
+    imports = parse_importtime(result.stderr)
+    for pos in range(len(imports) - 1, -1, -1):
+        depth, name, self_us, cumulative_us = imports[pos]
+        if name == module:
+            break
+    else:
+        raise Exception('Module {module} not in the import times'.format(module=module))
+
+    children = list()
+    for child_depth, child_name, child_self_us, child_cumulative_us in reversed(imports[:pos]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 1:
+            children.append((child_cumulative_us, child_name))
+    return cumulative_us, sorted(children, reverse=True)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES,
+                        help='Modules to measure. All the shared modules and report scripts by default')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of runs, the best one is reported')
+    parser.add_argument('-b', '--budget', type=float, default=20.0,
+                        help='Import time budget of each module in ms')
+    parser.add_argument('-t', '--top', type=int, default=3,
+                        help='Number of the most costly direct imports listed')
+    args = parser.parse_args()
+
+    over_budget = 0
+    for module in args.modules:
+        compile_module(module)
+        best = None
+        for _ in range(args.repeat):
+            cumulative_us, children = measure_import(module)
+            if best is None or cumulative_us < best[0]:
+                best = (cumulative_us, children)
+        cumulative_ms = best[0] / 1000.0
+        status = 'ok'
+        if cumulative_ms > args.budget:
+            status = 'OVER BUDGET'
+            over_budget += 1
+        top = ', '.join('{name} {ms:.1f}ms'.format(name=name, ms=us / 1000.0) for us, name in best[1][:args.top])
+        print('{module:<36}{ms:>8.1f}ms  {status:<12}{top}'.format(module=module, ms=cumulative_ms,
+                                                                  status=status, top=top))
+    if over_budget:
+        sys.exit(1)
@@ -0,0 +1,223 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Benchmark suite of the parsers of xr_data_collector and of the report
+generators, run on synthetic outputs (see xr_fixtures) of several sizes.
+
+For each number of interfaces and line cards, the best wall time of
+netconf_xml_to_dict on the reply of every yang collector, every get_*
+getter and both generate_show_interfaces_counters_*_report functions is
+measured, along with the peak memory allocated (tracemalloc).
+
+Results can be saved as json and compared with a previous run to track
+regressions, the script exiting in error if a case got slower than the
+tolerance.
+
+This script runs off the box, with a python having xmltodict installed.
+
+usage: bench_suite.py [-h] [-i INTERFACES] [-l LCS] [-c CLASSES] [-r REPEAT]
+                      [-k FILTER] [--no-memory] [--json FILE] [--baseline FILE] [--tolerance TOLERANCE]
+
+Example:
+$ python3 benchmark/bench_suite.py -i 1000,10000,50000 -l 1,36
+$ python3 benchmark/bench_suite.py -k policy --json after.json --baseline before.json
+"""
+
+import argparse
+import functools
+import json
+import sys
+import time
+import tracemalloc
+
+import fake_xr
+fake_xr.install()
+import xr_data_collector
+import xr_fixtures
+import show_interfaces_counters_ecn
+import show_interfaces_counters_q_rates
+
+# netconf getters and the collector whose reply they parse
+NETCONF_GETTERS = (
+    (xr_data_collector.get_controller_stats, 'controller-stats'),
+    (xr_data_collector.get_controller_interface_stats, 'controller-interface-stats'),
+    (xr_data_collector.get_controller_npu_interfaces_stats, 'npu-interfaces-stats'),
+    (xr_data_collector.get_interfaces_status, 'interfaces-status'),
+    (xr_data_collector.get_controller_npu_traps_stats, 'npu-traps-stats'),
+    # same result as get_interface_policy_map
+    (xr_data_collector.get_interface_qos_stats, 'qos-interface-stats'),
+)
+
+CLI_GETTERS = (
+    xr_data_collector.get_hardware_drops,
+    xr_data_collector.get_interface_policy_map,
+    xr_data_collector.get_interface_name_handle_mapping,
+)
+
+REPORTS = (
+    show_interfaces_counters_q_rates.generate_show_interfaces_counters_q_rates_report,
+    show_interfaces_counters_ecn.generate_show_interfaces_counters_ecn_report,
+)
+
+
+def build_cases(num_interfaces, num_lcs, num_classes=4):
+    """
+    :return: list of (case name, input size in bytes, function to benchmark)
+    """
+    cases = list()
+    replies = dict((name, gen_reply(num_interfaces, num_lcs))
+                   for name, gen_reply in xr_fixtures.NETCONF_REPLIES.items())
+
+    for name, reply in sorted(replies.items()):
+        xml_tag = xr_data_collector.COLLECTORS[name].path.split('/')[0]
+        cases.append(('netconf_xml_to_dict[{name}]'.format(name=name), len(reply),
+                      functools.partial(xr_data_collector.netconf_xml_to_dict, reply, xml_tag)))
+
+    for getter, name in NETCONF_GETTERS:
+        cases.append((getter.__name__, len(replies[name]),
+                      functools.partial(getter, xr_fixtures.NetconfReply(replies[name]))))
+
+    cli_outputs = xr_fixtures.gen_cli_outputs(num_interfaces, num_lcs, num_classes)
+    cli_handle = xr_fixtures.CliOutput(cli_outputs)
+    output_sizes = {
+        'get_hardware_drops': len(cli_outputs['show drops all ongoing location all']),
+        'get_interface_policy_map': len(cli_outputs['show policy-map interface all']),
+        'get_interface_name_handle_mapping': len(cli_outputs['show im database brief location all']),
+    }
+    for getter in CLI_GETTERS:
+        cases.append((getter.__name__, output_sizes[getter.__name__], functools.partial(getter, cli_handle)))
+    # the top classes only are kept while parsing
+    cases.append(('get_interface_policy_map_top[20]', output_sizes['get_interface_policy_map'],
+                  functools.partial(xr_data_collector.get_interface_policy_map_top, cli_handle, 20,
+                                    show_interfaces_counters_q_rates.class_rate_getter('drop-rate'))))
+
+    policy_map = xr_data_collector.get_interface_policy_map(cli_handle)
+    for report in REPORTS:
+        for report_format in ('text', 'json'):
+            cases.append(('{name}[{report_format}]'.format(name=report.__name__, report_format=report_format),
+                          output_sizes['get_interface_policy_map'],
+                          functools.partial(report, policy_map, report_format)))
+        # written row by row, the report is never held in memory
+        for report_format in ('text', 'json', 'csv', 'ndjson'):
+            cases.append(('{name}[{report_format},stream]'.format(name=report.__name__,
+                                                                   report_format=report_format),
+                          output_sizes['get_interface_policy_map'],
+                          functools.partial(report, policy_map, report_format, stream=NullStream())))
+    return cases
+
+
+class NullStream(object):
+    """
+    Stream discarding what is written to it
+    """
+    def write(self, text):
+        return len(text)
+
+
+def measure(func, repeat, memory=True):
+    """
+    Runs func repeat times for the best wall time, then once more under
+    tracemalloc for the peak memory allocated
+    :param memory: If False the memory is not measured (tracemalloc slows
+                   the run down several times)
+    :return: (best time in seconds, peak memory in bytes or None)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        del result
+    if not memory:
+        return best, None
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return best, peak
+
+
+def run_suite(interfaces_list, lcs_list, num_classes=4, repeat=3, case_filter=None, memory=True):
+    """
+    :return: list of dicts, one per case and size
+    """
+    results = list()
+    for num_interfaces in interfaces_list:
+        for num_lcs in lcs_list:
+            for name, input_size, func in build_cases(num_interfaces, num_lcs, num_classes):
+                if case_filter and case_filter not in name:
+                    continue
+                seconds, peak = measure(func, repeat, memory)
+                result = {'case': name, 'interfaces': num_interfaces, 'lcs': num_lcs,
+                          'input-bytes': input_size, 'seconds': seconds, 'peak-bytes': peak}
+                results.append(result)
+                print('{case:<72}{interfaces:>7}{lcs:>4}{size:>10.1f}{seconds:>10.3f}{peak:>10}'.format(
+                    case=name, interfaces=num_interfaces, lcs=num_lcs, size=input_size / 2 ** 20,
+                    seconds=seconds, peak='-' if peak is None else '{:.1f}'.format(peak / 2 ** 20)), flush=True)
+    return results
+
+
+def compare_results(results, baseline, tolerance):
+    """
+    Prints the cases slower than tolerance times their baseline time
+    :return: number of regressions
+    """
+    baseline_index = dict(((row['case'], row['interfaces'], row['lcs']), row) for row in baseline)
+    regressions = 0
+    for row in results:
+        base_row = baseline_index.get((row['case'], row['interfaces'], row['lcs']))
+        if not base_row or not base_row['seconds']:
+            continue
+        ratio = row['seconds'] / base_row['seconds']
+        if ratio > tolerance:
+            regressions += 1
+            print('! {case} ({interfaces} interfaces, {lcs} LCs): {seconds:.3f}s, {ratio:.2f}x baseline'.format(
+                ratio=ratio, **row))
+    return regressions
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--interfaces', type=int_list, default=[1000, 10000],
+                        help='Comma separated numbers of interfaces. eg: 1000,10000,50000')
+    parser.add_argument('-l', '--lcs', type=int_list, default=[1, 8],
+                        help='Comma separated numbers of line cards. eg: 1,8,36')
+    parser.add_argument('-c', '--classes', type=int, default=4,
+                        help='Number of classes per policy')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='Number of runs, the best one is reported')
+    parser.add_argument('-k', '--filter',
+                        help='Only run the cases whose name contains this string')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Do not measure the peak memory, for a faster run')
+    parser.add_argument('--json', metavar='FILE',
+                        help='Save the results in a json file')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='json file of previous results to compare with')
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help='Time ratio to the baseline above which a case is a regression')
+    args = parser.parse_args()
+
+    print('{case:<72}{interfaces:>7}{lcs:>4}{size:>10}{seconds:>10}{peak:>10}'.format(
+        case='Case', interfaces='Intfs', lcs='LCs', size='In MiB', seconds='Seconds', peak='Peak MiB'))
+    results = run_suite(args.interfaces, args.lcs, args.classes, args.repeat, args.filter,
+                        not args.no_memory)
+
+    if args.json:
+        with open(args.json, 'w') as json_fd:
+            json.dump(results, json_fd, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline_fd:
+            baseline = json.load(baseline_fd)
+        if compare_results(results, baseline, args.tolerance):
+            sys.exit(1)
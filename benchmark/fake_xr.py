@@ -0,0 +1,103 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Off the box stand-ins for the router python modules the scripts import
+(cisco.script_mgmt.xrlog, cisco.script_mgmt.xr_utils, iosxr.xrcli.xrcli_helper
+and iosxr.netconf.netconf_lib), so that the scripts and their shared modules
+can be imported and benchmarked on a Linux box.
+
+Example:
+    import fake_xr
+    fake_xr.install()
+    import show_interfaces_counters_q_rates
+"""
+
+import importlib.util
+import logging
+import os
+import sys
+import types
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# directories secure_import looks for modules in, in order
+SCRIPT_DIRS = [os.path.join(REPO_DIR, script_type)
+               for script_type in ('exec', 'process', 'eem', 'config', 'precommit')]
+
+
+def getScriptLogger(name):
+    return logging.getLogger(name)
+
+
+def getSysLogger(name):
+    return logging.getLogger('syslog.' + name)
+
+
+def secure_import(module_file_name):
+    """
+    Imports a module from the script directories of the repo, once
+    :param module_file_name: File name of the module. eg: 'xr_data_collector.py'
+    :return: module
+    """
+    module_name = os.path.splitext(module_file_name)[0]
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    for script_dir in SCRIPT_DIRS:
+        module_path = os.path.join(script_dir, module_file_name)
+        if os.path.exists(module_path):
+            break
+    else:
+        raise ImportError('Module {name} not found in {dirs}'.format(name=module_file_name, dirs=SCRIPT_DIRS))
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class XrcliHelper(object):
+    """
+    Placeholder for the XR CLI helper, to be replaced through install()
+    """
+    def xrcli_exec(self, cmd):
+        raise Exception('No XR CLI off the box, "{cmd}" not executed'.format(cmd=cmd))
+
+
+class NetconfClient(object):
+    """
+    Placeholder for the netconf client, to be replaced through install()
+    """
+    def connect(self):
+        raise Exception('No netconf server off the box')
+
+
+def install(xrcli_helper=XrcliHelper, netconf_client=NetconfClient):
+    """
+    Registers the stand-in modules in sys.modules and puts the script
+    directories on sys.path
+    :param xrcli_helper: Class provided as iosxr.xrcli.xrcli_helper.XrcliHelper
+    :param netconf_client: Class provided as iosxr.netconf.netconf_lib.NetconfClient
+    :return: None
+    """
+    modules = {
+        'cisco': dict(),
+        'cisco.script_mgmt': dict(),
+        'cisco.script_mgmt.xrlog': {'getScriptLogger': getScriptLogger, 'getSysLogger': getSysLogger},
+        'cisco.script_mgmt.xr_utils': {'secure_import': secure_import},
+        'iosxr': dict(),
+        'iosxr.xrcli': dict(),
+        'iosxr.xrcli.xrcli_helper': {'XrcliHelper': xrcli_helper},
+        'iosxr.netconf': dict(),
+        'iosxr.netconf.netconf_lib': {'NetconfClient': netconf_client},
+    }
+    for name, attributes in modules.items():
+        module = sys.modules.get(name)
+        if module is None:
+            module = sys.modules[name] = types.ModuleType(name)
+        module.__dict__.update(attributes)
+        parent, _, child = name.rpartition('.')
+        if parent:
+            setattr(sys.modules[parent], child, module)
+    for script_dir in reversed(SCRIPT_DIRS):
+        if script_dir not in sys.path:
+            sys.path.insert(0, script_dir)
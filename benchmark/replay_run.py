@@ -0,0 +1,118 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Runs a script of the repo off the box, its NetconfClient and XrcliHelper
+replaying a recording (see xr_replay) with an injected latency, and reports
+the wall time of the run along with the round trips and bytes exchanged.
+
+Scripts looping forever, like the process scripts, are stopped after
+--duration seconds.
+
+usage: replay_run.py [-h] [--recording FILE] [-i INTERFACES] [-l LCS] [--latency LATENCY]
+                     [--jitter JITTER] [--bandwidth BANDWIDTH] [--duration DURATION]
+                     [--quiet] [--json] script [args ...]
+
+Example:
+$ python3 benchmark/replay_run.py -i 10000 -l 8 --latency 0.05 --quiet \\
+      exec/show_interfaces_counters_q_rates.py json
+$ python3 benchmark/replay_run.py --latency 0.2 exec/verify_bundle.py \\
+      -n Bundle-Ether1 -t 400000 -m HundredGigE0/0/0/2
+$ python3 benchmark/replay_run.py --duration 10 process/test_process.py 80 -i 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import runpy
+import signal
+import sys
+import time
+
+import xr_replay
+
+
+class RunTimeout(BaseException):
+    """
+    Raised to stop a script at the end of --duration. Not an Exception so
+    that the error handling of the scripts does not catch it.
+    """
+
+
+def run_script(script, script_args, duration=None, quiet=False):
+    """
+    Runs script as __main__ with script_args
+    :return: (wall time in seconds, exit status)
+    """
+    def stop(signum, frame):
+        raise RunTimeout()
+
+    status = 0
+    saved_argv = sys.argv
+    sys.argv = [script] + list(script_args)
+    if duration:
+        signal.signal(signal.SIGALRM, stop)
+        signal.setitimer(signal.ITIMER_REAL, duration)
+    start_time = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+            runpy.run_path(script, run_name='__main__')
+    except SystemExit as err:
+        status = err.code or 0
+    except RunTimeout:
+        pass
+    finally:
+        wall_time = time.perf_counter() - start_time
+        if duration:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        sys.argv = saved_argv
+    return wall_time, status
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('script', help='Path of the script to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments of the script')
+    parser.add_argument('--recording', metavar='FILE',
+                        help='Recording to replay. Synthetic replies (see xr_fixtures) if not set')
+    parser.add_argument('-i', '--interfaces', type=int, default=1000,
+                        help='Number of interfaces of the synthetic replies')
+    parser.add_argument('-l', '--lcs', type=int, default=1,
+                        help='Number of line cards of the synthetic replies')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds each round trip takes')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='Maximum random seconds added to or removed from the latency')
+    parser.add_argument('--bandwidth', type=float,
+                        help='Bytes per second the replies are received at')
+    parser.add_argument('--duration', type=float,
+                        help='Seconds after which the script is stopped')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Do not print the output of the script')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the results in json')
+    args = parser.parse_args()
+
+    if args.recording:
+        recording = xr_replay.Recording.load(args.recording)
+    else:
+        recording = xr_replay.Recording.from_fixtures(args.interfaces, args.lcs)
+    stats = xr_replay.install(recording, latency=args.latency, jitter=args.jitter,
+                              bandwidth=args.bandwidth)
+    script = os.path.abspath(args.script)
+    sys.path.insert(0, os.path.dirname(script))
+
+    wall_time, status = run_script(script, args.args, args.duration, args.quiet)
+
+    results = {'script': args.script, 'wall-time': wall_time, 'exit-status': status}
+    results.update(stats.as_dict())
+    if args.json:
+        print(json.dumps(results, indent=4), file=sys.stderr)
+    else:
+        print('{script}: {wall-time:.3f}s, exit status {exit-status}, {round-trips} round trips '
+              '(max {max-in-flight} in flight, {misses} not recorded), {bytes-sent} bytes sent, '
+              '{bytes-received} bytes received, {wait-time:.3f}s waiting'.format(**results), file=sys.stderr)
+    sys.exit(1 if status else 0)
@@ -0,0 +1,61 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Off the box tests of xr_data_collector on the synthetic router outputs of
+xr_fixtures.
+
+usage: python3 -m unittest test_xr_data_collector (from the benchmark directory)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fake_xr
+fake_xr.install()
+import xr_fixtures
+import xr_data_collector
+
+BAD_INTERFACE = 'HundredGigE0/9/0/99'
+
+
+class InterfaceScopedCliTest(unittest.TestCase):
+    """
+    Per interface CLI queries with an interface whose CLI fails in the list
+    """
+
+    def setUp(self):
+        self.cli_handle = xr_fixtures.CliOutput(xr_fixtures.gen_cli_outputs(20, 2))
+        self.all_stats = xr_data_collector.get_interface_policy_map(self.cli_handle)
+        self.interfaces = [int_stats['interface-name'] for int_stats in self.all_stats[:3]]
+        xr_data_collector.invalidate_interface_name_handle_mapping()
+
+    def expected_stats(self):
+        return [int_stats for int_stats in self.all_stats if int_stats['interface-name'] in self.interfaces]
+
+    def test_policy_map_skips_bad_interface(self):
+        int_stats_list = xr_data_collector.get_interface_policy_map(
+            self.cli_handle, interfaces=self.interfaces[:1] + [BAD_INTERFACE] + self.interfaces[1:])
+        self.assertEqual(int_stats_list, self.expected_stats())
+
+    def test_policy_map_pool_skips_bad_interface(self):
+        cli_pool = xr_data_collector.HandlePool(lambda: self.cli_handle, size=2)
+        int_stats_list = xr_data_collector.get_interface_policy_map(
+            None, interfaces=[BAD_INTERFACE] + self.interfaces, cli_pool=cli_pool)
+        self.assertEqual(int_stats_list, self.expected_stats())
+
+    def test_handle_mapping_skips_bad_interface(self):
+        mapping = xr_data_collector.get_interface_name_handle_mapping(
+            self.cli_handle, interfaces=self.interfaces + [BAD_INTERFACE])
+        self.assertEqual(sorted(xr_data_collector.canonical_interface_name(name) for name in mapping.values()),
+                         sorted(self.interfaces))
+
+    def test_all_interfaces_bad_raises(self):
+        with self.assertRaises(Exception):
+            xr_data_collector.get_interface_policy_map(self.cli_handle, interfaces=[BAD_INTERFACE])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,431 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Generators of synthetic router outputs, sized by number of interfaces and
+line cards, for the benchmarks of xr_data_collector and the report scripts:
+- netconf replies of every yang dataset registered in xr_data_collector
+- show policy-map interface all
+- show drops all ongoing location all
+- show im database brief location all
+- show platform
+
+Interfaces are spread over the line cards, PORTS_PER_LC physical ports
+each, the remaining interfaces being sub-interfaces of these ports.
+"""
+
+NS_ETH_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-drivers-media-eth-oper'
+NS_OFA_NPU_STATS_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-ofa-npu-stats-oper'
+NS_IM_CMD_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-pfi-im-cmd-oper'
+NS_WDSYSMON_FD_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-wdsysmon-fd-oper'
+NS_QOS_MA_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-qos-ma-oper'
+
+PORTS_PER_LC = 36
+NPUS_PER_LC = 3
+TRAPS_PER_NPU = 64
+FIRST_HANDLE = 0x1000
+
+
+class CliOutput(object):
+    """
+    Stand-in for XrcliHelper returning the output of a command from a dict
+    of {command: output}, or a fixed output for any command
+    """
+    def __init__(self, output):
+        self.output = output
+
+    def xrcli_exec(self, cmd):
+        if type(self.output) == dict:
+            if cmd not in self.output:
+                return {'status': 'error', 'output': ''}
+            return {'status': 'success', 'output': self.output[cmd]}
+        return {'status': 'success', 'output': self.output}
+
+
+class NetconfReply(object):
+    """
+    Stand-in for NetconfClient replying a fixed reply to any get request
+    """
+    def __init__(self, reply):
+        self.reply = reply
+        self.rpc = self
+
+    def get(self, request):
+        pass
+
+
+def lc_node_names(num_lcs):
+    """
+    :return: list of the line card node names. eg: ['0/0/CPU0', '0/1/CPU0']
+    """
+    return ['0/{slot}/CPU0'.format(slot=slot) for slot in range(num_lcs)]
+
+
+def gen_interfaces(num_interfaces, num_lcs=1):
+    """
+    :return: list of (interface name, line card slot, interface handle)
+    """
+    ret_list = list()
+    num_ports = PORTS_PER_LC * num_lcs
+    for intf_id in range(num_interfaces):
+        slot = intf_id % num_lcs
+        port = (intf_id // num_lcs) % PORTS_PER_LC
+        name = 'HundredGigE0/{slot}/0/{port}'.format(slot=slot, port=port)
+        if intf_id >= num_ports:
+            name += '.{sub}'.format(sub=intf_id // num_ports)
+        ret_list.append((name, slot, FIRST_HANDLE + intf_id))
+    return ret_list
+
+
+def netconf_reply(body):
+    """
+    Wraps the xml of a dataset into a netconf rpc reply
+    """
+    return ('<?xml version="1.0"?>\n'
+            '<rpc-reply message-id="101" xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">\n'
+            ' <data>\n{body} </data>\n</rpc-reply>\n').format(body=body)
+
+
+def gen_controller_stats_reply(num_interfaces, num_lcs=1):
+    """
+    Reply of ethernet-interface/statistics/statistic
+    """
+    lines = ['  <ethernet-interface xmlns="{ns}">'.format(ns=NS_ETH_OPER), '   <statistics>']
+    for intf_id, (name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        lines.append('    <statistic>')
+        lines.append('     <interface-name>{name}</interface-name>'.format(name=name))
+        for counter_id, counter in enumerate(('received-total-bytes', 'received-good-bytes',
+                                              'received-total-frames', 'received-unicast-frames',
+                                              'received-multicast-frames', 'received-broadcast-frames',
+                                              'received-good-frames', 'dropped-packets-with-crc-error',
+                                              'transmitted-total-bytes', 'transmitted-good-bytes',
+                                              'transmitted-total-frames', 'transmitted-unicast-frames',
+                                              'transmitted-multicast-frames', 'transmitted-broadcast-frames',
+                                              'transmitted-good-frames', 'total-pause-frames')):
+            lines.append('     <{c}>{v}</{c}>'.format(c=counter, v=intf_id * 1000003 + counter_id))
+        lines.append('    </statistic>')
+    lines += ['   </statistics>', '  </ethernet-interface>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+def gen_controller_interface_stats_reply(num_interfaces, num_lcs=1):
+    """
+    Reply of ethernet-interface/interfaces/interface
+    """
+    lines = ['  <ethernet-interface xmlns="{ns}">'.format(ns=NS_ETH_OPER), '   <interfaces>']
+    for intf_id, (name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        lines += ['    <interface>',
+                  '     <interface-name>{name}</interface-name>'.format(name=name),
+                  '     <admin-state>im-state-up</admin-state>',
+                  '     <oper-state>im-state-up</oper-state>',
+                  '     <mac-info>',
+                  '      <burned-in-mac-address>00:1a:2b:{a:02x}:{b:02x}:{c:02x}</burned-in-mac-address>'.format(
+                      a=(intf_id >> 16) & 0xff, b=(intf_id >> 8) & 0xff, c=intf_id & 0xff),
+                  '     </mac-info>',
+                  '     <layer1-info>',
+                  '      <speed>ethernet-speed-100gbps</speed>',
+                  '      <duplex>ethernet-duplex-full</duplex>',
+                  '      <bandwidth-utilization>{util}</bandwidth-utilization>'.format(util=intf_id % 100),
+                  '     </layer1-info>',
+                  '     <phy-info>',
+                  '      <media-type>ether-media-type100gbase-sr4</media-type>',
+                  '     </phy-info>',
+                  '    </interface>']
+    lines += ['   </interfaces>', '  </ethernet-interface>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+def gen_interfaces_status_reply(num_interfaces, num_lcs=1):
+    """
+    Reply of interfaces/interface-xr/interface
+    """
+    lines = ['  <interfaces xmlns="{ns}">'.format(ns=NS_IM_CMD_OPER), '   <interface-xr>']
+    for intf_id, (name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        lines += ['    <interface>',
+                  '     <interface-name>{name}</interface-name>'.format(name=name),
+                  '     <interface-handle>{name}</interface-handle>'.format(name=name),
+                  '     <interface-type>IFT_HUNDREDGE</interface-type>',
+                  '     <hardware-type-string>HundredGigE</hardware-type-string>',
+                  '     <state>im-state-up</state>',
+                  '     <line-state>im-state-up</line-state>',
+                  '     <encapsulation>ether</encapsulation>',
+                  '     <mtu>1514</mtu>',
+                  '     <bandwidth>100000000</bandwidth>',
+                  '     <if-index>{index}</if-index>'.format(index=intf_id + 1),
+                  '    </interface>']
+    lines += ['   </interface-xr>', '  </interfaces>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+def gen_npu_stats_reply(num_interfaces, num_lcs=1, handles=True, traps=True):
+    """
+    Reply of ofa/stats/nodes/node with the interface handles and/or the
+    traps of NPUS_PER_LC npus per line card. The interfaces of a line card
+    are spread over its npus.
+    """
+    intfs_by_npu = dict()
+    for intf_id, (name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        intfs_by_npu.setdefault((slot, intf_id % NPUS_PER_LC), list()).append(handle)
+
+    lines = ['  <ofa xmlns="{ns}">'.format(ns=NS_OFA_NPU_STATS_OPER), '   <stats>', '    <nodes>']
+    for slot, node_name in enumerate(lc_node_names(num_lcs)):
+        lines += ['     <node>', '      <node-name>{node}</node-name>'.format(node=node_name),
+                  '      <npu-numbers>']
+        for npu_id in range(NPUS_PER_LC):
+            lines += ['       <npu-number>', '        <npu-id>{npu}</npu-id>'.format(npu=npu_id),
+                      '        <display>']
+            if handles:
+                lines += ['         <fair-voq-base-numbers>', '          <fair-voq-base-number>',
+                          '           <voq-base>{base}</voq-base>'.format(base=1024 * (npu_id + 1)),
+                          '          </fair-voq-base-number>', '         </fair-voq-base-numbers>',
+                          '         <interface-handles>']
+                for handle in intfs_by_npu.get((slot, npu_id), list()):
+                    lines += ['          <interface-handle>',
+                              '           <interface-handle>{handle:x}</interface-handle>'.format(handle=handle),
+                              '           <interface-name>{handle:x}</interface-name>'.format(handle=handle),
+                              '           <voq-base>{base}</voq-base>'.format(base=handle * 8 % 65536),
+                              '           <packets-sent>{pkts}</packets-sent>'.format(pkts=handle * 7),
+                              '           <bytes-sent>{bytes}</bytes-sent>'.format(bytes=handle * 7 * 700),
+                              '           <packets-dropped>{pkts}</packets-dropped>'.format(pkts=handle % 13),
+                              '          </interface-handle>']
+                lines.append('         </interface-handles>')
+            if traps:
+                lines.append('         <trap-ids>')
+                for trap_id in range(TRAPS_PER_NPU):
+                    lines += ['          <trap-id>',
+                              '           <trap-id>{trap}</trap-id>'.format(trap=trap_id),
+                              '           <trap-string>RxTrap{trap}</trap-string>'.format(trap=trap_id),
+                              '           <npu-id>{npu}</npu-id>'.format(npu=npu_id),
+                              '           <punt-dest>RPT_DEFAULT</punt-dest>',
+                              '           <policer-id>{trap}</policer-id>'.format(trap=trap_id + 100),
+                              '           <packet-accepted>{pkts}</packet-accepted>'.format(
+                                  pkts=(slot + 1) * trap_id * 11),
+                              '           <packet-dropped>{pkts}</packet-dropped>'.format(
+                                  pkts=(slot + 1) * trap_id * 3),
+                              '          </trap-id>']
+                lines.append('         </trap-ids>')
+            lines += ['        </display>', '       </npu-number>']
+        lines += ['      </npu-numbers>', '     </node>']
+    lines += ['    </nodes>', '   </stats>', '  </ofa>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+def gen_cpu_utilization_reply(total_cpu=20, node_name='0/RP0/CPU0'):
+    """
+    Reply of system-monitoring/cpu-utilization, as queried by the process
+    script monitors
+    """
+    lines = ['  <system-monitoring xmlns="{ns}">'.format(ns=NS_WDSYSMON_FD_OPER),
+             '   <cpu-utilization>',
+             '    <node-name>{node}</node-name>'.format(node=node_name),
+             '    <total-cpu-one-minute>{cpu}</total-cpu-one-minute>'.format(cpu=total_cpu),
+             '   </cpu-utilization>',
+             '  </system-monitoring>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+def gen_qos_stats_reply(num_interfaces, num_lcs=1, num_classes=4):
+    """
+    Reply of qos/interface-table/interface, with the leaves requested by the
+    qos-interface-stats collector. Holds the counters of gen_policy_map_output.
+    """
+    lines = ['  <qos xmlns="{ns}">'.format(ns=NS_QOS_MA_OPER), '   <interface-table>']
+    for intf_id, (intf_name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        lines.append('    <interface>')
+        lines.append('     <interface-name>{name}</interface-name>'.format(name=intf_name))
+        for direction in ('input', 'output'):
+            policy_name = 'pm-%s-%d' % (direction, intf_id % 8)
+            lines += ['     <{d}>'.format(d=direction), '      <service-policy-names>',
+                      '       <service-policy-instance>',
+                      '        <service-policy-name>{p}</service-policy-name>'.format(p=policy_name),
+                      '        <statistics>',
+                      '         <policy-name>{p}</policy-name>'.format(p=policy_name)]
+            for class_id in range(num_classes):
+                pkts = intf_id * 1000 + class_id
+                lines += ['         <class-stats>',
+                          '          <class-name>cm-tc%d</class-name>' % class_id,
+                          '          <general-stats>',
+                          '           <transmit-packets>%d</transmit-packets>' % pkts,
+                          '           <transmit-bytes>%d</transmit-bytes>' % (pkts * 700),
+                          '           <total-transmit-rate>%d</total-transmit-rate>' % class_id,
+                          '           <total-drop-packets>%d</total-drop-packets>' % class_id,
+                          '           <total-drop-bytes>%d</total-drop-bytes>' % (class_id * 700),
+                          '           <total-drop-rate>0</total-drop-rate>',
+                          '          </general-stats>']
+                if direction == 'output':
+                    lines += ['          <wred-stats-array>',
+                              '           <red-ecn-marked-packets>%d</red-ecn-marked-packets>' % pkts,
+                              '           <red-ecn-marked-bytes>%d</red-ecn-marked-bytes>' % (pkts * 700),
+                              '          </wred-stats-array>']
+                lines.append('         </class-stats>')
+            lines += ['        </statistics>', '       </service-policy-instance>',
+                      '      </service-policy-names>', '     </{d}>'.format(d=direction)]
+        lines.append('    </interface>')
+    lines += ['   </interface-table>', '  </qos>', '']
+    return netconf_reply('\n'.join(lines))
+
+
+# reply generator of each yang collector registered in xr_data_collector,
+# called with (number of interfaces, number of line cards)
+NETCONF_REPLIES = {
+    'controller-stats': gen_controller_stats_reply,
+    'controller-interface-stats': gen_controller_interface_stats_reply,
+    'npu-interfaces-stats': lambda num_interfaces, num_lcs=1: gen_npu_stats_reply(
+        num_interfaces, num_lcs, traps=False),
+    'npu-interface-handles-stats': lambda num_interfaces, num_lcs=1: gen_npu_stats_reply(
+        num_interfaces, num_lcs, traps=False),
+    'interfaces-status': gen_interfaces_status_reply,
+    'npu-traps-stats': lambda num_interfaces, num_lcs=1: gen_npu_stats_reply(
+        num_interfaces, num_lcs, handles=False),
+    'qos-interface-stats': gen_qos_stats_reply,
+}
+
+
+def gen_policy_map_output(num_interfaces, num_classes=4, num_lcs=1):
+    """
+    Generate "show policy-map interface all" output
+    :param num_interfaces: Number of interfaces with an input and output policy
+    :param num_classes: Number of classes per policy
+    :param num_lcs: Number of line cards the interfaces are spread over
+    :return: CLI output
+    """
+    lines = list()
+    for intf_id, (intf_name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)):
+        lines += _policy_map_lines(intf_id, intf_name, num_classes)
+    return '\n'.join(lines)
+
+
+def _policy_map_lines(intf_id, intf_name, num_classes):
+    """
+    :return: lines of the input and output policies of an interface in
+             "show policy-map interface" output
+    """
+    lines = list()
+    for direction in ('input', 'output'):
+        lines.append('%s %s: pm-%s-%d' % (intf_name, direction, direction, intf_id % 8))
+        lines.append('')
+        for class_id in range(num_classes):
+            pkts = intf_id * 1000 + class_id
+            lines.append('Class cm-tc%d' % class_id)
+            lines.append('  Classification statistics          (packets/bytes)     (rate - kbps)')
+            lines.append('    Matched             :            %10d/%-16d      %d' % (pkts, pkts * 700, class_id))
+            lines.append('    Transmitted         :            %10d/%-16d      %d' % (pkts, pkts * 700, class_id))
+            lines.append('    Total Dropped       :            %10d/%-16d      %d' % (class_id, class_id * 700, 0))
+            lines.append('  Queueing statistics')
+            lines.append('    Queue ID                             : %d' % (intf_id * 8 + class_id))
+            lines.append('    Taildropped(packets/bytes)           : 0/0')
+            if direction == 'output':
+                lines.append('    RED ecn marked & transmitted(packets/bytes): %d/%d' % (pkts, pkts * 700))
+        lines.append('Policy Bag Stats time: 1650000000000 [Local Time: 04/15/22 05:00:00.000]')
+        lines.append('')
+    return lines
+
+
+def gen_drops_output(num_lcs=1, num_traps=TRAPS_PER_NPU):
+    """
+    Generate "show drops all ongoing location all" output, NPUS_PER_LC npus
+    per line card with num_traps traps each
+    """
+    lines = list()
+    for slot, node_name in enumerate(lc_node_names(num_lcs)):
+        lines += ['', 'Printing Drop Counters for node {node}'.format(node=node_name),
+                  '',
+                  'Trap Type                                     NPU  Trap  Punt         Punt  Punt  Punt  '
+                  'Configured Hardware   Policer Avg-Pkt Packets              Packets',
+                  '                                              ID   ID    Dest         VoQ   VLAN  TC    '
+                  'Rate(pps)  Rate(pps)  Level   Size    Accepted             Dropped',
+                  '=' * 140]
+        for npu_id in range(NPUS_PER_LC):
+            for trap_id in range(num_traps):
+                lines.append('{trap:<46}{npu:<5}{trap_id:<6}{dest:<13}{voq:<6}{vlan:<6}{tc:<6}'
+                             '{conf:<11}{hw:<11}{level:<8}{size:<8}{accepted:<21}{dropped}'.format(
+                                 trap='RxTrap{trap_id}(D*)'.format(trap_id=trap_id), npu=npu_id,
+                                 trap_id=trap_id, dest='RPT_DEFAULT', voq=trap_id % 8, vlan=1586, tc=7,
+                                 conf=1000, hw=1000, level='IFG', size=64,
+                                 accepted=(slot + 1) * trap_id * 11, dropped=(slot + 1) * trap_id * 3))
+    return '\n'.join(lines) + '\n'
+
+
+def gen_im_database_output(num_interfaces, num_lcs=1):
+    """
+    Generate "show im database brief location all" output
+    """
+    intfs_by_slot = dict()
+    for name, slot, handle in gen_interfaces(num_interfaces, num_lcs):
+        intfs_by_slot.setdefault(slot, list()).append((name, handle))
+
+    lines = list(IM_DATABASE_LEGEND)
+    for slot, node_name in enumerate(lc_node_names(num_lcs)):
+        lines += ['', 'Node {node} (0x{slot:x})'.format(node=node_name, slot=slot * 0x100), '']
+        lines += IM_DATABASE_HEADER
+        for name, handle in intfs_by_slot.get(slot, list()):
+            lines.append(_im_database_line(name, handle))
+    return '\n'.join(lines) + '\n'
+
+
+IM_DATABASE_LEGEND = ['View: OWN - Owner, L3P - Local 3rd Party, G3P - Global 3rd Party, LDP - Local Data Plane',
+                      '      GDP - Global Data Plane, RED - Redundancy, UL - UL']
+IM_DATABASE_HEADER = ['  Intf             Intf                  MTU  Layer Protocol      Caps Encap',
+                      '  Handle           Name                   (Bytes)', '']
+
+
+def _im_database_line(name, handle):
+    """
+    :return: line of an interface in "show im database brief" output
+    """
+    return '0x{handle:08x} {name:<22}1514  1     ether          1   1'.format(
+        handle=handle, name=name.replace('HundredGigE', 'Hu'))
+
+
+def gen_accounting_rates_output(interface_name, mpls_pps=1000):
+    """
+    Generate "show interfaces <name> accounting rates" output
+    """
+    lines = ['{name}'.format(name=interface_name),
+             '                        Ingress                         Egress',
+             '  Protocol      Bits/sec   Packets/sec        Bits/sec   Packets/sec',
+             '  IPV4_UNICAST  {bits:>12}  {pps:>12}  {bits:>12}  {pps:>12}'.format(bits=mpls_pps * 8000,
+                                                                                 pps=mpls_pps),
+             '  MPLS          {bits:>12}  {pps:>12}  {bits:>12}  {pps:>12}'.format(bits=mpls_pps * 8000,
+                                                                                 pps=mpls_pps)]
+    return '\n'.join(lines) + '\n'
+
+
+def gen_platform_output(num_lcs=1):
+    """
+    Generate "show platform" output with one RP and num_lcs line cards
+    """
+    lines = ['Node              Type                     State                    Config state',
+             '-' * 80,
+             '0/RP0/CPU0        8800-RP(Active)          IOS XR RUN               NSHUT']
+    for node_name in lc_node_names(num_lcs):
+        lines.append('{node:<18}88-LC0-36FH-M            IOS XR RUN               NSHUT'.format(node=node_name))
+    lines.append('0/FC0             8808-FC                  OPERATIONAL              NSHUT')
+    return '\n'.join(lines) + '\n'
+
+
+def gen_cli_outputs(num_interfaces, num_lcs=1, num_classes=4, per_interface=64):
+    """
+    :param per_interface: Number of interfaces, the first ones, whose per
+                          interface CLI outputs are generated
+    :return: dict of {command: output} of all the CLIs used by xr_data_collector
+    """
+    outputs = {
+        'show policy-map interface all': gen_policy_map_output(num_interfaces, num_classes, num_lcs),
+        'show drops all ongoing location all': gen_drops_output(num_lcs),
+        'show im database brief location all': gen_im_database_output(num_interfaces, num_lcs),
+        'show platform': gen_platform_output(num_lcs),
+    }
+    for slot, node_name in enumerate(lc_node_names(num_lcs)):
+        node_output = gen_drops_output(1).replace('0/0/CPU0', node_name)
+        outputs['show drops all ongoing location {node}'.format(node=node_name)] = node_output
+    # the RP has no npu, only the headers are printed
+    outputs['show drops all ongoing location 0/RP0/CPU0'] = gen_drops_output(1, num_traps=0).replace(
+        '0/0/CPU0', '0/RP0/CPU0')
+
+    for intf_id, (name, slot, handle) in enumerate(gen_interfaces(num_interfaces, num_lcs)[:per_interface]):
+        outputs['show policy-map interface {name}'.format(name=name)] = '\n'.join(
+            _policy_map_lines(intf_id, name, num_classes))
+        outputs['show im database interface {name} brief'.format(name=name)] = '\n'.join(
+            IM_DATABASE_LEGEND + [''] + IM_DATABASE_HEADER + [_im_database_line(name, handle)]) + '\n'
+    return outputs
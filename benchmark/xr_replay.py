@@ -0,0 +1,334 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+Record and replay stand-ins for iosxr.netconf.netconf_lib.NetconfClient and
+iosxr.xrcli.xrcli_helper.XrcliHelper, to run and profile the scripts off the
+box with a realistic transport.
+
+On the box, a session is recorded by wrapping the real handles:
+    recording = Recording()
+    nc_con = RecordingNetconfClient(NetconfClient(), recording)
+    cli_handle = RecordingXrcliHelper(XrcliHelper(), recording)
+    ... run the collection ...
+    recording.save('/harddisk:/recording.json')
+
+Off the box, the recorded replies (or synthetic ones, see
+Recording.from_fixtures) are replayed keyed by netconf filter or CLI, with
+an injected latency, and the round trips and bytes are counted:
+    recording = Recording.load('recording.json')
+    stats = TransportStats()
+    install(recording, latency=0.05, jitter=0.01, stats=stats)
+    ... import and run the script ...
+    print(stats.as_dict())
+"""
+
+import functools
+import json
+import random
+import re
+import threading
+import time
+
+import fake_xr
+
+RE_FILTER_SPACES = re.compile(r'>\s+<')
+RE_FILTER_TAGS = re.compile(r'<([A-Za-z][\w\-]*)')
+
+OK_REPLY = ('<?xml version="1.0"?>\n'
+            '<rpc-reply message-id="101" xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">\n'
+            ' <ok/>\n</rpc-reply>\n')
+EMPTY_REPLY = ('<?xml version="1.0"?>\n'
+               '<rpc-reply message-id="101" xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">\n'
+               ' <data/>\n</rpc-reply>\n')
+
+
+def normalize_filter(request):
+    """
+    Normalized form of a netconf filter, without the blanks between tags
+    """
+    return RE_FILTER_SPACES.sub('><', request.strip())
+
+
+class TransportStats(object):
+    """
+    Thread safe counters of the requests made on the replay transports
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.round_trips = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # requests not found in the recording
+        self.misses = 0
+        # total time spent waiting on the transport
+        self.wait_time = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def start(self, bytes_sent):
+        with self.lock:
+            self.round_trips += 1
+            self.bytes_sent += bytes_sent
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self, bytes_received, wait_time, miss=False):
+        with self.lock:
+            self.bytes_received += bytes_received
+            self.wait_time += wait_time
+            self.in_flight -= 1
+            self.misses += int(miss)
+
+    def as_dict(self):
+        with self.lock:
+            return {'round-trips': self.round_trips, 'bytes-sent': self.bytes_sent,
+                    'bytes-received': self.bytes_received, 'misses': self.misses,
+                    'wait-time': self.wait_time, 'max-in-flight': self.max_in_flight}
+
+
+class Recording(object):
+    """
+    Netconf replies keyed by normalized filter and CLI outputs keyed by command
+    """
+    def __init__(self, netconf=None, cli=None):
+        self.netconf = dict()
+        self.cli = dict(cli or dict())
+        # tag names of each filter, to find the closest one of unknown filters
+        self._filter_tags = dict()
+        for request, reply in (netconf or dict()).items():
+            self.add_netconf(request, reply)
+
+    def add_netconf(self, request, reply):
+        request = normalize_filter(request)
+        self.netconf[request] = reply
+        self._filter_tags[request] = set(RE_FILTER_TAGS.findall(request))
+
+    def add_cli(self, cmd, output):
+        self.cli[cmd] = output
+
+    def netconf_reply(self, request):
+        """
+        Reply of a filter. A filter not recorded, eg: scoped to some keys or
+        fields, gets the reply of the recorded filter having the most tag
+        names in common with it.
+        :return: (reply or None, True if the filter was not recorded)
+        """
+        request = normalize_filter(request)
+        reply = self.netconf.get(request)
+        if reply is not None:
+            return reply, False
+        tags = set(RE_FILTER_TAGS.findall(request))
+        best_request, best_common = None, 0
+        for recorded_request, recorded_tags in self._filter_tags.items():
+            common = len(tags & recorded_tags)
+            if common > best_common:
+                best_request, best_common = recorded_request, common
+        if best_request is None:
+            return None, True
+        return self.netconf[best_request], True
+
+    def cli_output(self, cmd):
+        return self.cli.get(cmd)
+
+    def save(self, path):
+        with open(path, 'w') as recording_fd:
+            json.dump({'netconf': self.netconf, 'cli': self.cli}, recording_fd)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as recording_fd:
+            recorded = json.load(recording_fd)
+        return cls(recorded.get('netconf'), recorded.get('cli'))
+
+    @classmethod
+    def from_fixtures(cls, num_interfaces, num_lcs=1, num_classes=4):
+        """
+        Recording of synthetic replies of all the collectors of
+        xr_data_collector, the cpu utilization of the process monitors and
+        the accounting rates of Bundle-Ether1
+        """
+        fake_xr.install()
+        import xr_data_collector
+        import xr_fixtures
+
+        recording = cls(cli=xr_fixtures.gen_cli_outputs(num_interfaces, num_lcs, num_classes))
+        for name, gen_reply in xr_fixtures.NETCONF_REPLIES.items():
+            recording.add_netconf(xr_data_collector.COLLECTORS[name].build_filter(),
+                                  gen_reply(num_interfaces, num_lcs))
+        recording.add_netconf('<system-monitoring xmlns="{ns}"><cpu-utilization><node-name>0/RP0/CPU0'
+                              '</node-name><total-cpu-one-minute/></cpu-utilization></system-monitoring>'.format(
+                                  ns=xr_fixtures.NS_WDSYSMON_FD_OPER),
+                              xr_fixtures.gen_cpu_utilization_reply())
+        recording.add_cli('show interfaces Bundle-Ether1 accounting rates',
+                          xr_fixtures.gen_accounting_rates_output('Bundle-Ether1'))
+        return recording
+
+
+class ReplayTransport(object):
+    """
+    Delay and accounting of a request on a replay transport
+    """
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, stats=None):
+        """
+        :param latency: Seconds each round trip takes
+        :param jitter: Maximum random seconds added to or removed from the latency
+        :param bandwidth: Bytes per second the replies are received at. No limit if None
+        :param stats: TransportStats the requests are counted in
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.stats = stats if stats is not None else TransportStats()
+
+    def round_trip(self, request, reply_func):
+        """
+        Sends request, waits for the transport and returns the reply
+        :param reply_func: Function returning (reply, miss) for the request
+        """
+        self.stats.start(len(request))
+        start_time = time.time()
+        reply, miss = reply_func()
+        delay = self.latency
+        if self.jitter:
+            delay += random.uniform(-self.jitter, self.jitter)
+        if self.bandwidth:
+            delay += len(reply) / float(self.bandwidth)
+        if delay > 0:
+            time.sleep(delay)
+        self.stats.end(len(reply), time.time() - start_time, miss)
+        return reply
+
+
+class ReplayNetconfClient(object):
+    """
+    Stand-in for NetconfClient replying the netconf replies of a Recording.
+    Unknown get filters get an empty data reply, edit_config and commit an
+    ok reply.
+    """
+    def __init__(self, recording, latency=0.0, jitter=0.0, bandwidth=None, stats=None, **kwargs):
+        self.recording = recording
+        self.transport = ReplayTransport(latency, jitter, bandwidth, stats)
+        self.reply = ''
+        self.connected = False
+
+    @property
+    def rpc(self):
+        return self
+
+    def connect(self):
+        self.transport.round_trip('', lambda: ('', False))
+        self.connected = True
+
+    def close(self):
+        self.connected = False
+
+    def get(self, request=None, file=None):
+        if file is not None:
+            with open(file) as filter_fd:
+                request = filter_fd.read()
+
+        def reply_func():
+            reply, miss = self.recording.netconf_reply(request)
+            return (EMPTY_REPLY if reply is None else reply), miss
+        self.reply = self.transport.round_trip(request, reply_func)
+
+    def edit_config(self, config=None, file=None):
+        if file is not None:
+            with open(file) as config_fd:
+                config = config_fd.read()
+        self.reply = self.transport.round_trip(config, lambda: (OK_REPLY, False))
+
+    def commit(self):
+        self.reply = self.transport.round_trip('<commit/>', lambda: (OK_REPLY, False))
+
+
+class ReplayXrcliHelper(object):
+    """
+    Stand-in for XrcliHelper replying the CLI outputs of a Recording.
+    Unknown CLIs fail, configurations are accepted.
+    """
+    def __init__(self, recording, latency=0.0, jitter=0.0, bandwidth=None, stats=None, **kwargs):
+        self.recording = recording
+        self.transport = ReplayTransport(latency, jitter, bandwidth, stats)
+
+    def xrcli_exec(self, cmd):
+        output = self.transport.round_trip(cmd, lambda: (self.recording.cli_output(cmd) or '',
+                                                         cmd not in self.recording.cli))
+        if cmd not in self.recording.cli:
+            return {'status': 'error', 'output': output}
+        return {'status': 'success', 'output': output}
+
+    def xr_apply_config_string(self, cfg):
+        self.transport.round_trip(cfg, lambda: ('', False))
+        return {'status': 'success', 'output': ''}
+
+
+class RecordingNetconfClient(object):
+    """
+    Wraps a NetconfClient and records the replies of its get requests
+    """
+    def __init__(self, nc_con, recording):
+        self.nc_con = nc_con
+        self.recording = recording
+
+    @property
+    def rpc(self):
+        return self
+
+    @property
+    def reply(self):
+        return self.nc_con.reply
+
+    def get(self, request=None, file=None):
+        if file is not None:
+            with open(file) as filter_fd:
+                request = filter_fd.read()
+        self.nc_con.rpc.get(request=request)
+        self.recording.add_netconf(request, self.nc_con.reply)
+
+    def __getattr__(self, name):
+        if name in ('edit_config', 'commit'):
+            return getattr(self.nc_con.rpc, name)
+        return getattr(self.nc_con, name)
+
+
+class RecordingXrcliHelper(object):
+    """
+    Wraps a XrcliHelper and records the outputs of its successful CLIs
+    """
+    def __init__(self, cli_handle, recording):
+        self.cli_handle = cli_handle
+        self.recording = recording
+
+    def xrcli_exec(self, cmd):
+        result = self.cli_handle.xrcli_exec(cmd)
+        if result['status'] == 'success':
+            self.recording.add_cli(cmd, result['output'])
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self.cli_handle, name)
+
+
+def install(recording, latency=0.0, jitter=0.0, bandwidth=None, stats=None):
+    """
+    Installs the router module stand-ins (see fake_xr.install) with
+    NetconfClient and XrcliHelper replaying recording
+    :param recording: Recording to replay
+    :param latency: Seconds each round trip takes
+    :param jitter: Maximum random seconds added to or removed from the latency
+    :param bandwidth: Bytes per second the replies are received at. No limit if None
+    :param stats: TransportStats shared by all the handles created
+    :return: TransportStats the requests are counted in
+    """
+    if stats is None:
+        stats = TransportStats()
+    transport_args = dict(recording=recording, latency=latency, jitter=jitter,
+                          bandwidth=bandwidth, stats=stats)
+    fake_xr.install(xrcli_helper=functools.partial(ReplayXrcliHelper, **transport_args),
+                    netconf_client=functools.partial(ReplayNetconfClient, **transport_args))
+    return stats
@@ -0,0 +1,86 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+
+"""
+EEM script dropping the interface handle to name mapping cached by
+xr_data_collector.get_interface_name_handle_mapping
+
+The mapping only changes when interfaces are created or deleted. Scripts
+calling get_interface_name_handle_mapping with a max_age and a cache_file
+reuse the mapping cached on harddisk instead of running
+"show im database brief location all". This script deletes the cache file
+when a configuration commit creating or deleting interfaces is logged, so
+the next script run rebuilds it. The commit syslog does not tell what was
+changed: the changes of the commit are read with "show configuration
+commit changes <id>" and the cache is only invalidated if they have
+interface lines (or if they can not be read).
+
+Only the cache file is deleted. The mapping held in memory by scripts
+already running (eg: process scripts calling get_interface_name_handle_mapping
+with a max_age) keeps being used until it is max_age seconds old, so such
+scripts should use a max_age they can afford to be stale for.
+
+Required configuration:
+User and AAA configuration
+
+event manager event-trigger intf-handle-cache-trigger
+type syslog pattern "MGBL-CONFIG-6-DB_COMMIT"
+
+event manager action intf-handle-cache-action
+username <user>
+type script script-name invalidate_intf_handle_cache.py checksum sha256 <checksum>
+
+event manager policy-map intf-handle-cache-policy
+trigger event intf-handle-cache-trigger
+action intf-handle-cache-action
+
+Triggers for other events changing the interfaces (eg: line card OIR) can
+be added to the policy-map the same way.
+
+To verify:
+Check for syslog Interface handle cache invalidated
+"""
+import re
+from cisco.script_mgmt import xrlog
+from cisco.script_mgmt import xr_utils
+from iosxr import eem
+# import xr_data_collector
+xr_data_collector = xr_utils.secure_import(module_file_name="xr_data_collector.py")
+
+syslog = xrlog.getSysLogger("invalidate_intf_handle_cache")
+
+# commit id in "Use 'show configuration commit changes 1000000123' to view the changes."
+RE_COMMIT_ID = re.compile(r"show configuration commit changes (\d+)")
+# top level configuration lines creating or deleting an interface
+RE_INTF_CONFIG = re.compile(r"^(no\s+)?interface\s", re.MULTILINE)
+
+
+def commit_changes_interfaces(msg):
+    """
+    :param msg: Commit syslog message
+    :return: True if the commit has interface configuration changes, or if
+             its changes can not be read
+    """
+    match = RE_COMMIT_ID.search(msg)
+    if not match:
+        return True
+    try:
+        from iosxr.xrcli.xrcli_helper import XrcliHelper
+        result = XrcliHelper().xrcli_exec('show configuration commit changes ' + match.group(1))
+    except Exception as err:
+        syslog.warning('Unable to read the changes of commit {commit_id}: {err}'.format(
+            commit_id=match.group(1), err=err))
+        return True
+    if result['status'] != 'success':
+        return True
+    return RE_INTF_CONFIG.search(result['output']) is not None
+
+
+# event_dict consists of details of the syslog
+rc, event_dict = eem.event_reqinfo()
+msg = event_dict.get('msg', '')
+
+if commit_changes_interfaces(msg):
+    xr_data_collector.invalidate_interface_name_handle_mapping(
+        cache_file=xr_data_collector.INTF_HANDLE_CACHE_FILE)
+    syslog.info("Interface handle cache invalidated: " + msg)
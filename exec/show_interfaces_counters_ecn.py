@@ -9,74 +9,105 @@ the interfaces on the device and store the data into
 a list of dictionaries. Then a table having the ecn counters per queue
 of each interface is printed.
 
-usage: show_interfaces_counters_ecn.py [{text,json}]
+usage: show_interfaces_counters_ecn.py [{text,json,csv,ndjson}] [--watch SECONDS [--count N]]
+                                      [--source {cli,netconf}] [--profile]
 
 Arguments:
-  text/json             [text] Format of report to generate.
+  text/json/csv/ndjson  [text] Format of report to generate. csv and ndjson
+                        print a line per interface and class
+  --watch               Collect the stats every SECONDS and report the ecn marked
+                        packet and kbps rates computed from the counters, for the
+                        classes whose ecn counters changed since the previous collection
+  --count               Number of --watch reports. Until interrupted by default
+  --source              [cli] Collect the stats with "show policy-map interface all",
+                        or over netconf from the Cisco-IOS-XR-qos-ma-oper model, only
+                        the output policies being queried
+  --profile             Append the time and memory profile of the script in json
 ios#script run show_interfaces_counters_ecn.py
 ios#script run show_interfaces_counters_ecn.py arguments json
 ios#script run show_interfaces_counters_ecn.py arguments text
+ios#script run show_interfaces_counters_ecn.py arguments "--watch 5 --count 12"
+ios#script run show_interfaces_counters_ecn.py arguments "--source netconf"
 """
 
 import argparse
+import functools
+import io
 import json
+import time
 import traceback
 import sys
 from collections import OrderedDict
-from iosxr.xrcli.xrcli_helper import XrcliHelper
 from cisco.script_mgmt import xrlog
 from cisco.script_mgmt import xr_utils
 # import xr_data_collector
 xr_data_collector = xr_utils.secure_import(module_file_name="xr_data_collector.py")
+# import xr_report
+xr_report = xr_utils.secure_import(module_file_name="xr_report.py")
 
 log = xrlog.getScriptLogger('show_interfaces_counters_ecn')
 
 
-def generate_show_interfaces_counters_ecn_report(int_stats_list, report_format):
+# columns of the ecn table, keyed as in the policy map stats
+ECN_COLUMNS = [
+    xr_report.Column('Interface', 'interface-name', 16),
+    xr_report.Column('Class', 'class-name', 30),
+    xr_report.Column('Marked Pkts', 'ecn-marked-transmitted-packets', 20, '>'),
+    xr_report.Column('Marked Bytes', 'ecn-marked-transmitted-bytes', 20, '>'),
+]
+ECN_TABLE = xr_report.Table(ECN_COLUMNS)
+# keys of the class stats in the json report
+CLASS_KEYS = [column.key for column in ECN_COLUMNS[1:]]
+# columns of the --watch tables, the rates being computed from the counters
+WATCH_COLUMNS = ECN_COLUMNS[:2] + [
+    xr_report.Column('Marked pps', 'ecn-marked-pps', 20, '>'),
+    xr_report.Column('Marked Kbps', 'ecn-marked-kbps', 20, '>'),
+    xr_report.Column('Timestamp', 'timestamp', text=False),
+    xr_report.Column('Interval', 'interval', text=False),
+]
+WATCH_COUNTERS = ('ecn-marked-transmitted-packets', 'ecn-marked-transmitted-bytes')
+
+
+def gen_ecn_rows(report_intfs):
+    """
+    Rows of the ecn table, the output classes having ecn counters
+    :param report_intfs: list of (short interface name, interface stats)
+    :return: Generator of dicts, the class stats with interface-name
+    """
+    for int_name, int_stats in report_intfs:
+        for class_stats in int_stats['output-rates']:
+            if "ecn-marked-transmitted-packets" not in class_stats:
+                continue
+            row = dict(class_stats)
+            row['interface-name'] = int_name
+            yield row
+
+
+@xr_data_collector.profiled
+def generate_show_interfaces_counters_ecn_report(int_stats_list, report_format, stream=None):
     """
     Generate a table of  interface queue ecn counters
     :param int_stats_list:  List of dicts . Each dict has the interface
                                         Stats for one interface
-    :param report_format: ["text"/"json"] . report format to be retuend
-    :return: Report in text/json format having input and output tables
+    :param report_format: ["text"/"json"/"csv"/"ndjson"] . report format to be retuend
+    :param stream: File-like object the report is written to one row at a
+                   time. eg: sys.stdout. The report is returned if None
+    :return: Report in text/json/csv/ndjson format having the output ecn counters,
+             None if written to stream
     """
+    out = io.StringIO() if stream is None else stream
+
+    if report_format not in xr_report.REPORT_FORMATS:
+        out.write("Invalid report format")
+        return out.getvalue() if stream is None else None
 
-    # setting table column headers and corresponding keys in yang output
-    col_names = [
-                'Interface',
-                'Class',
-                'Marked Pkts',  'Marked Bytes',
-                ]
-    keys =      [
-                'interface-name',
-                'class-name',
-                'ecn-marked-transmitted-packets', 'ecn-marked-transmitted-bytes',
-                ]
-
-    # setting column width and text alignment
-    if report_format == "text":
-        cwidth = dict(); calign = dict()
-        cwidth['Interface'] = 16
-        calign['Interface'] = '<'
-        cwidth['Class'] = 30
-        calign['Class'] = '<'
-        cwidth['Marked Pkts'] = 20
-        calign['Marked Pkts'] = '>'
-        cwidth['Marked Bytes'] = 20
-        calign['Marked Bytes'] = '>'
-        table_len = sum(cwidth.values()) + 4
-        sline = '-' * table_len
-
-        header = ''
-        for col_name in col_names:
-            header += '{:{align}{width}}'.format(col_name, align=calign[col_name], width=cwidth[col_name])
-        in_stats_lines = out_stats_lines = ''
-    elif report_format == "json":
-        rep_list = list()
-
-    # looping through each interface and retrieving the ecn stats
-    for int_stats in sorted(int_stats_list,
-                            key=lambda item: xr_data_collector.get_interface_rsmp(item['interface-name'])):
+    with xr_data_collector.profile_phase('sort'):
+        int_stats_list = sorted(int_stats_list,
+                                key=lambda item: xr_data_collector.interface_sort_key(item['interface-name']))
+
+    # retrieving the short name of each interface
+    report_intfs = list()
+    for int_stats in int_stats_list:
 
         if xr_data_collector.is_ignore_interface(int_stats['interface-name']):
             # ignore management interfaces
@@ -88,50 +119,90 @@ def generate_show_interfaces_counters_ecn_report(int_stats_list, report_format):
         except:
             # ignore invalid interfaces
             continue
+        report_intfs.append((int_name, int_stats))
 
-        out_stats_line = ''
-        ret_int_dict = OrderedDict()
-        ret_int_dict['interface-name'] = int_name
-        ret_int_dict['output-rates'] = []
-        for class_stats in int_stats['output-rates']:
-
-            if "ecn-marked-transmitted-packets" not in class_stats:
-                continue
-            if report_format == "text":
-                out_stats_line = '{:{align}{width}}'.format(int_name,
-                                                            align=calign['Interface'], width=cwidth['Interface'])
-            elif report_format == "json":
-                class_dict = OrderedDict()
-
-            for (key_name, col_name) in zip(keys[1:], col_names[1:]):
-                val = class_stats[key_name]
-                if report_format == "text":
-                    out_stats_line += '{:{align}{width}}'.format(val,
-                                                                 align=calign[col_name], width=cwidth[col_name])
-                elif report_format == "json":
-                    class_dict[key_name] = val
-
-            if report_format == "text":
-                out_stats_lines += out_stats_line + '\n'
-            elif report_format == "json":
-                ret_int_dict['output-rates'].append(class_dict)
+    with xr_data_collector.profile_phase('format'):
         if report_format == "json":
-            rep_list.append(ret_int_dict)
+            # writing the ecn counters of each interface
+            json_writer = xr_report.JsonWriter(out)
+            for int_name, int_stats in report_intfs:
+                ret_int_dict = OrderedDict()
+                ret_int_dict['interface-name'] = int_name
+                ret_int_dict['output-rates'] = [OrderedDict((key_name, class_stats[key_name])
+                                                            for key_name in CLASS_KEYS)
+                                                for class_stats in int_stats['output-rates']
+                                                if "ecn-marked-transmitted-packets" in class_stats]
+                json_writer.write(ret_int_dict)
+            json_writer.close()
+        else:
+            xr_report.write_report(out, report_format, [(ECN_TABLE, gen_ecn_rows(report_intfs))])
+
+    return out.getvalue() if stream is None else None
 
-    # consolidating all the data collected and generating report
-    if report_format == "text":
 
-        rep = sline + '\n'
-        rep += header + '\n'
-        rep += sline + '\n'
-        rep += out_stats_lines
-        rep += sline + '\n'
-    elif report_format == "json":
-        rep = json.dumps(rep_list, indent=4, sort_keys=False)
-    else:
-        rep = "Invalid report format"
+def gen_watch_rows(rate_rows, timestamp):
+    """
+    Rows of a --watch table, with the short interface names
+    :param rate_rows: list of rows of xr_counter_rates.RateEngine.update
+    :param timestamp: Time of the sample
+    :return: Generator of the rows of the valid interfaces, in interface order
+    """
+    rate_rows = sorted(rate_rows, key=lambda item: xr_data_collector.interface_sort_key(item['interface-name']))
+    for rate_row in rate_rows:
+        if xr_data_collector.is_ignore_interface(rate_row['interface-name']):
+            # ignore management interfaces
+            continue
+        try:
+            int_name = xr_data_collector.gen_interface_type_name(name=rate_row['interface-name'],
+                                                                 name_format='short')
+        except:
+            # ignore invalid interfaces
+            continue
+        yield {'interface-name': int_name,
+               'class-name': rate_row['class-name'],
+               'ecn-marked-pps': round(rate_row.get('ecn-marked-transmitted-packets-rate', 0.0), 1),
+               'ecn-marked-kbps': round(rate_row.get('ecn-marked-transmitted-bytes-rate', 0.0) * 8 / 1000, 1),
+               'timestamp': round(timestamp, 3),
+               'interval': round(rate_row['interval'], 3)}
+
+
+def watch_ecn_report(get_policy_map, report_format, interval, count=None, stream=None):
+    """
+    Collects the policy map stats every interval seconds and writes a table
+    of the ecn marking rates of the output classes whose ecn counters
+    changed since the previous collection
+    :param get_policy_map: Function (row_filter) returning the policy map stats,
+                           eg: xr_data_collector.get_interface_policy_map on a CLI handle
+    :param report_format: ["text"/"json"/"csv"/"ndjson"] . report format to be written
+    :param interval: Seconds between two collections
+    :param count: Number of tables to write, until interrupted if None
+    :param stream: File-like object the report is written to. sys.stdout by default
+    :return: None
+    """
+    # import xr_counter_rates, only needed by --watch
+    xr_counter_rates = xr_utils.secure_import(module_file_name="xr_counter_rates.py")
+    out = sys.stdout if stream is None else stream
+    report_writer = xr_report.ReportWriter(out, report_format)
+    engine = xr_counter_rates.RateEngine(key=xr_counter_rates.POLICY_MAP_KEY, counters=WATCH_COUNTERS)
+
+    def row_filter(intf_name, direction, class_stats):
+        # only the output classes have ecn counters
+        return direction == 'output' and 'ecn-marked-transmitted-packets' in class_stats
 
-    return rep
+    def sample():
+        int_q_stats_list = get_policy_map(row_filter=row_filter)
+        return xr_data_collector.iter_policy_map_rows(int_q_stats_list)
+
+    try:
+        for timestamp, rate_rows in xr_counter_rates.watch(sample, engine, interval, count):
+            title = '{time} ecn marking rates over {interval}s, {count} classes changed'.format(
+                time=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)),
+                interval=interval, count=len(rate_rows))
+            table = xr_report.Table(WATCH_COLUMNS, title=title)
+            report_writer.write_table(table, gen_watch_rows(rate_rows, timestamp))
+            out.flush()
+    finally:
+        report_writer.close()
 
 
 if __name__ == '__main__':
@@ -140,26 +211,56 @@ if __name__ == '__main__':
         # command line parameters parsing
         parser = argparse.ArgumentParser()
         parser.add_argument('report_format',
-                            help='[text/json] Format of report to generate.',
+                            help='[text/json/csv/ndjson] Format of report to generate.',
                             default='text',
                             nargs='?'
                             )
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Report the ecn marking rates computed from the counters every SECONDS')
+        parser.add_argument('--count', type=int, metavar='N',
+                            help='Number of --watch reports. Until interrupted by default')
+        parser.add_argument('--source', choices=['cli', 'netconf'], default='cli',
+                            help='Collect the stats with the CLI or over netconf from the qos-ma-oper model')
+        parser.add_argument('--profile',
+                            help='Append the time and memory profile of the script in json',
+                            action='store_true')
         args = parser.parse_args()
+        if args.count is not None and args.watch is None:
+            parser.error('--count requires --watch')
+        if args.profile:
+            profiler = xr_data_collector.enable_profiling(memory=True)
 
-        # start xr cli helper session on router
-        log.debug('Starting CLI helper session')
-        cli_handle = XrcliHelper()
+        if args.source == 'netconf':
+            # start netconf session on router, only the output policies have ecn counters
+            log.debug('Starting netconf session')
+            nc_con = xr_data_collector.new_netconf_session()
+            get_policy_map = functools.partial(xr_data_collector.get_interface_qos_stats, nc_con,
+                                               direction='output')
+        else:
+            # start xr cli helper session on router
+            log.debug('Starting CLI helper session')
+            from iosxr.xrcli.xrcli_helper import XrcliHelper
+            cli_handle = XrcliHelper()
+            get_policy_map = functools.partial(xr_data_collector.get_interface_policy_map, cli_handle)
 
-        # get int policy map stats for all the interfaces
-        log.debug('Collecting policy map stats from the router')
-        int_q_stats_list = xr_data_collector.get_interface_policy_map(cli_handle)
+        if args.watch is not None:
+            # rates of the classes changed are printed after each collection
+            log.debug('Watching policy map stats every {interval}s'.format(interval=args.watch))
+            watch_ecn_report(get_policy_map, args.report_format, args.watch, args.count, stream=sys.stdout)
+        else:
+            # get int policy map stats for all the interfaces
+            log.debug('Collecting policy map stats from the router')
+            int_q_stats_list = get_policy_map()
 
-        # generate and print report
-        log.debug('Generating report')
-        report = generate_show_interfaces_counters_ecn_report(int_q_stats_list,
-                                                              args.report_format)
-        log.debug('Printing report')
-        print(report, flush=True)
+            # generate and print report
+            log.debug('Generating report')
+            # rows are printed as they are generated
+            generate_show_interfaces_counters_ecn_report(int_q_stats_list, args.report_format,
+                                                         stream=sys.stdout)
+        print(flush=True)
+        if args.profile:
+            log.info(profiler.summary())
+            print(json.dumps({'profile': profiler.as_dict()}, indent=4), flush=True)
 
     except Exception as err:
         log.debug("Script error: {err}".format(err=traceback.format_exc()))
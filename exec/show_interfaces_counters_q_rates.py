@@ -9,81 +9,171 @@ the interfaces on the device and store the data into
 a list of dictionaries. Then a table having the load rates
 of each interface is printed.
 
-usage: show_interfaces_counters_q_rates.py [{text,json}]
+usage: show_interfaces_counters_q_rates.py [{text,json,csv,ndjson}] [-i INTERFACE] [-c CLASS]
+                                           [-d {input,output}] [-t THRESHOLD] [--top N]
+                                           [--sort-by {drop-rate,tx-rate}]
+                                           [--watch SECONDS [--count N]] [--source {cli,netconf}]
+                                           [--profile]
 
 Arguments:
-  text/json             [text] Format of report to generate.
+  text/json/csv/ndjson  [text] Format of report to generate. csv and ndjson
+                        print a line per interface, direction and class
+  -i/--interface        Regular expression the full interface names are searched with
+  -c/--class            Name of a class to report. Can be repeated
+  -d/--direction        input/output. Direction to report
+  -t/--threshold        Minimum rate in kbps, of the --sort-by rate, of the classes reported
+  --top                 Report the N classes having the highest --sort-by rate, in
+                        a single table. In json, an array of the classes
+  --sort-by             [drop-rate] Rate of --top and --threshold
+  --watch               Collect the stats every SECONDS and report the packet and
+                        kbps rates computed from the counters, for the classes
+                        whose counters changed since the previous collection
+  --count               Number of --watch reports. Until interrupted by default
+  --source              [cli] Collect the stats with "show policy-map interface all",
+                        or over netconf from the Cisco-IOS-XR-qos-ma-oper model, only
+                        the --direction requested being queried
+  --profile             Append the time and memory profile of the script in json
 Example:
 ios#script run show_interfaces_counters_q_rates.py
 ios#script run show_interfaces_counters_q_rates.py arguments json
 ios#script run show_interfaces_counters_q_rates.py arguments text
+ios#script run show_interfaces_counters_q_rates.py arguments "--top 20 -d output"
+ios#script run show_interfaces_counters_q_rates.py arguments "-i ^HundredGigE0/1/ -t 1000 --sort-by tx-rate"
+ios#script run show_interfaces_counters_q_rates.py arguments "--watch 5 --count 12 -d output"
+ios#script run show_interfaces_counters_q_rates.py arguments "--source netconf --top 20"
 """
 
 import argparse
+import functools
+import io
 import json
+import re
+import time
 import traceback
 import sys
 from collections import OrderedDict
-from iosxr.xrcli.xrcli_helper import XrcliHelper
 from cisco.script_mgmt import xrlog
 from cisco.script_mgmt import xr_utils
 # import xr_data_collector
 xr_data_collector = xr_utils.secure_import(module_file_name="xr_data_collector.py")
+# import xr_report
+xr_report = xr_utils.secure_import(module_file_name="xr_report.py")
 
 log = xrlog.getScriptLogger('show_interfaces_counters_q_rates')
 
 
-def generate_show_interfaces_counters_q_rates_report(int_stats_list, report_format):
+# columns of the input and output rates tables, keyed as in the policy map stats
+RATES_COLUMNS = [
+    xr_report.Column('Interface', 'interface-name', 16),
+    xr_report.Column('Direction', 'direction', text=False),
+    xr_report.Column('Class', 'class-name', 30),
+    xr_report.Column('Tx Pkts', 'transmitted-packets', 16, '>'),
+    xr_report.Column('Tx Bytes', 'transmitted-bytes', 20, '>'),
+    xr_report.Column('Tx Kbps', 'transmitted-rate', 10, '>'),
+    xr_report.Column('Drop Pkts', 'total-dropped-packets', 16, '>'),
+    xr_report.Column('Drop Bytes', 'total-dropped-bytes', 16, '>'),
+    xr_report.Column('Drop Kbps', 'total-dropped-rate', 10, '>'),
+]
+RATES_TABLES = [('input', xr_report.Table(RATES_COLUMNS, title='Input')),
+                ('output', xr_report.Table(RATES_COLUMNS, title='Output'))]
+# keys of the class stats in the json report
+CLASS_KEYS = [column.key for column in RATES_COLUMNS[2:]]
+# columns of the top classes table, the direction being shown
+TOP_COLUMNS = RATES_COLUMNS[:1] + [xr_report.Column('Direction', 'direction', 10)] + RATES_COLUMNS[2:]
+# columns of the --watch tables, the rates being computed from the counters
+WATCH_COLUMNS = TOP_COLUMNS[:3] + [
+    xr_report.Column('Tx pps', 'transmitted-pps', 14, '>'),
+    xr_report.Column('Tx Kbps', 'transmitted-kbps', 14, '>'),
+    xr_report.Column('Drop pps', 'total-dropped-pps', 14, '>'),
+    xr_report.Column('Drop Kbps', 'total-dropped-kbps', 14, '>'),
+    xr_report.Column('Timestamp', 'timestamp', text=False),
+    xr_report.Column('Interval', 'interval', text=False),
+]
+WATCH_COUNTERS = ('transmitted-packets', 'transmitted-bytes', 'total-dropped-packets', 'total-dropped-bytes')
+# --sort-by values to the key of the rate in the class stats
+SORT_BY_KEYS = {'drop-rate': 'total-dropped-rate', 'tx-rate': 'transmitted-rate'}
+
+
+def class_rate_getter(sort_by):
+    """
+    :param sort_by: One of SORT_BY_KEYS
+    :return: Function returning the --sort-by rate of a class stats dict as int
+    """
+    rate_key = SORT_BY_KEYS[sort_by]
+    return lambda class_stats: int(class_stats.get(rate_key, 0))
+
+
+def build_row_filter(interface=None, classes=None, direction=None, threshold=None, sort_by='drop-rate'):
+    """
+    Builds the row filter of the policy map getters from the report arguments
+    :param interface: Regular expression searched in the full interface names
+    :param classes: List of class names to keep
+    :param direction: 'input' or 'output', direction to keep
+    :param threshold: Minimum --sort-by rate of the classes to keep
+    :param sort_by: One of SORT_BY_KEYS
+    :return: Function (interface name, direction, class dict) returning True
+             for the classes to keep, None if everything is kept
+    """
+    checks = list()
+    if interface:
+        search_intf = re.compile(interface).search
+        checks.append(lambda intf_name, intf_direction, class_stats: search_intf(intf_name) is not None)
+    if classes:
+        class_names = frozenset(classes)
+        checks.append(lambda intf_name, intf_direction, class_stats: class_stats['class-name'] in class_names)
+    if direction:
+        checks.append(lambda intf_name, intf_direction, class_stats: intf_direction == direction)
+    if threshold is not None:
+        class_rate = class_rate_getter(sort_by)
+        checks.append(lambda intf_name, intf_direction, class_stats: class_rate(class_stats) >= threshold)
+    if not checks:
+        return None
+    if len(checks) == 1:
+        return checks[0]
+    return lambda intf_name, intf_direction, class_stats: all(check(intf_name, intf_direction, class_stats)
+                                                               for check in checks)
+
+
+def gen_rates_rows(report_intfs, direction):
+    """
+    Rows of the rates table of a direction
+    :param report_intfs: list of (short interface name, interface stats)
+    :param direction: 'input' or 'output'
+    :return: Generator of dicts, the class stats with interface-name and direction
+    """
+    for int_name, int_stats in report_intfs:
+        for class_stats in int_stats[direction + '-rates']:
+            row = dict(class_stats)
+            row['interface-name'] = int_name
+            row['direction'] = direction
+            yield row
+
+
+@xr_data_collector.profiled
+def generate_show_interfaces_counters_q_rates_report(int_stats_list, report_format, stream=None):
     """
     Generate a table of interface queue transmitted and dropped counters
     :param int_stats_list:  List of dicts . Each dict has the interface
                                         Stats for one interface
-    :param report_format: ["text"/"json"] . report format to be retuend
-    :return: Report in text/json format having input and output tables
-    """
-
-    # setting table column headers and corresponding keys in yang output
-    col_names = [
-                'Interface',
-                'Class',
-                'Tx Pkts',  'Tx Bytes', 'Tx Kbps',
-                'Drop Pkts', 'Drop Bytes', 'Drop Kbps',
-                ]
-    keys =      [
-                'interface-name',
-                'class-name',
-                'transmitted-packets', 'transmitted-bytes', 'transmitted-rate',
-                'total-dropped-packets', 'total-dropped-bytes', 'total-dropped-rate',
-                ]
-
-    # setting column width and text alignment
-    if report_format == "text":
-        cwidth = dict(); calign = dict()
-        cwidth['Interface'] = 16
-        calign['Interface'] = '<'
-        cwidth['Class'] = 30
-        calign['Class'] = '<'
-        cwidth['Tx Pkts'] = 16
-        cwidth['Drop Pkts'] = 16
-        cwidth['Tx Bytes'] = 20
-        cwidth['Drop Bytes'] = 16
-        cwidth['Tx Kbps'] = 10
-        cwidth['Drop Kbps'] = 10
-        for col_name in col_names[2:]:
-            calign[col_name] = '>'
-        table_len = sum(cwidth.values()) + 4
-        sline = '-' * table_len
-
-        header = ''
-        for col_name in col_names:
-            header += '{:{align}{width}}'.format(col_name, align=calign[col_name], width=cwidth[col_name])
-        in_stats_lines = out_stats_lines = ''
-    elif report_format == "json":
-        rep_list = list()
-
-    # looping through each interface and retrieving the input/output rates
-    for int_stats in sorted(int_stats_list,
-                            key=lambda item: xr_data_collector.get_interface_rsmp(item['interface-name'])):
+    :param report_format: ["text"/"json"/"csv"/"ndjson"] . report format to be retuend
+    :param stream: File-like object the report is written to one row at a
+                   time. eg: sys.stdout. The report is returned if None
+    :return: Report in text/json/csv/ndjson format having input and output tables,
+             None if written to stream
+    """
+    out = io.StringIO() if stream is None else stream
+
+    if report_format not in xr_report.REPORT_FORMATS:
+        out.write("Invalid report format")
+        return out.getvalue() if stream is None else None
+
+    with xr_data_collector.profile_phase('sort'):
+        int_stats_list = sorted(int_stats_list,
+                                key=lambda item: xr_data_collector.interface_sort_key(item['interface-name']))
+
+    # retrieving the short name of each interface
+    report_intfs = list()
+    for int_stats in int_stats_list:
 
         if xr_data_collector.is_ignore_interface(int_stats['interface-name']):
             # ignore management interfaces
@@ -95,79 +185,139 @@ def generate_show_interfaces_counters_q_rates_report(int_stats_list, report_form
         except:
             # ignore invalid interfaces
             continue
+        report_intfs.append((int_name, int_stats))
 
-        in_stats_line = out_stats_line = ''
-        ret_int_dict = OrderedDict()
-        ret_int_dict['Interface'] = int_name
-        ret_int_dict['input-rates'] = []
-        ret_int_dict['output-rates'] = []
-
-        # retrieving input rates
-        for class_stats in int_stats['input-rates']:
-
-            if report_format == "text":
-                in_stats_line = '{:{align}{width}}'.format(int_name,
-                                                           align=calign['Interface'], width=cwidth['Interface'])
-            elif report_format == "json":
-                class_dict = OrderedDict()
-
-            for (key_name, col_name) in zip(keys[1:], col_names[1:]):
-                val = class_stats[key_name]
-                if report_format == "text":
-                    in_stats_line += '{:{align}{width}}'.format(val,
-                                                                align=calign[col_name], width=cwidth[col_name])
-                elif report_format == "json":
-                    class_dict[key_name] = val
-
-            if report_format == "text":
-                in_stats_lines += in_stats_line + '\n'
-            elif report_format == "json":
-                ret_int_dict['input-rates'].append(class_dict)
-
-        # retrieving output rates
-        for class_stats in int_stats['output-rates']:
-
-            if report_format == "text":
-                out_stats_line = '{:{align}{width}}'.format(int_name,
-                                                            align=calign['Interface'], width=cwidth['Interface'])
-            elif report_format == "json":
-                class_dict = OrderedDict()
-
-            for (key_name, col_name) in zip(keys[1:], col_names[1:]):
-                val = class_stats[key_name]
-                if report_format == "text":
-                    out_stats_line += '{:{align}{width}}'.format(val,
-                                                                 align=calign[col_name], width=cwidth[col_name])
-                elif report_format == "json":
-                    class_dict[key_name] = val
-
-            if report_format == "text":
-                out_stats_lines += out_stats_line + '\n'
-            elif report_format == "json":
-                ret_int_dict['output-rates'].append(class_dict)
+    with xr_data_collector.profile_phase('format'):
         if report_format == "json":
-            rep_list.append(ret_int_dict)
-
-    # consolidating all the data collected and generating report
-    if report_format == "text":
-
-        rep = sline + '\n'
-        rep += 'Input\n'
-        rep += header + '\n'
-        rep += sline + '\n'
-        rep += in_stats_lines
-        rep += sline + '\n\n'
-        rep += 'Output\n'
-        rep += header + '\n'
-        rep += sline + '\n'
-        rep += out_stats_lines
-        rep += sline + '\n'
-    elif report_format == "json":
-        rep = json.dumps(rep_list, indent=4, sort_keys=False)
-    else:
-        rep = "Invalid report format"
-
-    return rep
+            # writing the input/output rates of each interface
+            json_writer = xr_report.JsonWriter(out)
+            for int_name, int_stats in report_intfs:
+                ret_int_dict = OrderedDict()
+                ret_int_dict['Interface'] = int_name
+                for direction in ('input', 'output'):
+                    ret_int_dict[direction + '-rates'] = [OrderedDict((key_name, class_stats[key_name])
+                                                                      for key_name in CLASS_KEYS)
+                                                          for class_stats in int_stats[direction + '-rates']]
+                json_writer.write(ret_int_dict)
+            json_writer.close()
+        else:
+            # writing the input rates table then the output rates table
+            xr_report.write_report(out, report_format,
+                                   [(table, gen_rates_rows(report_intfs, direction))
+                                    for direction, table in RATES_TABLES])
+
+    return out.getvalue() if stream is None else None
+
+
+def gen_top_rows(top_rows):
+    """
+    Rows of the top classes table, with the short interface names
+    :param top_rows: list of rows of xr_data_collector.get_interface_policy_map_top
+    :return: Generator of the rows of the valid interfaces
+    """
+    for row in top_rows:
+        if xr_data_collector.is_ignore_interface(row['interface-name']):
+            # ignore management interfaces
+            continue
+        try:
+            int_name = xr_data_collector.gen_interface_type_name(name=row['interface-name'],
+                                                                 name_format='short')
+        except:
+            # ignore invalid interfaces
+            continue
+        row = dict(row)
+        row['interface-name'] = int_name
+        yield row
+
+
+@xr_data_collector.profiled
+def generate_top_q_rates_report(top_rows, report_format, sort_by='drop-rate', stream=None):
+    """
+    Generate a table of the classes having the highest rates, highest first
+    :param top_rows: list of rows of xr_data_collector.get_interface_policy_map_top
+    :param report_format: ["text"/"json"/"csv"/"ndjson"] . report format to be retuend
+    :param sort_by: One of SORT_BY_KEYS, the rate the rows are ranked by
+    :param stream: File-like object the report is written to one row at a
+                   time. eg: sys.stdout. The report is returned if None
+    :return: Report in text/json/csv/ndjson format, None if written to stream
+    """
+    out = io.StringIO() if stream is None else stream
+
+    if report_format not in xr_report.REPORT_FORMATS:
+        out.write("Invalid report format")
+        return out.getvalue() if stream is None else None
+
+    table = xr_report.Table(TOP_COLUMNS, title='Top {count} classes by {sort_by}'.format(count=len(top_rows),
+                                                                                         sort_by=sort_by))
+    with xr_data_collector.profile_phase('format'):
+        xr_report.write_report(out, report_format, [(table, gen_top_rows(top_rows))])
+
+    return out.getvalue() if stream is None else None
+
+
+def gen_watch_rows(rate_rows, timestamp):
+    """
+    Rows of a --watch table, with the short interface names
+    :param rate_rows: list of rows of xr_counter_rates.RateEngine.update
+    :param timestamp: Time of the sample
+    :return: Generator of the rows of the valid interfaces, in interface order
+    """
+    rate_rows = sorted(rate_rows, key=lambda item: xr_data_collector.interface_sort_key(item['interface-name']))
+    for rate_row in rate_rows:
+        if xr_data_collector.is_ignore_interface(rate_row['interface-name']):
+            # ignore management interfaces
+            continue
+        try:
+            int_name = xr_data_collector.gen_interface_type_name(name=rate_row['interface-name'],
+                                                                 name_format='short')
+        except:
+            # ignore invalid interfaces
+            continue
+        yield {'interface-name': int_name,
+               'direction': rate_row['direction'],
+               'class-name': rate_row['class-name'],
+               'transmitted-pps': round(rate_row.get('transmitted-packets-rate', 0.0), 1),
+               'transmitted-kbps': round(rate_row.get('transmitted-bytes-rate', 0.0) * 8 / 1000, 1),
+               'total-dropped-pps': round(rate_row.get('total-dropped-packets-rate', 0.0), 1),
+               'total-dropped-kbps': round(rate_row.get('total-dropped-bytes-rate', 0.0) * 8 / 1000, 1),
+               'timestamp': round(timestamp, 3),
+               'interval': round(rate_row['interval'], 3)}
+
+
+def watch_q_rates_report(get_policy_map, report_format, interval, count=None, row_filter=None, stream=None):
+    """
+    Collects the policy map stats every interval seconds and writes a table
+    of the rates of the classes whose counters changed since the previous
+    collection
+    :param get_policy_map: Function (row_filter) returning the policy map stats,
+                           eg: xr_data_collector.get_interface_policy_map on a CLI handle
+    :param report_format: ["text"/"json"/"csv"/"ndjson"] . report format to be written
+    :param interval: Seconds between two collections
+    :param count: Number of tables to write, until interrupted if None
+    :param row_filter: Row filter of xr_data_collector.get_interface_policy_map
+    :param stream: File-like object the report is written to. sys.stdout by default
+    :return: None
+    """
+    # import xr_counter_rates, only needed by --watch
+    xr_counter_rates = xr_utils.secure_import(module_file_name="xr_counter_rates.py")
+    out = sys.stdout if stream is None else stream
+    report_writer = xr_report.ReportWriter(out, report_format)
+    engine = xr_counter_rates.RateEngine(key=xr_counter_rates.POLICY_MAP_KEY, counters=WATCH_COUNTERS)
+
+    def sample():
+        int_q_stats_list = get_policy_map(row_filter=row_filter)
+        return xr_data_collector.iter_policy_map_rows(int_q_stats_list)
+
+    try:
+        for timestamp, rate_rows in xr_counter_rates.watch(sample, engine, interval, count):
+            title = '{time} rates over {interval}s, {count} classes changed'.format(
+                time=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)),
+                interval=interval, count=len(rate_rows))
+            table = xr_report.Table(WATCH_COLUMNS, title=title)
+            report_writer.write_table(table, gen_watch_rows(rate_rows, timestamp))
+            out.flush()
+    finally:
+        report_writer.close()
 
 
 if __name__ == '__main__':
@@ -176,26 +326,85 @@ if __name__ == '__main__':
         # command line parameters parsing
         parser = argparse.ArgumentParser()
         parser.add_argument('report_format',
-                            help='[text/json] Format of report to generate.',
+                            help='[text/json/csv/ndjson] Format of report to generate.',
                             default='text',
                             nargs='?'
                             )
+        parser.add_argument('-i', '--interface',
+                            help='Regular expression the full interface names are searched with')
+        parser.add_argument('-c', '--class', dest='classes', action='append',
+                            help='Name of a class to report. Can be repeated')
+        parser.add_argument('-d', '--direction', choices=['input', 'output'],
+                            help='Direction to report')
+        parser.add_argument('-t', '--threshold', type=int,
+                            help='Minimum rate in kbps, of the --sort-by rate, of the classes reported')
+        parser.add_argument('--top', type=int, metavar='N',
+                            help='Report the N classes having the highest --sort-by rate')
+        parser.add_argument('--sort-by', choices=sorted(SORT_BY_KEYS), default='drop-rate',
+                            help='Rate of --top and --threshold')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Report the rates computed from the counters every SECONDS')
+        parser.add_argument('--count', type=int, metavar='N',
+                            help='Number of --watch reports. Until interrupted by default')
+        parser.add_argument('--source', choices=['cli', 'netconf'], default='cli',
+                            help='Collect the stats with the CLI or over netconf from the qos-ma-oper model')
+        parser.add_argument('--profile',
+                            help='Append the time and memory profile of the script in json',
+                            action='store_true')
         args = parser.parse_args()
-
-        # start xr cli helper session on router
-        log.debug('Starting CLI helper session')
-        cli_handle = XrcliHelper()
-
-        # get int policy map stats for all the interfaces
-        log.debug('Collecting policy map stats from the router')
-        int_q_stats_list = xr_data_collector.get_interface_policy_map(cli_handle)
-
-        # generate and print report
-        log.debug('Generating report')
-        report = generate_show_interfaces_counters_q_rates_report(int_q_stats_list,
-                                                                  args.report_format)
-        log.debug('Printing report')
-        print(report, flush=True)
+        if args.count is not None and args.watch is None:
+            parser.error('--count requires --watch')
+        if args.watch is not None and args.top is not None:
+            parser.error('--top and --watch are exclusive')
+        if args.profile:
+            profiler = xr_data_collector.enable_profiling(memory=True)
+
+        if args.source == 'netconf':
+            # start netconf session on router, only the direction reported is queried
+            log.debug('Starting netconf session')
+            nc_con = xr_data_collector.new_netconf_session()
+            get_policy_map = functools.partial(xr_data_collector.get_interface_qos_stats, nc_con,
+                                               direction=args.direction)
+            get_policy_map_top = functools.partial(xr_data_collector.get_interface_qos_stats_top, nc_con,
+                                                   direction=args.direction)
+        else:
+            # start xr cli helper session on router
+            log.debug('Starting CLI helper session')
+            from iosxr.xrcli.xrcli_helper import XrcliHelper
+            cli_handle = XrcliHelper()
+            get_policy_map = functools.partial(xr_data_collector.get_interface_policy_map, cli_handle)
+            get_policy_map_top = functools.partial(xr_data_collector.get_interface_policy_map_top, cli_handle)
+
+        # classes left out are dropped while parsing
+        row_filter = build_row_filter(args.interface, args.classes, args.direction, args.threshold,
+                                      args.sort_by)
+
+        if args.watch is not None:
+            # rates of the classes changed are printed after each collection
+            log.debug('Watching policy map stats every {interval}s'.format(interval=args.watch))
+            watch_q_rates_report(get_policy_map, args.report_format, args.watch, args.count, row_filter,
+                                 stream=sys.stdout)
+        elif args.top is not None:
+            # get the policy map stats of the top classes
+            log.debug('Collecting the top {top} classes by {sort_by} from the router'.format(top=args.top,
+                                                                                            sort_by=args.sort_by))
+            top_rows = get_policy_map_top(args.top, class_rate_getter(args.sort_by), row_filter=row_filter)
+            log.debug('Generating report')
+            generate_top_q_rates_report(top_rows, args.report_format, args.sort_by, stream=sys.stdout)
+        else:
+            # get int policy map stats for all the interfaces
+            log.debug('Collecting policy map stats from the router')
+            int_q_stats_list = get_policy_map(row_filter=row_filter)
+
+            # generate and print report
+            log.debug('Generating report')
+            # rows are printed as they are generated
+            generate_show_interfaces_counters_q_rates_report(int_q_stats_list, args.report_format,
+                                                             stream=sys.stdout)
+        print(flush=True)
+        if args.profile:
+            log.info(profiler.summary())
+            print(json.dumps({'profile': profiler.as_dict()}, indent=4), flush=True)
 
     except Exception as err:
         log.debug("Script error: {err}".format(err=traceback.format_exc()))
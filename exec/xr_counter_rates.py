@@ -0,0 +1,187 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+"""
+Counter delta and rate engine for the data collected by xr_data_collector.
+
+A RateEngine keeps the previous sample of each row, indexed by its key, and
+turns every new sample into per row deltas and per second rates. Counter
+wraparound and counter clears are told apart, and only the rows whose
+counters changed are returned.
+
+Example:
+    rates = RateEngine(key=POLICY_MAP_KEY, counters=POLICY_MAP_COUNTERS)
+    while True:
+        int_q_stats_list = xr_data_collector.get_interface_policy_map(cli_handle)
+        rows = xr_data_collector.iter_policy_map_rows(int_q_stats_list)
+        for row in rates.update(rows):
+            print(row['interface-name'], row['class-name'], row['transmitted-packets-rate'])
+        time.sleep(10)
+"""
+import logging
+import time
+
+log = logging.getLogger("xr_counter_rates")
+
+# keys and counters of the rows of xr_data_collector.iter_policy_map_rows
+POLICY_MAP_KEY = ('interface-name', 'direction', 'class-name')
+POLICY_MAP_COUNTERS = ('transmitted-packets', 'transmitted-bytes',
+                       'total-dropped-packets', 'total-dropped-bytes',
+                       'ecn-marked-transmitted-packets', 'ecn-marked-transmitted-bytes')
+
+# keys and counters of the rows of xr_data_collector.get_hardware_drops
+HARDWARE_DROPS_KEY = ('node-name', 'npu-id', 'trap-type')
+HARDWARE_DROPS_COUNTERS = ('packets-accepted', 'packets-dropped')
+
+# keys and counters of the rows of xr_data_collector.get_controller_npu_traps_stats
+NPU_TRAPS_KEY = ('node-name', 'npu-id', 'trap-id')
+NPU_TRAPS_COUNTERS = ('packet-accepted', 'packet-dropped')
+
+
+class RateEngine(object):
+    """
+    Incremental delta and rate computation over successive samples of rows.
+    Each output row has the key fields of the row, 'interval' (seconds since
+    the previous sample of the row) and for each counter <counter>-delta and
+    <counter>-rate (per second). Kbps rates are rate * 8 / 1000 of the bytes.
+    """
+
+    def __init__(self, key, counters=None, counter_bits=64):
+        """
+        :param key: tuple of the names of the fields identifying a row
+        :param counters: names of the counter fields. If None every field,
+                         other than the key ones, holding an integer is a counter
+        :param counter_bits: Width of the counters, used to detect wraparound
+        """
+        self.key = tuple(key)
+        self.counters = tuple(counters) if counters is not None else None
+        self.modulus = 2 ** counter_bits
+        # row key to (timestamp, dict of counter name to value) of the previous sample
+        self._prev = dict()
+        self.wraps = 0
+        self.resets = 0
+
+    def update(self, rows, timestamp=None, prune=True):
+        """
+        Feed a new sample and compute the deltas and rates since the previous one
+        :param rows: iterable of dictionaries, one per row (eg: a collector
+                     result or a CounterTable)
+        :param timestamp: Time the sample was taken. Defaults to now
+        :param prune: Forget the rows missing from this sample
+        :return: list of dictionaries for the rows whose counters changed
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        ret_list = list()
+        seen = dict()
+        for row in rows:
+            row_key = tuple(row.get(name) for name in self.key)
+            counters = self._read_counters(row)
+            seen[row_key] = (timestamp, counters)
+
+            prev = self._prev.get(row_key)
+            if prev is None:
+                continue
+            prev_time, prev_counters = prev
+            interval = timestamp - prev_time
+            if interval <= 0:
+                continue
+
+            rate_dict = None
+            for name, value in counters.items():
+                prev_value = prev_counters.get(name)
+                if prev_value is None or value == prev_value:
+                    continue
+                if rate_dict is None:
+                    rate_dict = dict(zip(self.key, row_key))
+                    rate_dict['interval'] = interval
+                delta = self._delta(prev_value, value)
+                rate_dict[name + '-delta'] = delta
+                rate_dict[name + '-rate'] = delta / interval
+            if rate_dict is not None:
+                # counters that did not move are reported as 0
+                for name in counters:
+                    if name + '-delta' not in rate_dict and name in prev_counters:
+                        rate_dict[name + '-delta'] = 0
+                        rate_dict[name + '-rate'] = 0.0
+                ret_list.append(rate_dict)
+
+        if prune:
+            self._prev = seen
+        else:
+            self._prev.update(seen)
+        return ret_list
+
+    def reset(self):
+        """
+        Forget all the previous samples
+        :return: None
+        """
+        self._prev.clear()
+
+    def __len__(self):
+        return len(self._prev)
+
+    def _read_counters(self, row):
+        """
+        :return: dict of counter name to integer value of a row
+        """
+        counters = dict()
+        if self.counters is None:
+            names = [name for name in row if name not in self.key]
+        else:
+            names = self.counters
+        for name in names:
+            value = row.get(name)
+            if type(value) == int:
+                counters[name] = value
+            elif type(value) == str and value.isdigit():
+                counters[name] = int(value)
+        return counters
+
+    def _delta(self, prev_value, value):
+        """
+        Difference between two samples of a counter. A counter going down has
+        either wrapped around or been cleared: it is taken as a wraparound when
+        the wrapped difference is less than half the counter range, and as a
+        clear (counting from 0) otherwise.
+        """
+        if value >= prev_value:
+            return value - prev_value
+        wrapped = value + self.modulus - prev_value
+        if wrapped < self.modulus // 2:
+            self.wraps += 1
+            return wrapped
+        self.resets += 1
+        return value
+
+
+def watch(sample, engine, interval, count=None):
+    """
+    Takes a sample every interval seconds and feeds it to a RateEngine. The
+    samples are scheduled from the start time, the time taken to collect
+    them does not delay the next ones, and a late sample restarts the schedule.
+    :param sample: Function returning the rows of a sample
+    :param engine: RateEngine the samples are fed to
+    :param interval: Seconds between two samples
+    :param count: Number of rate samples to yield, forever if None
+    :return: generator of (timestamp, list of the rows whose counters changed,
+             see RateEngine.update), from the second sample on
+    """
+    num = 0
+    next_time = time.monotonic()
+    while True:
+        timestamp = time.time()
+        rate_rows = engine.update(sample(), timestamp)
+        if num:
+            yield timestamp, rate_rows
+        if count is not None and num >= count:
+            return
+        num += 1
+
+        next_time += interval
+        delay = next_time - time.monotonic()
+        if delay < 0:
+            log.warning('Sample late by {delay:.1f}s'.format(delay=-delay))
+            next_time = time.monotonic()
+            continue
+        time.sleep(delay)
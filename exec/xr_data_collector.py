@@ -1,391 +1,2039 @@
 # Copyright (c) 2021-2022 by Cisco Systems, Inc.
 # All rights reserved.
+import array
+import contextlib
+import functools
 import logging
-import xmltodict
+import os
 import re
+import sys
+import threading
+import time
+# json, xmltodict, concurrent.futures and xml.etree are imported by the
+# functions using them, so that scripts only pay for what they use
 
 log = logging.getLogger("xr_data_collector")
 
+
+class LazyPattern(object):
+    """
+    Regexp pattern compiled at its first use, so that importing this module
+    does not compile the patterns of the parsers a script does not run.
+    The methods of the compiled pattern (match, search, split...) are
+    available on it.
+    """
+    __slots__ = ('pattern', 'flags', '_compiled')
+
+    def __init__(self, pattern, flags=0):
+        self.pattern = pattern
+        self.flags = flags
+        self._compiled = None
+
+    def compiled(self):
+        """
+        :return: compiled pattern
+        """
+        if self._compiled is None:
+            self._compiled = re.compile(self.pattern, self.flags)
+        return self._compiled
+
+    def __getattr__(self, name):
+        return getattr(self.compiled(), name)
+
+
 RE_INTF_PATTERN = r'(^[A-Za-z\-]+)([0-9\./]*)'
+RE_INTF = LazyPattern(RE_INTF_PATTERN)
+RE_RSMP_SPLIT = LazyPattern(r'/|\.')
+RE_RSMP_ITEM = LazyPattern(r'^[A-Za-z]*([0-9\.]+)')
+
+# Speed classes of the interfaces: (bandwidth in kb, full name, name, short name)
+# New interface speeds only need to be added here
+INTF_SPEED_TABLE = (
+    (1000000, 'GigabitEthernet', 'GigE', 'Gi'),
+    (10000000, 'TenGigabitEthernet', 'TenGigE', 'Te'),
+    (25000000, 'TwentyFiveGigabitEthernet', 'TwentyFiveGigE', 'TF'),
+    (40000000, 'FortyGigabitEthernet', 'FortyGigE', 'Fo'),
+    (50000000, 'FiftyGigabitEthernet', 'FiftyGigE', 'Fi'),
+    (100000000, 'HundredGigabitEthernet', 'HundredGigE', 'Hu'),
+    (200000000, 'TwoHundredGigabitEthernet', 'TwoHundredGigE', 'TH'),
+    (400000000, 'FourHundredGigabitEthernet', 'FourHundredGigE', 'FH'),
+    (800000000, 'EightHundredGigabitEthernet', 'EightHundredGigE', 'EH'),
+)
+# position of each name format in the rows of the lookup tables below
+INTF_NAME_FORMATS = {'full': 2, 'name': 3, 'short': 4}
+# rows are (position in INTF_SPEED_TABLE, bandwidth, full, name, short)
+INTF_TYPES_BY_BANDWIDTH = dict((row[0], (pos,) + row) for pos, row in enumerate(INTF_SPEED_TABLE))
+INTF_TYPES_BY_TOKEN = dict((type_name.lower(), (pos,) + row)
+                           for pos, row in enumerate(INTF_SPEED_TABLE) for type_name in row[1:])
+
+# regexp patterns to extract data from "show policy-map interface" output
+RE_POLICY_INTF = LazyPattern(RE_INTF_PATTERN + r'\s+(input|output):\s+(\S+)')
+RE_POLICY_CLASS = LazyPattern(r'^Class (\S+)')
+RE_POLICY_TX = LazyPattern(r'^\s+Transmitted\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)')
+RE_POLICY_TOTAL_DROPPED = LazyPattern(r'^\s+Total Dropped\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)')
+RE_POLICY_ECN_MARKED = LazyPattern(r'^\s+RED ecn marked & transmitted\(packets/bytes\):\s+([0-9]+)/([0-9]+)')
+
+# regexp patterns to extract data from "show drops all ongoing" output
+RE_DROPS_NODE = LazyPattern(r'Printing Drop Counters for node ([^\s]+)/CPU0$')
+# values following the 46 characters of the trap type
+RE_DROPS_TRAP = LazyPattern(r'\s*([0-9]+)\s+([0-9]+)' + r'\s+(\S+)' * 7 + r'\s+([0-9]+)\s+([0-9]+)\s+([0-9]+)\s*$')
+HARDWARE_DROPS_FIELDS = ('npu-id', 'trap-id', 'punt-destination', 'punt-voq', 'punt-vlan', 'punt-tc',
+                         'configured-rate', 'hardware-rate', 'policer-level', 'average-packet-size',
+                         'packets-accepted', 'packets-dropped')
+
+# regexp pattern of the nodes running XR in "show platform" output
+RE_PLATFORM_NODE = LazyPattern(r'([0-9]+/\S+/CPU[0-9]+)\s+.*IOS XR RUN')
+
+# Default file the interface handle to name mapping is cached in
+INTF_HANDLE_CACHE_FILE = '/harddisk:/xr_data_collector_intf_handles.json'
+
+# Leaves holding numeric ids, kept as strings by CounterTable
+ID_LEAVES = ('npu-id', 'trap-id', 'policer-id', 'queue-id', 'if-index', 'fair-voq-base-number')
+# Value of the missing cells of the integer columns of a CounterTable
+MISSING_COUNTER = 2 ** 64 - 1
+# Largest value held by the integer columns of a CounterTable
+MAX_COUNTER = MISSING_COUNTER - 1
 
+# Size of the slices of a netconf reply fed to the incremental xml parser
+NETCONF_PARSE_CHUNK = 64 * 1024
 
-def get_controller_stats(nc_con):
+
+class Profiler(object):
     """
-    Does a netconf query of the controller stats of interfaces in device. A list
-    of dictionary is generated with each dict storing the stats for one interface
-    This list of dictionaries is returned.
-    Yang path: Cisco-IOS-XR-drivers-media-eth-oper:ethernet-interface/statistics/statistic
-    :param nc_con: Netconf connection object
-    :return: list of dictionaries . each dict has stats for one interface
+    Opt-in instrumentation of the getters of this module and of the report
+    generators (see profiled). Each top level call is recorded with its wall
+    and CPU time, the wall and CPU time of its phases (rpc, cli, extract,
+    xmltodict, parse, format...), the bytes of the replies, the number of
+    records returned and optionally the peak memory allocated (tracemalloc).
+    Profiling is off unless enabled with enable_profiling.
+    Example:
+        profiler = xr_data_collector.enable_profiling(memory=True)
+        stats = xr_data_collector.get_controller_stats(nc_con)
+        log.info(profiler.summary())
+        profile = profiler.as_dict()
     """
-    ret_list = list()
 
-    # Yang path for all controller stats
-    yang_filter = """
-      <ethernet-interface xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-drivers-media-eth-oper">
-        <statistics>
-          <statistic/>
-        </statistics>
-      </ethernet-interface>
+    def __init__(self, memory=False):
+        """
+        :param memory: If True the peak memory allocated by each call is
+                       measured with tracemalloc, which slows the calls down.
+                       The peak of calls run in parallel is shared between them.
+                       Before Python 3.9 the peak can not be reset, so the
+                       peak since profiling started is reported instead
+        """
+        self.memory = memory
+        self.calls = list()
+        self.lock = threading.Lock()
+        # record of the call running in each thread
+        self.local = threading.local()
+
+    @contextlib.contextmanager
+    def call(self, name):
+        """
+        Records a call. Calls made during the call of the same thread are
+        accounted in it instead of being recorded apart.
+        :param name: Name of the call. eg: 'get_controller_stats'
+        :return: context manager yielding the record of the call
+        """
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            yield record
+            return
+
+        record = {'name': name, 'wall': 0.0, 'cpu': 0.0, 'phases': dict(),
+                  'reply-bytes': 0, 'records': None, 'peak-memory': None}
+        self.local.record = record
+        if self.memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):
+                # Python 3.9+
+                tracemalloc.reset_peak()
+            memory_start = tracemalloc.get_traced_memory()[0]
+        start_time, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - start_time
+            record['cpu'] = time.thread_time() - start_cpu
+            if self.memory:
+                record['peak-memory'] = max(tracemalloc.get_traced_memory()[1] - memory_start, 0)
+            self.local.record = None
+            with self.lock:
+                self.calls.append(record)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Adds the wall and CPU time of a phase to the call running in the
+        current thread. Time of phases run several times is summed.
+        :param name: Name of the phase. eg: 'rpc'
+        """
+        record = getattr(self.local, 'record', None)
+        start_time, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            if record is not None:
+                phase = record['phases'].setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+                phase['wall'] += time.perf_counter() - start_time
+                phase['cpu'] += time.thread_time() - start_cpu
+
+    def add_bytes(self, count):
+        """
+        Adds the size of a reply or CLI output to the call running in the current thread
+        """
+        record = getattr(self.local, 'record', None)
+        if record is not None:
+            record['reply-bytes'] += count
+
+    def as_dict(self):
+        """
+        :return: dict of {'calls': list of the call records,
+                          'totals': dict of {call name: summed record}}
+        """
+        with self.lock:
+            calls = list(self.calls)
+        totals = dict()
+        for record in calls:
+            total = totals.setdefault(record['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'reply-bytes': 0,
+                                                       'records': 0, 'peak-memory': None})
+            total['count'] += 1
+            for field in ('wall', 'cpu', 'reply-bytes'):
+                total[field] += record[field]
+            total['records'] += record['records'] or 0
+            if record['peak-memory'] is not None:
+                total['peak-memory'] = max(total['peak-memory'] or 0, record['peak-memory'])
+        return {'calls': calls, 'totals': totals}
+
+    def summary(self):
+        """
+        :return: one line summary of the calls recorded
+        """
+        parts = list()
+        for name, total in self.as_dict()['totals'].items():
+            part = '{name} {wall:.3f}s (cpu {cpu:.3f}s) {records} records {size} bytes'.format(
+                name=name, wall=total['wall'], cpu=total['cpu'], records=total['records'],
+                size=total['reply-bytes'])
+            if total['peak-memory'] is not None:
+                part += ' peak {peak:.1f}MB'.format(peak=total['peak-memory'] / 1e6)
+            parts.append(part)
+        return 'Profile: ' + ', '.join(parts)
+
+
+# profiler of the calls, None when profiling is disabled
+_profiler = None
+
+
+def enable_profiling(memory=False):
+    """
+    Starts recording the calls of the getters and report generators
+    :param memory: If True the peak memory of each call is measured too
+    :return: Profiler recording the calls
+    """
+    global _profiler
+    _profiler = Profiler(memory=memory)
+    return _profiler
+
+
+def disable_profiling():
+    """
+    Stops recording the calls
+    :return: Profiler that was recording the calls or None
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def profiled(func):
     """
+    Decorator recording the calls of a getter or report generator when
+    profiling is enabled, along with the number of records it returns
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _profiler
+        if profiler is None:
+            return func(*args, **kwargs)
+        with profiler.call(func.__name__) as record:
+            result = func(*args, **kwargs)
+            if record['name'] == func.__name__ and hasattr(result, '__len__') and \
+                    not isinstance(result, str):
+                record['records'] = len(result)
+            return result
+    return wrapper
+
+
+def profile_phase(name):
+    """
+    Times a phase of the call running in the current thread, if profiling.
+    Example:
+        with xr_data_collector.profile_phase('format'):
+            report = format_report(rows)
+    :param name: Name of the phase
+    :return: context manager
+    """
+    profiler = _profiler
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name)
+
+
+def _profile_bytes(count):
+    profiler = _profiler
+    if profiler is not None:
+        profiler.add_bytes(count)
+
+
+class YangCollector(object):
+    """
+    Declaration of an oper dataset collected over netconf by collect().
+    The subtree filter, the extraction of the list entries from the reply and
+    the normalization of nested lists are all derived from the declaration.
+    """
+
+    def __init__(self, name, namespace, path, key=None, subtree=None, lists=None, context=None,
+                 selectors=None):
+        """
+        :param name: Name the dataset is registered and collected with
+        :param namespace: Namespace of the yang model
+        :param path: '/' separated path of the list entries returned, starting
+                     with the top container of the model
+        :param key: Name of the leaf identifying an entry, or tuple of names
+                    of the leaves identifying it together
+        :param subtree: Paths, relative to an entry, put into the filter. The
+                        whole entry is requested when empty
+        :param lists: Paths, relative to an entry, always returned as lists
+        :param context: dict of {key: path} of leaves outside the entries whose
+                        value is added as key to each entry (see netconf_xml_iter)
+        :param selectors: dict of {name: path} of the list key leaves the
+                          dataset can be restricted with (see build_filter)
+        """
+        self.name = name
+        self.namespace = namespace
+        self.path = path
+        self.key = key
+        self.subtree = subtree or list()
+        self.lists = [list_path.split('/') for list_path in lists or list()]
+        self.context = context or dict()
+        self.selectors = selectors or dict()
+
+    def build_filter(self, fields=None, select=None):
+        """
+        Build the netconf subtree filter requesting this dataset
+        :param fields: Paths, relative to an entry, of the only leaves to
+                       request. The key leaves of the entry are always requested
+        :param select: dict of {selector name: value or list of values} of the
+                       list instances to restrict the dataset to.
+                       eg: {'node': ['0/0/CPU0', '0/1/CPU0'], 'npu': 0}
+        :return: xml filter string, None if select has an empty list of
+                 values, ie: selects no list instance
+        """
+        if fields:
+            sub_paths = [name for name in self.key_leaves() if name not in fields] + list(fields)
+        else:
+            sub_paths = self.subtree or ['']
+        full_paths = [(self.path + '/' + sub_path).strip('/') for sub_path in sub_paths]
+        if fields:
+            # leaves outside the entries copied into them must be selected too
+            full_paths = list(self.context.values()) + full_paths
+        instances = self._select_key_values(select)
+        if not instances:
+            # an empty filter would request the whole oper datastore
+            return None
+        filter_tree = dict()
+        for key_values in instances:
+            _merge_filter_trees(filter_tree, _filter_tree(full_paths, key_values))
+        return _render_filter(filter_tree, self.namespace)
+
+    def _select_key_values(self, select):
+        """
+        Expand a selection into one {key leaf path: value} dict per list
+        instance selected, all the combinations of the values being selected
+        """
+        instances = [dict()]
+        for selector, values in (select or dict()).items():
+            if values is None:
+                continue
+            if selector not in self.selectors:
+                raise Exception('Collector {name} can not be selected by {selector}'.format(
+                    name=self.name, selector=selector))
+            if type(values) not in (list, tuple, set):
+                values = [values]
+            instances = [dict(instance, **{self.selectors[selector]: str(value)})
+                         for instance in instances for value in values]
+        return instances
+
+    def key_leaves(self):
+        """
+        :return: names of the key leaves found inside an entry
+        """
+        if self.key is None:
+            return list()
+        keys = self.key if type(self.key) == tuple else (self.key,)
+        return [name for name in keys if name not in self.context]
+
+    def iter_entries(self, xml_output):
+        """
+        Extract the entries of this dataset from a netconf reply
+        :param xml_output: netconf reply xml data structure
+        :return: generator of dictionaries. each dict is one entry
+        """
+        for entry in netconf_xml_iter(xml_output, self.path, context=self.context):
+            for list_path in self.lists:
+                _normalize_list(entry, list_path)
+            yield entry
+
+
+# yang collectors registered by name
+COLLECTORS = dict()
+
+# results of collect() calls made with a max_age, keyed by connection and
+# collector, oldest first. Shared by the threads of collect_all and process scripts
+_collect_cache = dict()
+_collect_cache_lock = threading.Lock()
+# Maximum number of results held by the collect() cache
+COLLECT_CACHE_SIZE = 64
+
+# interface handle to name mapping cached by get_interface_name_handle_mapping
+_handle_mapping_cache = {'time': 0, 'mapping': None}
+_handle_mapping_lock = threading.Lock()
+
+
+def register_collector(collector):
+    """
+    Register a yang collector so it can be collected by name with collect()
+    :param collector: YangCollector object
+    :return: the collector registered
+    """
+    COLLECTORS[collector.name] = collector
+    return collector
+
+
+@profiled
+def collect(nc_con, name, stream=False, max_age=None, typed=False, fields=None, select=None):
+    """
+    Does a netconf query of a registered yang dataset and returns its entries
+    :param nc_con: Netconf connection object
+    :param name: Name of the registered collector
+    :param stream: If True a generator yielding one entry at a time is
+                   returned instead of a list
+    :param max_age: If set, a result collected on the same connection in the
+                    last max_age seconds is returned instead of querying again.
+                    At most COLLECT_CACHE_SIZE results are cached
+    :param typed: If True a CounterTable, indexed by the key of the collector,
+                  is returned instead of a list
+    :param fields: Names (or paths relative to an entry) of the only leaves
+                   to request, on top of the key leaves. All leaves if None.
+                   The reply shrinks with the number of leaves requested.
+    :param select: dict of {selector name: value or list of values} restricting
+                   the query to some list instances. eg: {'node': '0/0/CPU0'}
+                   Selectors are declared by each collector. An empty list
+                   of values selects nothing, and no query is sent.
+    :return: list of dictionaries. each dict is one entry of the dataset
+    """
+    collector = COLLECTORS[name]
+    cache_key = (nc_con, name, typed, tuple(fields or ()), repr(select))
+    if max_age is not None and not stream:
+        with _collect_cache_lock:
+            cached = _collect_cache.get(cache_key)
+        if cached and time.time() - cached[0] <= max_age:
+            log.debug('Using cached {name} collected {age:.1f}s ago'.format(
+                name=name, age=time.time() - cached[0]))
+            return cached[2]
+
+    yang_filter = collector.build_filter(fields=fields, select=select)
+    if yang_filter is None:
+        log.debug('No {name} instance selected, nothing to query'.format(name=name))
+        entries = iter(list())
+        if stream:
+            return entries
+        return CounterTable.from_entries(entries, key=collector.key) if typed else list()
     # sending the yang request
+    start_time = time.time()
     try:
-        nc_con.rpc.get(request=yang_filter)
+        with profile_phase('rpc'):
+            nc_con.rpc.get(request=yang_filter)
     except Exception as err:
         log.exception('Error during netconf get \n filter: {yang_filter}\n '
                       'Error : {err}'.format(yang_filter=yang_filter, err=err))
-        raise err
-    # converting xml output to dict structure
-    reply_dict = netconf_xml_to_dict(nc_con.reply, xml_tag='ethernet-interface')
+        raise TransportError('Netconf get failed: {err}'.format(err=err)) from err
+    rpc_time = time.time() - start_time
+    _profile_bytes(len(nc_con.reply))
 
-    # removing unwanted outer structure from reply
-    for reply_int_dict in reply_dict['ethernet-interface']['statistics']['statistic']:
-        ret_list.append(reply_int_dict)
+    entries = collector.iter_entries(nc_con.reply)
+    if stream:
+        return entries
+
+    # converting xml output to a list of dict or a table
+    start_time = time.time()
+    with profile_phase('parse'):
+        if typed:
+            ret_list = CounterTable.from_entries(entries, key=collector.key)
+        else:
+            ret_list = list(entries)
+    log.debug('Collected {count} {name} entries: rpc {rpc_time:.3f}s, '
+              'parse {parse_time:.3f}s'.format(count=len(ret_list), name=name, rpc_time=rpc_time,
+                                              parse_time=time.time() - start_time))
+    if max_age is not None:
+        _cache_collect_result(cache_key, max_age, ret_list)
     return ret_list
 
 
-def get_controller_interface_stats(nc_con):
+def _cache_collect_result(cache_key, max_age, result):
     """
-    Does a netconf query of the controller inteface stats of interfaces in device. A list
-    of dictionary is generated with each dict storing the stats for one interface
-    This list of dictionaries is returned.
-    Yang path: Cisco-IOS-XR-drivers-media-eth-oper:ethernet-interface/interfaces/interface
+    Adds a result to the collect() cache. The results older than the
+    max_age they were cached with are dropped, then the oldest ones if the
+    cache holds more than COLLECT_CACHE_SIZE results, so that it does not
+    keep the results, and the connections, of past calls.
+    """
+    now = time.time()
+    with _collect_cache_lock:
+        _collect_cache.pop(cache_key, None)
+        for key, (cache_time, cache_max_age, cached) in list(_collect_cache.items()):
+            if now - cache_time > cache_max_age:
+                del _collect_cache[key]
+        while len(_collect_cache) >= COLLECT_CACHE_SIZE:
+            del _collect_cache[next(iter(_collect_cache))]
+        _collect_cache[cache_key] = (now, max_age, result)
+
+
+class CounterTable(object):
+    """
+    Compact columnar table of collected entries. Leaves holding an unsigned
+    integer (int or string of digits) in every entry having them are parsed
+    once into array('Q') columns, the entries missing them holding
+    MISSING_COUNTER. The other leaves, the key leaves and the id leaves
+    (ID_LEAVES) are kept as they are, strings being interned, and
+    entries are indexed by their key. Rows are only turned back into
+    dictionaries when accessed.
+    Example:
+        table = get_controller_stats(nc_con, typed=True)
+        rx_packets = table.value('HundredGigE0/0/0/0', 'total-packets-received')
+        for row in table:
+            print(row['interface-name'], row['total-packets-received'])
+    """
+    __slots__ = ('key', 'columns', 'index', 'length', '_string_names')
+
+    def __init__(self, key=None, ids=ID_LEAVES):
+        """
+        :param key: Name of the column identifying a row, or tuple of names
+        :param ids: Names of the columns holding ids, never parsed as integers
+        """
+        self.key = key
+        # columns kept as collected, to be looked up with the values of the replies
+        self._string_names = set(key) if type(key) == tuple else {key} if key else set()
+        self._string_names.update(ids or ())
+        # column name to array('Q') of integers or list of values
+        self.columns = dict()
+        # key value to row number
+        self.index = dict()
+        self.length = 0
+
+    @classmethod
+    def from_entries(cls, entries, key=None, ids=ID_LEAVES):
+        """
+        Build a table from flat dictionaries
+        :param entries: iterable of dictionaries, eg: a collector result
+        :param key: Name of the column identifying a row, or tuple of names
+        :param ids: Names of the columns holding ids, never parsed as integers
+        :return: CounterTable object
+        """
+        table = cls(key=key, ids=ids)
+        for entry in entries:
+            table.append(entry)
+        return table
+
+    def append(self, entry):
+        """
+        Add a row to the table
+        :param entry: dictionary of column name to value
+        :return: None
+        """
+        row_num = self.length
+        for name, value in entry.items():
+            column = self.columns.get(name)
+            if column is None:
+                if name in self._string_names:
+                    column = self.columns[name] = [None] * row_num
+                else:
+                    # column missing in the previous rows
+                    column = self.columns[name] = array.array('Q', [MISSING_COUNTER]) * row_num
+            if type(column) == array.array:
+                if type(value) == int:
+                    if 0 <= value <= MAX_COUNTER:
+                        column.append(value)
+                        continue
+                elif type(value) == str and value.isdigit() and int(value) <= MAX_COUNTER:
+                    column.append(int(value))
+                    continue
+                column = self._to_list(name)
+            if type(value) == str:
+                value = sys.intern(value)
+            column.append(value)
+        self.length += 1
+        for column in self.columns.values():
+            if len(column) < self.length:
+                # column missing in this row
+                column.append(MISSING_COUNTER if type(column) == array.array else None)
+        if self.key:
+            self.index[self.row_key(row_num)] = row_num
+
+    def row_key(self, row_num):
+        """
+        :return: key value of a row
+        """
+        if type(self.key) == tuple:
+            return tuple(self.columns[name][row_num] for name in self.key)
+        return self.columns[self.key][row_num]
+
+    def row(self, row_num):
+        """
+        :return: dictionary of column name to value for a row number
+        """
+        ret_dict = dict()
+        for name, column in self.columns.items():
+            value = _table_cell(column, row_num)
+            if value is not None:
+                ret_dict[name] = value
+        return ret_dict
+
+    def get(self, key, default=None):
+        """
+        :return: dictionary of column name to value for a row key
+        """
+        row_num = self.index.get(key)
+        if row_num is None:
+            return default
+        return self.row(row_num)
+
+    def value(self, key, name, default=None):
+        """
+        :return: value of one column of the row having the key passed
+        """
+        row_num = self.index.get(key)
+        if row_num is None or name not in self.columns:
+            return default
+        return _table_cell(self.columns[name], row_num)
+
+    def column(self, name):
+        """
+        :return: array('Q') of all the values of a column, missing values
+                 being MISSING_COUNTER, or list of values, missing ones being None
+        """
+        return self.columns[name]
+
+    def is_counter(self, name):
+        """
+        :return: True if the column holds integers in every row having it
+        """
+        return type(self.columns.get(name)) == array.array
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for row_num in range(self.length):
+            yield self.row(row_num)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def _to_list(self, name):
+        """
+        Convert an integer column to a list of values, the integers becoming
+        strings again as they were not all integers
+        """
+        column = [None if value == MISSING_COUNTER else str(value) for value in self.columns[name]]
+        self.columns[name] = column
+        return column
+
+
+def _table_cell(column, row_num):
+    """
+    :return: value of a CounterTable column in a row, None if missing
+    """
+    value = column[row_num]
+    if value == MISSING_COUNTER and type(column) == array.array:
+        return None
+    return value
+
+
+def clear_collect_cache():
+    """
+    Drop all the results cached by collect()
+    :return: None
+    """
+    with _collect_cache_lock:
+        _collect_cache.clear()
+
+
+@profiled
+def collect_fanout(nc_pool, name, selector, values, max_workers=None, typed=False, **kwargs):
+    """
+    Runs one collect() per value of a selector in parallel, each on a
+    session of nc_pool, and merges the entries in the order of the values.
+    eg: collect_fanout(nc_pool, 'npu-traps-stats', 'node', ['0/0/CPU0', '0/1/CPU0'])
+    :param nc_pool: HandlePool of netconf sessions
+    :param name: Name of the registered collector
+    :param selector: Name of the selector of the collector to fan out on
+    :param values: Values of the selector, one query is done per value.
+                   Nothing is queried if empty
+    :param max_workers: Number of queries run at the same time.
+                        Defaults to the size of nc_pool
+    :param typed: If True a CounterTable is returned instead of a list
+    :param kwargs: Other collect() arguments
+    :return: list of dictionaries. each dict is one entry of the dataset
+    """
+    import concurrent.futures
+    select = dict(kwargs.pop('select', None) or dict())
+    values = list(values)
+    if not values:
+        log.debug('No {name} {selector} selected, nothing to query'.format(name=name, selector=selector))
+        return CounterTable.from_entries(list(), key=COLLECTORS[name].key) if typed else list()
+
+    def collect_value(value):
+        with nc_pool.handle() as nc_con:
+            return collect(nc_con, name, select=dict(select, **{selector: value}), **kwargs)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or nc_pool.size) as executor:
+        results = list(executor.map(collect_value, values))
+    entries = (entry for result in results for entry in result)
+    if typed:
+        return CounterTable.from_entries(entries, key=COLLECTORS[name].key)
+    return list(entries)
+
+
+@profiled
+def get_npu_node_names(nc_con):
+    """
+    Does a netconf query of the names of the nodes having npu stats
     :param nc_con: Netconf connection object
-    :return: list of dictionaries . each dict has stats for one interface
+    :return: list of node names
     """
-    ret_list = list()
+    return [node['node-name'] for node in
+            collect(nc_con, 'npu-interfaces-stats', fields=['node-name'])]
 
-    # Yang path for all controller stats
-    yang_filter = """
-      <ethernet-interface xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-drivers-media-eth-oper">
-        <interfaces>
-          <interface/>
-        </interfaces>
-      </ethernet-interface>
+
+def _filter_tree(paths, key_values=None):
     """
-    # sending the yang request
-    try:
-        nc_con.rpc.get(request=yang_filter)
-    except Exception as err:
-        log.exception('Error during netconf get \n filter: {yang_filter}\n '
-                      'Error : {err}'.format(yang_filter=yang_filter, err=err))
-        raise err
-    # converting xml output to dict structure
-    reply_dict = netconf_xml_to_dict(nc_con.reply, xml_tag='ethernet-interface')
+    Build the tree of a subtree filter
+    :param paths: '/' separated paths of the selected nodes
+    :param key_values: dict of {path: value} of the key leaves to match
+    :return: dict of {tag: dict of child tags, or value of a key leaf}
+    """
+    filter_tree = dict()
+    # key leaves come first in their list instance
+    for path, value in list((key_values or dict()).items()) + [(path, None) for path in paths]:
+        node = filter_tree
+        names = path.split('/')
+        for name in names[:-1]:
+            node = node.setdefault(name, dict())
+        if value is not None:
+            node[names[-1]] = value
+        else:
+            node.setdefault(names[-1], dict())
+    return filter_tree
+
+
+def _merge_filter_trees(filter_tree, other_tree):
+    """
+    Merge other_tree into filter_tree. List instances with different key
+    values are kept side by side as a list of trees under their tag.
+    :return: None
+    """
+    for name, other in other_tree.items():
+        current = filter_tree.get(name)
+        if current is None:
+            filter_tree[name] = other
+            continue
+        if type(other) == str:
+            continue
+        instances = current if type(current) == list else [current]
+        other_keys = _filter_key_values(other)
+        for instance in instances:
+            if _filter_key_values(instance) == other_keys:
+                _merge_filter_trees(instance, other)
+                break
+        else:
+            instances.append(other)
+            filter_tree[name] = instances
 
-    # removing unwanted outer structure from reply
-    for reply_int_dict in reply_dict['ethernet-interface']['interfaces']['interface']:
-        ret_list.append(reply_int_dict)
-    return ret_list
 
+def _filter_key_values(filter_tree):
+    return dict((name, value) for name, value in filter_tree.items() if type(value) == str)
 
-def get_controller_npu_interfaces_stats(nc_con):
+
+def _xml_escape(text):
     """
-    Does a netconf query of the npu stats of interface on device. A list
+    Escapes &, < and > in the text of an xml element
+    """
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _render_filter(filter_tree, namespace=None, indent=6):
+    """
+    Render a filter tree as an xml subtree filter
+    :param filter_tree: dict of {tag: dict of child tags, value of a key leaf,
+                        or list of dict of child tags of several list instances}
+    :param namespace: Namespace set on the top level tags
+    :param indent: Indentation of the top level tags
+    :return: xml filter string
+    """
+    xml = ''
+    for name, children in filter_tree.items():
+        tag = name + (' xmlns="%s"' % namespace if namespace else '')
+        for instance in (children if type(children) == list else [children]):
+            if type(instance) == str:
+                xml += '%s<%s>%s</%s>\n' % (' ' * indent, tag, _xml_escape(instance), name)
+            elif instance:
+                xml += '%s<%s>\n%s%s</%s>\n' % (' ' * indent, tag,
+                                               _render_filter(instance, indent=indent + 2),
+                                               ' ' * indent, name)
+            else:
+                xml += '%s<%s/>\n' % (' ' * indent, tag)
+    return xml
+
+
+def _normalize_list(entry, path):
+    """
+    Make sure the value found at path in entry is a list. xmltodict style
+    dicts hold a single list item as a dict instead of a list of one dict.
+    :param entry: dictionary to normalize
+    :param path: list of tags leading to the list, lists on the way are walked
+    :return: None
+    """
+    name = path[0]
+    if type(entry) == list:
+        for item in entry:
+            _normalize_list(item, path)
+        return
+    if type(entry) != dict or entry.get(name) is None:
+        return
+    if len(path) == 1:
+        if type(entry[name]) != list:
+            entry[name] = [entry[name]]
+    else:
+        _normalize_list(entry[name], path[1:])
+
+
+NS_ETH_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-drivers-media-eth-oper'
+NS_OFA_NPU_STATS_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-ofa-npu-stats-oper'
+NS_IM_CMD_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-pfi-im-cmd-oper'
+NS_QOS_MA_OPER = 'http://cisco.com/ns/yang/Cisco-IOS-XR-qos-ma-oper'
+
+# npu stats can be restricted to some nodes and npus
+OFA_NPU_SELECTORS = {'node': 'ofa/stats/nodes/node/node-name',
+                     'npu': 'ofa/stats/nodes/node/npu-numbers/npu-number/npu-id'}
+
+register_collector(YangCollector(
+    name='controller-stats',
+    namespace=NS_ETH_OPER,
+    path='ethernet-interface/statistics/statistic',
+    key='interface-name',
+    selectors={'interface': 'ethernet-interface/statistics/statistic/interface-name'}))
+
+register_collector(YangCollector(
+    name='controller-interface-stats',
+    namespace=NS_ETH_OPER,
+    path='ethernet-interface/interfaces/interface',
+    key='interface-name',
+    selectors={'interface': 'ethernet-interface/interfaces/interface/interface-name'}))
+
+register_collector(YangCollector(
+    name='npu-interfaces-stats',
+    namespace=NS_OFA_NPU_STATS_OPER,
+    path='ofa/stats/nodes/node',
+    key='node-name',
+    selectors=OFA_NPU_SELECTORS,
+    subtree=['npu-numbers/npu-number/display/fair-voq-base-numbers',
+             'npu-numbers/npu-number/display/interface-handles/interface-handle'],
+    lists=['npu-numbers/npu-number',
+           'npu-numbers/npu-number/display/interface-handles/interface-handle']))
+
+register_collector(YangCollector(
+    name='npu-interface-handles-stats',
+    namespace=NS_OFA_NPU_STATS_OPER,
+    path='ofa/stats/nodes/node/npu-numbers/npu-number/display/interface-handles/interface-handle',
+    key=('node-name', 'npu-id', 'interface-handle'),
+    selectors=OFA_NPU_SELECTORS,
+    context={'node-name': 'ofa/stats/nodes/node/node-name',
+             'npu-id': 'ofa/stats/nodes/node/npu-numbers/npu-number/npu-id'}))
+
+register_collector(YangCollector(
+    name='interfaces-status',
+    namespace=NS_IM_CMD_OPER,
+    path='interfaces/interface-xr/interface',
+    key='interface-name',
+    selectors={'interface': 'interfaces/interface-xr/interface/interface-name'}))
+
+register_collector(YangCollector(
+    name='npu-traps-stats',
+    namespace=NS_OFA_NPU_STATS_OPER,
+    path='ofa/stats/nodes/node/npu-numbers/npu-number/display/trap-ids/trap-id',
+    key=('node-name', 'npu-id', 'trap-id'),
+    selectors=OFA_NPU_SELECTORS,
+    context={'node-name': 'ofa/stats/nodes/node/node-name',
+             'npu-id': 'ofa/stats/nodes/node/npu-numbers/npu-number/npu-id'}))
+
+# qos-ma-oper leaves of the class stats to the keys of get_interface_policy_map
+QOS_GENERAL_STATS = (('transmit-packets', 'transmitted-packets'),
+                     ('transmit-bytes', 'transmitted-bytes'),
+                     ('total-transmit-rate', 'transmitted-rate'),
+                     ('total-drop-packets', 'total-dropped-packets'),
+                     ('total-drop-bytes', 'total-dropped-bytes'),
+                     ('total-drop-rate', 'total-dropped-rate'))
+QOS_ECN_STATS = (('red-ecn-marked-packets', 'ecn-marked-transmitted-packets'),
+                 ('red-ecn-marked-bytes', 'ecn-marked-transmitted-bytes'))
+QOS_POLICY_PATH = '{direction}/service-policy-names/service-policy-instance'
+QOS_CLASS_PATH = QOS_POLICY_PATH + '/statistics/class-stats'
+
+
+def _qos_subtree(direction):
+    """
+    :return: paths, relative to an interface, of the leaves of the policy
+             map stats of a direction in qos-ma-oper
+    """
+    policy_path = QOS_POLICY_PATH.format(direction=direction)
+    class_path = QOS_CLASS_PATH.format(direction=direction)
+    return ([policy_path + '/service-policy-name', policy_path + '/statistics/policy-name',
+             class_path + '/class-name'] +
+            [class_path + '/general-stats/' + leaf for leaf, key in QOS_GENERAL_STATS] +
+            [class_path + '/wred-stats-array/' + leaf for leaf, key in QOS_ECN_STATS])
+
+
+register_collector(YangCollector(
+    name='qos-interface-stats',
+    namespace=NS_QOS_MA_OPER,
+    path='qos/interface-table/interface',
+    key='interface-name',
+    selectors={'interface': 'qos/interface-table/interface/interface-name'},
+    subtree=_qos_subtree('input') + _qos_subtree('output'),
+    lists=[path.format(direction=direction)
+           for direction in ('input', 'output')
+           for path in (QOS_POLICY_PATH, QOS_CLASS_PATH, QOS_CLASS_PATH + '/wred-stats-array')]))
+
+
+@profiled
+def get_controller_stats(nc_con, stream=False, typed=False, fields=None, interfaces=None):
+    """
+    Does a netconf query of the controller stats of interfaces in device. A list
     of dictionary is generated with each dict storing the stats for one interface
     This list of dictionaries is returned.
-    Yang path : Cisco-IOS-XR-ofa-npu-stats-oper:ofa/stats/nodes/node/npu-numbers/
-                npu-number/display/interface-handles/interface-handle
+    Yang path: Cisco-IOS-XR-drivers-media-eth-oper:ethernet-interface/statistics/statistic
     :param nc_con: Netconf connection object
+    :param stream: If True a generator yielding one interface at a time is
+                   returned instead of a list
+    :param typed: If True a CounterTable with integer counters is returned
+                  instead of a list (see CounterTable)
+    :param fields: list of the only leaves to request. All leaves if None
+    :param interfaces: list of the names of the interfaces to query, in full,
+                       normal or short form, in a single request. All if None
     :return: list of dictionaries . each dict has stats for one interface
     """
-    ret_list = list()
+    return collect(nc_con, 'controller-stats', stream=stream, typed=typed, fields=fields,
+                   select=_interface_select(interfaces))
 
-    # Yang path for all controller stats
-    yang_filter = """
-      <ofa xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-ofa-npu-stats-oper">
-        <stats>
-          <nodes>
-            <node>
-              <npu-numbers>
-                <npu-number>
-                  <display>
-                    <fair-voq-base-numbers/>
-                    <interface-handles>
-                      <interface-handle/>
-                    </interface-handles>
-                  </display>
-                </npu-number>
-              </npu-numbers>
-            </node>
-          </nodes>
-        </stats>
-      </ofa>
-    """
-    # sending the yang request
-    try:
-        nc_con.rpc.get(request=yang_filter)
-    except Exception as err:
-        log.exception('Error during netconf get \n filter: {yang_filter}\n '
-                      'Error : {err}'.format(yang_filter=yang_filter, err=err))
-        raise err
-    # converting xml output to dict structure
-    reply_dict = netconf_xml_to_dict(nc_con.reply, xml_tag='nodes')
 
-    # removing unwanted outer structure from reply
-    if type(reply_dict['nodes']['node']) != list:
-        # distributed systems single LCs
-        if type(reply_dict['nodes']['node']['npu-numbers']['npu-number']) != list:
-            # fixed systems
-            reply_dict['nodes']['node']['npu-numbers']['npu-number'] = \
-                [reply_dict['nodes']['node']['npu-numbers']['npu-number']]
+@profiled
+def get_controller_interface_stats(nc_con, stream=False, typed=False, fields=None, interfaces=None):
+    """
+    Does a netconf query of the controller inteface stats of interfaces in device. A list
+    of dictionary is generated with each dict storing the stats for one interface
+    This list of dictionaries is returned.
+    Yang path: Cisco-IOS-XR-drivers-media-eth-oper:ethernet-interface/interfaces/interface
+    :param nc_con: Netconf connection object
+    :param stream: If True a generator yielding one interface at a time is
+                   returned instead of a list
+    :param typed: If True a CounterTable with integer counters is returned
+                  instead of a list (see CounterTable)
+    :param fields: list of the only leaves to request. All leaves if None
+    :param interfaces: list of the names of the interfaces to query, in full,
+                       normal or short form, in a single request. All if None
+    :return: list of dictionaries . each dict has stats for one interface
+    """
+    return collect(nc_con, 'controller-interface-stats', stream=stream, typed=typed, fields=fields,
+                   select=_interface_select(interfaces))
 
-        reply_dict['nodes']['node'] = [reply_dict['nodes']['node']]
 
-    ret_list = reply_dict['nodes']['node']
-    return ret_list
+@profiled
+def get_controller_npu_interfaces_stats(nc_con, stream=False, node=None, npu=None, nc_pool=None, fields=None):
+    """
+    Does a netconf query of the npu stats of interface on device. A list
+    of dictionary is generated with each dict storing the stats of one node,
+    with its npu-number and interface-handle always as lists.
+    This list of dictionaries is returned.
+    Yang path : Cisco-IOS-XR-ofa-npu-stats-oper:ofa/stats/nodes/node/npu-numbers/
+                npu-number/display/interface-handles/interface-handle
+    :param nc_con: Netconf connection object
+    :param stream: If True a generator yielding one node at a time is
+                   returned instead of a list
+    :param node: Node name, or list of node names, to query. All if None
+    :param npu: Npu id, or list of npu ids, to query. All if None
+    :param nc_pool: HandlePool of netconf sessions. If set, each node is
+                    queried in parallel on its own session, and nc_con is
+                    not used (it can be None)
+    :param fields: list of the paths, relative to a node, of the only leaves
+                   to request. eg: ['npu-numbers/npu-number/display/interface-handles/
+                   interface-handle/interface-name']. All leaves if None
+    :return: list of dictionaries . each dict has stats for one node
+    """
+    return _collect_npu_stats(nc_con, 'npu-interfaces-stats', node, npu, nc_pool,
+                              stream=stream, fields=fields)
 
 
-def get_interfaces_status(nc_con):
+@profiled
+def get_interfaces_status(nc_con, stream=False, typed=False, fields=None, interfaces=None):
     """
     Does a netconf query of the interface status on device. A list
     of dictionary is generated with each dict storing the stats for one interface
     This list of dictionaries is returned
     Yang path: Cisco-IOS-XR-pfi-im-cmd-oper:interfaces/interface-xr/interface
     :param nc_con: Netconf connection object
+    :param stream: If True a generator yielding one interface at a time is
+                   returned instead of a list
+    :param typed: If True a CounterTable with integer counters is returned
+                  instead of a list (see CounterTable)
+    :param fields: list of the only leaves to request. All leaves if None
+    :param interfaces: list of the names of the interfaces to query, in full,
+                       normal or short form, in a single request. All if None
     :return: list of dictionaries . each dict has stats for one interface
     """
-    ret_list = list()
-
-    # Yang path for all controller stats
-    yang_filter = """
-      <interfaces xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-pfi-im-cmd-oper">
-        <interface-xr>
-          <interface/>
-        </interface-xr>
-      </interfaces>
-    """
-    # sending the yang request
-    try:
-        nc_con.rpc.get(request=yang_filter)
-    except Exception as err:
-        log.exception('Error during netconf get \n filter: {yang_filter}\n '
-                      'Error : {err}'.format(yang_filter=yang_filter, err=err))
-        raise err
-    # converting xml output to dict structure
-    reply_dict = netconf_xml_to_dict(nc_con.reply, xml_tag='interfaces')
-
-    # removing unwanted outer structure from reply
-    for reply_int_dict in reply_dict['interfaces']['interface-xr']['interface']:
-        ret_list.append(reply_int_dict)
-    return ret_list
+    return collect(nc_con, 'interfaces-status', stream=stream, typed=typed, fields=fields,
+                   select=_interface_select(interfaces))
 
 
-def get_controller_npu_traps_stats(nc_con):
+@profiled
+def get_controller_npu_traps_stats(nc_con, stream=False, typed=False, fields=None,
+                                   node=None, npu=None, nc_pool=None):
     """
     Does a netconf query of the npu stats for all traps on device. A list
-    of dictionary is generated with each dict storing the stats for one trap
+    of dictionary is generated with each dict storing the stats for one trap,
+    along with the node-name and npu-id of the npu it was counted on.
     This list of dictionaries is returned.
     Yang path : Cisco-IOS-XR-ofa-npu-stats-oper:ofa/stats/nodes/node/
                 npu-numbers/npu-number/display/trap-ids/trap-id
     :param nc_con: Netconf connection object
-    :return: list of dictionaries . each dict has stats for one interface
+    :param stream: If True a generator yielding one trap at a time is
+                   returned instead of a list
+    :param typed: If True a CounterTable with integer counters is returned
+                  instead of a list (see CounterTable)
+    :param fields: list of the only leaves to request. All leaves if None
+    :param node: Node name, or list of node names, to query. All if None
+    :param npu: Npu id, or list of npu ids, to query. All if None
+    :param nc_pool: HandlePool of netconf sessions. If set, each node is
+                    queried in parallel on its own session, and nc_con is
+                    not used (it can be None)
+    :return: list of dictionaries . each dict has stats for one trap
     """
-    ret_list = list()
+    return _collect_npu_stats(nc_con, 'npu-traps-stats', node, npu, nc_pool,
+                              stream=stream, typed=typed, fields=fields)
+
 
-    # Yang path for all controller stats
-    yang_filter = """
-      <ofa xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-ofa-npu-stats-oper">
-        <stats>
-          <nodes>
-            <node>
-              <npu-numbers>
-                <npu-number>
-                  <display>
-                    <trap-ids>
-                      <trap-id/>
-                    </trap-ids>
-                  </display>
-                </npu-number>
-              </npu-numbers>
-            </node>
-          </nodes>
-        </stats>
-      </ofa>
+def _collect_npu_stats(nc_con, name, node, npu, nc_pool, **kwargs):
     """
-    # sending the yang request
-    try:
-        nc_con.rpc.get(request=yang_filter)
-    except Exception as err:
-        log.exception('Error during netconf get \n filter: {yang_filter}\n '
-                      'Error : {err}'.format(yang_filter=yang_filter, err=err))
-        raise err
-    # converting xml output to dict structure
-    reply_dict = netconf_xml_to_dict(nc_con.reply, xml_tag='nodes')
-
-    # removing unwanted outer structure from reply
-    if type(reply_dict['nodes']['node']) == list:
-        # distributed systems multiple LCs
-        node_list = reply_dict['nodes']['node']
-    else:
-        node_list = [reply_dict['nodes']['node']]
+    Collects npu stats restricted to node/npu, fanning out one query per
+    node over nc_pool when one is passed
+    """
+    if nc_pool is None:
+        return collect(nc_con, name, select={'node': node, 'npu': npu}, **kwargs)
 
-    for node in node_list:
-        if type(node['npu-numbers']['npu-number']) == list:
-            npu_list = node['npu-numbers']['npu-number']
-        else:
-            npu_list = [node['npu-numbers']['npu-number']]
-        for npu in npu_list:
-            for int_stats in npu['display']['trap-ids']['trap-id']:
-                int_stats['node-name'] = node['node-name']
-                ret_list.append(int_stats)
-    return ret_list
+    if node is None:
+        # the nodes are discovered on a session of the pool, nc_con may be None
+        with nc_pool.handle() as pool_con:
+            node = get_npu_node_names(pool_con)
+    elif type(node) not in (list, tuple):
+        node = [node]
+    # the entries of all the nodes are merged in a list
+    kwargs.pop('stream', None)
+    return collect_fanout(nc_pool, name, 'node', node, select={'npu': npu}, **kwargs)
 
 
-def get_hardware_drops(cli_handle):
+@profiled
+def get_hardware_drops(cli_handle, locations=None, cli_pool=None, max_workers=None):
     """
     Does a CLI query of the drops data on device. A list of
     dictionary is generated with each dictionary have data for one drop type
     This list of dictionaries is returned
+    With a cli_pool, the nodes are queried one location at a time in parallel
+    so the collection takes as long as the slowest node instead of the sum
+    of all the nodes.
     CLI used : show drops all ongoing location all
+               show drops all ongoing location <node> (with locations or cli_pool)
     :param cli_handle: XR CLI helper handle
+    :param locations: list of node names to query. With a cli_pool, defaults
+                      to all the nodes running XR (see get_node_names). The
+                      locations whose CLI fails are left out
+    :param cli_pool: HandlePool of XR CLI helper handles to query the
+                     locations in parallel with
+    :param max_workers: Number of locations queried at the same time.
+                        Defaults to the size of cli_pool
     :return: dictionary
     """
+    if locations is None and cli_pool is None:
+        output = _cli_exec(cli_handle, 'show drops all ongoing location all')
+        with profile_phase('parse'):
+            return parse_hardware_drops(output)
+
+    if locations is None:
+        locations = get_node_names(cli_handle)
+    cmds = ['show drops all ongoing location {node}'.format(node=node) for node in locations]
+    outputs = _cli_exec_all(cli_handle, cmds, cli_pool, max_workers)
+
     ret_list = list()
-    # regexp patterns to extract data from CLI output
-    node_pattern = r"^Printing Drop Counters for node ([^\s]+)/CPU0$"
-    trap_pattern = r".*\s+[0-9]\s+[0-9]+\s+.*[0-9]+\s+[0-9]+\s+[0-9]+$"
+    with profile_phase('parse'):
+        for output in outputs:
+            ret_list.extend(parse_hardware_drops(output))
+    return ret_list
 
-    # executing CLI
+
+def parse_hardware_drops(output):
+    """
+    Parses the output of "show drops all ongoing". Trap lines have the trap
+    type in their first 46 characters followed by 12 values.
+    :param output: CLI output
+    :return: list of dictionaries. each dict has data for one drop type
+    """
+    ret_list = list()
+    node = ''
+    match_trap = RE_DROPS_TRAP.compiled().match
+    for line in output.split('\n'):
+        if line.startswith('Printing'):
+            node_match = RE_DROPS_NODE.match(line)
+            if node_match:
+                node = node_match.group(1)
+            continue
+        if not node or len(line) <= 46 or not line[-1].isdigit():
+            continue
+
+        trap_match = match_trap(line, 46)
+        if trap_match:
+            trap_dict = {'node-name': node}
+            trap_dict['trap-type'] = line[0:46].strip()
+            for field, value in zip(HARDWARE_DROPS_FIELDS, trap_match.groups()):
+                trap_dict[field] = value
+            ret_list.append(trap_dict)
+    return ret_list
+
+
+@profiled
+def get_node_names(cli_handle):
+    """
+    Does a CLI query of the nodes of the device and returns the names of
+    the ones running XR
+    CLI used : show platform
+    :param cli_handle: XR CLI helper handle
+    :return: list of node names. eg: ['0/RP0/CPU0', '0/0/CPU0']
+    """
+    output = _cli_exec(cli_handle, 'show platform')
+    return [node_match.group(1) for node_match in
+            (RE_PLATFORM_NODE.match(line) for line in output.split('\n'))
+            if node_match]
+
+
+def _cli_exec(cli_handle, cmd):
+    """
+    Executes a CLI and returns its output
+    :param cli_handle: XR CLI helper handle
+    :param cmd: CLI to execute
+    :return: CLI output
+    """
     try:
-        cmd = 'show drops all ongoing location all'
-        result = cli_handle.xrcli_exec(cmd)
+        with profile_phase('cli'):
+            result = cli_handle.xrcli_exec(cmd)
     except Exception as err:
-        log.exception('Error during CLI (cmd) execution'
+        log.exception('Error during CLI ({cmd}) execution'
                       'Error : {err}'.format(cmd=cmd, err=err))
-        raise err
+        raise TransportError('Execution of CLI {cmd} failed: {err}'.format(cmd=cmd, err=err)) from err
     if not result['status'] == 'success':
         raise Exception('Execution of CLI {cmd} not successful.'.format(cmd=cmd))
+    _profile_bytes(len(result['output']))
+    return result['output']
 
-    # parsing each lines of the output and writing data into dictionaries
-    node = ''
-    for line in result['output'].split('\n'):
-
-        node_match = re.match(node_pattern, line)
-        if node_match:
-            node = node_match.group(1)
-
-        if node:
-            trap_match = re.match(trap_pattern, line)
-
-            trap_values = line[46:].split()
-            if trap_match and len(trap_values) == 12:
-                trap_dict = {'node-name': node}
-                trap_dict['trap-type'] = line[0:46].strip()
-                trap_dict['npu-id'] = trap_values[0]
-                trap_dict['trap-id'] = trap_values[1]
-                trap_dict['punt-destination'] = trap_values[2]
-                trap_dict['punt-voq'] = trap_values[3]
-                trap_dict['punt-vlan'] = trap_values[4]
-                trap_dict['punt-tc'] = trap_values[5]
-                trap_dict['configured-rate'] = trap_values[6]
-                trap_dict['hardware-rate'] = trap_values[7]
-                trap_dict['policer-level'] = trap_values[8]
-                trap_dict['average-packet-size'] = trap_values[9]
-                trap_dict['packets-accepted'] = trap_values[10]
-                trap_dict['packets-dropped'] = trap_values[11]
-                ret_list.append(trap_dict)
-    return ret_list
+
+def _cli_exec_all(cli_handle, cmds, cli_pool=None, max_workers=None):
+    """
+    Executes CLIs, in parallel over the handles of cli_pool if set. A CLI
+    failing (eg: an interface without policy or unknown) is logged and left
+    out, so that the outputs of the other CLIs are still returned.
+    :param cli_handle: XR CLI helper handle, used without cli_pool
+    :param cmds: list of CLIs to execute
+    :param cli_pool: HandlePool of XR CLI helper handles
+    :param max_workers: Number of CLIs executed at the same time. Defaults
+                        to the size of cli_pool
+    :return: list of the outputs of the CLIs successful, in the order of cmds.
+             The error of the first CLI is raised if they all failed
+    """
+    def run_cmd(cmd):
+        try:
+            if cli_pool is None:
+                return _cli_exec(cli_handle, cmd)
+            with cli_pool.handle() as handle:
+                return _cli_exec(handle, cmd)
+        except Exception as err:
+            log.error('Skipping CLI {cmd}: {err}'.format(cmd=cmd, err=err))
+            return err
+
+    if cli_pool is None:
+        results = [run_cmd(cmd) for cmd in cmds]
+    else:
+        import concurrent.futures
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or cli_pool.size) as executor:
+            results = list(executor.map(run_cmd, cmds))
+
+    outputs = [result for result in results if not isinstance(result, Exception)]
+    if results and not outputs:
+        raise results[0]
+    return outputs
 
 
-def get_interface_policy_map(cli_handle):
+@profiled
+def get_interface_policy_map(cli_handle, row_filter=None, interfaces=None, cli_pool=None, max_workers=None):
     """
     Does a CLI query of policy-map stats of interfaces on device. A list of
     dictionary is generated with each dictionary have data for one interface
     This list of dictionaries is returned
     CLI used : show policy-map all interface all
+               show policy-map interface <interface> (with interfaces)
     :param cli_handle: XR CLI helper handle
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes to leave out of the result
+    :param interfaces: list of the names of the interfaces to query, one CLI
+                       each. All if None. The interfaces whose CLI fails are
+                       left out (see _cli_exec_all)
+    :param cli_pool: HandlePool of XR CLI helper handles to query the
+                     interfaces in parallel with
+    :param max_workers: Number of interfaces queried at the same time.
+                        Defaults to the size of cli_pool
     :return: dictionary
     """
-    ret_list = list()
-    # regexp patterns to extract data from CLI output
-    class_pattern = r'^Class (\S+)'
-    tx_pattern = r'^\s+Transmitted\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)'
-    total_pattern = r'^\s+Total Dropped\s+:\s+([0-9]+)/([0-9]+)\s+([0-9]+)'
-    ecn_marked_pattern = r'^\s+RED ecn marked & transmitted\(packets/bytes\):\s+([0-9]+)/([0-9]+)'
-
     # executing CLI
-    try:
-        cmd = 'show policy-map interface all'
-        result = cli_handle.xrcli_exec(cmd)
-    except Exception as err:
-        log.exception('Error during CLI (cmd) execution'
-                      'Error : {err}'.format(cmd=cmd, err=err))
-        raise err
-    if not result['status'] == 'success':
-        raise Exception('Execution of CLI {cmd} not successful.'.format(cmd=cmd))
+    output = _policy_map_output(cli_handle, interfaces, cli_pool, max_workers)
+    with profile_phase('parse'):
+        return parse_interface_policy_map(output, row_filter)
 
-    # parsing each lines of the output and writing data into dictionaries
-    intf_dict = dict()
-    for line in result['output'].split('\n'):
 
-        intf_match = re.match(RE_INTF_PATTERN + r'\s+(input|output):\s+(\S+)', line)
-        if intf_match:
+@profiled
+def get_interface_policy_map_top(cli_handle, top, sort_key, row_filter=None, interfaces=None,
+                                 cli_pool=None, max_workers=None):
+    """
+    Does a CLI query of policy-map stats of interfaces on device and selects
+    the top classes while parsing, only keeping top of them at any time
+    CLI used : show policy-map all interface all
+               show policy-map interface <interface> (with interfaces)
+    :param cli_handle: XR CLI helper handle
+    :param top: Number of classes to return
+    :param sort_key: Function (class dict) returning the value the classes are ranked by
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes not to rank
+    :param interfaces: list of the names of the interfaces to query, one CLI
+                       each. All if None. The interfaces whose CLI fails are
+                       left out (see _cli_exec_all)
+    :param cli_pool: HandlePool of XR CLI helper handles to query the
+                     interfaces in parallel with
+    :param max_workers: Number of interfaces queried at the same time.
+                        Defaults to the size of cli_pool
+    :return: list of the top rows, highest first. Rows are the rows of
+             iter_policy_map_rows
+    """
+    output = _policy_map_output(cli_handle, interfaces, cli_pool, max_workers)
+    with profile_phase('parse'):
+        return select_top_policy_map_rows(iter_policy_map_output(output), top, sort_key, row_filter)
 
-            for intf_dict in ret_list:
-                if intf_dict['interface-name'] == intf_match.group(1)+intf_match.group(2):
-                    break
-            else:
-                intf_dict = {'interface-name': intf_match.group(1)+intf_match.group(2),
+
+def _interface_select(interfaces):
+    """
+    :return: select argument of collect() restricting a collector to
+             interfaces, their names converted to the form of the yang keys
+             (eg: Hu0/0/0/0 to HundredGigE0/0/0/0) so that every form matches
+    """
+    if interfaces is None:
+        return {'interface': None}
+    return {'interface': [canonical_interface_name(name) for name in interfaces]}
+
+
+def _policy_map_output(cli_handle, interfaces=None, cli_pool=None, max_workers=None):
+    """
+    :return: output of "show policy-map interface all", or of the
+             "show policy-map interface <interface>" of each interface
+    """
+    if interfaces is None:
+        return _cli_exec(cli_handle, 'show policy-map interface all')
+    cmds = ['show policy-map interface {name}'.format(name=name) for name in interfaces]
+    return '\n'.join(_cli_exec_all(cli_handle, cmds, cli_pool, max_workers))
+
+
+@profiled
+def get_interface_qos_stats(nc_con, interfaces=None, direction=None, row_filter=None):
+    """
+    Does a netconf query of the policy-map stats of interfaces on device. The
+    result has the schema of get_interface_policy_map, the ecn counters being
+    set on the classes having wred stats.
+    Yang path: Cisco-IOS-XR-qos-ma-oper:qos/interface-table/interface
+    :param nc_con: Netconf connection object
+    :param interfaces: list of the names of the interfaces to query, in full,
+                       normal or short form. All if None
+    :param direction: 'input' or 'output', the only direction to query. Both if None
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes to leave out of the result
+    :return: list of dictionaries. each dict has data for one interface
+    """
+    entries = collect(nc_con, 'qos-interface-stats', stream=True, fields=_qos_fields(direction),
+                      select=_interface_select(interfaces))
+    with profile_phase('parse'):
+        return build_interface_policy_map(iter_qos_policy_map(entries), row_filter)
+
+
+@profiled
+def get_interface_qos_stats_top(nc_con, top, sort_key, interfaces=None, direction=None, row_filter=None):
+    """
+    Does a netconf query of the policy-map stats of interfaces on device and
+    selects the top classes while parsing (see get_interface_policy_map_top)
+    Yang path: Cisco-IOS-XR-qos-ma-oper:qos/interface-table/interface
+    :param nc_con: Netconf connection object
+    :param top: Number of classes to return
+    :param sort_key: Function (class dict) returning the value the classes are ranked by
+    :param interfaces: list of the names of the interfaces to query, in full,
+                       normal or short form. All if None
+    :param direction: 'input' or 'output', the only direction to query. Both if None
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes not to rank
+    :return: list of the top rows, highest first. Rows are the rows of
+             iter_policy_map_rows
+    """
+    entries = collect(nc_con, 'qos-interface-stats', stream=True, fields=_qos_fields(direction),
+                      select=_interface_select(interfaces))
+    with profile_phase('parse'):
+        return select_top_policy_map_rows(iter_qos_policy_map(entries), top, sort_key, row_filter)
+
+
+def _qos_fields(direction):
+    """
+    :return: fields of the qos-interface-stats collector restricted to a
+             direction, None for both directions
+    """
+    if direction is None:
+        return None
+    if direction not in ('input', 'output'):
+        raise Exception('Invalid direction {direction}'.format(direction=direction))
+    return _qos_subtree(direction)
+
+
+def iter_qos_policy_map(entries):
+    """
+    Converts the entries of the qos-interface-stats collector to the items
+    of iter_policy_map_output
+    :param entries: iterable of the entries of the qos-interface-stats collector
+    :return: generator of (interface name, direction, policy name, class dict).
+             class dict is None for the policy header of an interface
+    """
+    for entry in entries:
+        intf_name = entry.get('interface-name')
+        for direction in ('input', 'output'):
+            policy_names = (entry.get(direction) or dict()).get('service-policy-names') or dict()
+            for instance in policy_names.get('service-policy-instance') or list():
+                statistics = instance.get('statistics') or dict()
+                policy_name = statistics.get('policy-name') or instance.get('service-policy-name') or ''
+                yield intf_name, direction, policy_name, None
+                for class_stats in statistics.get('class-stats') or list():
+                    general_stats = class_stats.get('general-stats') or dict()
+                    class_dict = {'class-name': class_stats.get('class-name') or ''}
+                    for leaf, key in QOS_GENERAL_STATS:
+                        class_dict[key] = general_stats.get(leaf) or '0'
+                    wred_stats = class_stats.get('wred-stats-array')
+                    if wred_stats:
+                        # counters of all the wred profiles of the class
+                        for leaf, key in QOS_ECN_STATS:
+                            class_dict[key] = str(sum(int(wred.get(leaf) or 0) for wred in wred_stats))
+                    yield intf_name, direction, policy_name, class_dict
+
+
+def iter_policy_map_output(output):
+    """
+    Parses the output of "show policy-map interface" in a single pass.
+    Interface headers, class headers and counter lines are told apart by
+    their first character before any pattern is tried.
+    :param output: CLI output
+    :return: generator of (interface name, direction, policy name, class dict).
+             class dict is None for the policy header of an interface, the
+             dict of each class is yielded once all its counters are parsed
+    """
+    intf_name = class_dict = None
+    direction = policy_name = ''
+    match_tx = RE_POLICY_TX.compiled().match
+    match_total_dropped = RE_POLICY_TOTAL_DROPPED.compiled().match
+    match_ecn_marked = RE_POLICY_ECN_MARKED.compiled().match
+    match_class = RE_POLICY_CLASS.compiled().match
+    match_intf = RE_POLICY_INTF.compiled().match
+
+    for line in output.split('\n'):
+        if not line:
+            continue
+
+        if line[0] in ' \t':
+            # counter lines of the current class
+            if class_dict is None:
+                continue
+            stripped = line.lstrip()
+            if stripped.startswith('Transmitted'):
+                tx_match = match_tx(line)
+                if tx_match:
+                    class_dict['transmitted-packets'] = tx_match.group(1)
+                    class_dict['transmitted-bytes'] = tx_match.group(2)
+                    class_dict['transmitted-rate'] = tx_match.group(3)
+            elif stripped.startswith('Total Dropped'):
+                total_match = match_total_dropped(line)
+                if total_match:
+                    class_dict['total-dropped-packets'] = total_match.group(1)
+                    class_dict['total-dropped-bytes'] = total_match.group(2)
+                    class_dict['total-dropped-rate'] = total_match.group(3)
+            elif stripped.startswith('RED ecn marked'):
+                ecn_marked_match = match_ecn_marked(line)
+                if ecn_marked_match:
+                    class_dict['ecn-marked-transmitted-packets'] = ecn_marked_match.group(1)
+                    class_dict['ecn-marked-transmitted-bytes'] = ecn_marked_match.group(2)
+
+        elif line.startswith('Class '):
+            class_match = match_class(line)
+            if class_match and intf_name is not None:
+                if class_dict is not None:
+                    yield intf_name, direction, policy_name, class_dict
+                class_dict = {'class-name': class_match.group(1)}
+
+        else:
+            intf_match = match_intf(line)
+            if intf_match:
+                if class_dict is not None:
+                    yield intf_name, direction, policy_name, class_dict
+                intf_name = intf_match.group(1) + intf_match.group(2)
+                direction = intf_match.group(3)
+                policy_name = intf_match.group(4)
+                class_dict = None
+                yield intf_name, direction, policy_name, None
+
+    if class_dict is not None:
+        yield intf_name, direction, policy_name, class_dict
+
+
+def parse_interface_policy_map(output, row_filter=None):
+    """
+    Parses the output of "show policy-map interface"
+    :param output: CLI output
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes to leave out of the result
+    :return: list of dictionaries. each dict has data for one interface
+    """
+    return build_interface_policy_map(iter_policy_map_output(output), row_filter)
+
+
+def build_interface_policy_map(classes, row_filter=None):
+    """
+    Groups the classes of the policy maps by interface
+    :param classes: iterable of the items of iter_policy_map_output
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes to leave out of the result
+    :return: list of dictionaries. each dict has data for one interface
+    """
+    ret_list = list()
+    # interface name to its dictionary in ret_list
+    intf_index = dict()
+    intf_dict = None
+    for intf_name, direction, policy_name, class_dict in classes:
+        if class_dict is None:
+            intf_dict = intf_index.get(intf_name)
+            if intf_dict is None:
+                intf_dict = {'interface-name': intf_name,
                              'input-rates': list(), 'output-rates': list(),
                              'input-policy-name': '', 'output-policy-name': ''}
+                intf_index[intf_name] = intf_dict
                 ret_list.append(intf_dict)
-            direction = intf_match.group(3)
-            intf_dict[direction + '-policy-name'] = intf_match.group(4)
-
-        class_match = re.match(class_pattern, line)
-        if class_match and intf_dict:
-            class_dict = {'class-name': class_match.group(1)}
+            intf_dict[direction + '-policy-name'] = policy_name
+        elif row_filter is None or row_filter(intf_name, direction, class_dict):
             intf_dict[direction + '-rates'].append(class_dict)
-
-        tx_match = re.match(tx_pattern, line)
-        if tx_match and class_dict:
-           class_dict['transmitted-packets'] = tx_match.group(1)
-           class_dict['transmitted-bytes'] = tx_match.group(2)
-           class_dict['transmitted-rate'] = tx_match.group(3)
-
-        total_match = re.match(total_pattern, line)
-        if total_match and class_dict:
-            class_dict['total-dropped-packets'] = total_match.group(1)
-            class_dict['total-dropped-bytes'] = total_match.group(2)
-            class_dict['total-dropped-rate'] = total_match.group(3)
-
-        ecn_marked_match = re.match(ecn_marked_pattern, line)
-        if ecn_marked_match and class_dict:
-            class_dict['ecn-marked-transmitted-packets'] = ecn_marked_match.group(1)
-            class_dict['ecn-marked-transmitted-bytes'] = ecn_marked_match.group(2)
     return ret_list
 
 
-def get_interface_name_handle_mapping(cli_handle):
+def select_top_policy_map_rows(classes, top, sort_key, row_filter=None):
+    """
+    Selects the top classes of the policy maps keeping them in a heap of top
+    entries, so that the memory used depends on top and not on the number
+    of interfaces
+    :param classes: iterable of the items of iter_policy_map_output
+    :param top: Number of classes to return
+    :param sort_key: Function (class dict) returning the value the classes are ranked by
+    :param row_filter: Function (interface name, direction, class dict) returning
+                       False for the classes not to rank
+    :return: list of the top rows, highest first. Rows are the rows of
+             iter_policy_map_rows
+    """
+    import heapq
+
+    if top <= 0:
+        return list()
+    # (sort value, -parse order, row), so that equal values rank in parse order
+    heap = list()
+    for num, (intf_name, direction, policy_name, class_dict) in enumerate(classes):
+        if class_dict is None:
+            continue
+        if row_filter is not None and not row_filter(intf_name, direction, class_dict):
+            continue
+        value = sort_key(class_dict)
+        if len(heap) == top and (value, -num) <= heap[0][:2]:
+            continue
+        row = {'interface-name': intf_name, 'direction': direction, 'policy-name': policy_name}
+        row.update(class_dict)
+        if len(heap) < top:
+            heapq.heappush(heap, (value, -num, row))
+        else:
+            heapq.heapreplace(heap, (value, -num, row))
+    return [row for value, num, row in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+
+def iter_policy_map_rows(int_stats_list):
+    """
+    Flattens the result of get_interface_policy_map into one row per class
+    of each interface and direction
+    :param int_stats_list: list of dictionaries from get_interface_policy_map
+    :return: generator of dictionaries with interface-name, direction,
+             policy-name and the class counters
+    """
+    for int_stats in int_stats_list:
+        for direction in ('input', 'output'):
+            for class_stats in int_stats[direction + '-rates']:
+                row = {'interface-name': int_stats['interface-name'],
+                       'direction': direction,
+                       'policy-name': int_stats[direction + '-policy-name']}
+                row.update(class_stats)
+                yield row
+
+
+@profiled
+def get_interface_name_handle_mapping(cli_handle, max_age=None, cache_file=None, interfaces=None,
+                                      cli_pool=None, max_workers=None):
     """
     Does a CLI query of the interface database on device. A
     dictionary is generated with key as the handle and the value as interface name
     This dictionary is returned
+    The mapping only changes when interfaces are created or deleted, so it
+    can be cached in memory and on disk for max_age seconds. The cache is
+    dropped by invalidate_interface_name_handle_mapping.
+    With interfaces, only their handles are returned. They are taken from
+    the cached mapping if there is one, queried one interface at a time
+    otherwise, and are not cached.
     CLI used : show im database brief location all
+               show im database interface <interface> brief (with interfaces)
     :param cli_handle: XR CLI helper handle
+    :param max_age: If set, a mapping cached in the last max_age seconds is
+                    returned instead of running the CLI
+    :param cache_file: File the mapping is also cached in, to be shared
+                       between script runs. eg: INTF_HANDLE_CACHE_FILE
+    :param interfaces: list of the names of the interfaces to query. All if None.
+                       The interfaces whose CLI fails are left out
+    :param cli_pool: HandlePool of XR CLI helper handles to query the
+                     interfaces in parallel with
+    :param max_workers: Number of interfaces queried at the same time.
+                        Defaults to the size of cli_pool
     :return: dictionary
     """
-    ret_dict = dict()
-    # executing CLI
-    try:
-        cmd = 'show im database brief location all'
-        result = cli_handle.xrcli_exec(cmd)
-    except Exception as err:
-        log.exception('Error during CLI (cmd) execution'
-                      'Error : {err}'.format(cmd=cmd, err=err))
-        raise err
-    if not result['status'] == 'success':
-        raise Exception('Execution of CLI {cmd} not successful.'.format(cmd=cmd))
+    with _handle_mapping_lock:
+        if max_age is not None:
+            ret_dict = _get_cached_handle_mapping(max_age, cache_file)
+            if ret_dict is not None:
+                if interfaces is None:
+                    return ret_dict
+                names = set(canonical_interface_name(name) for name in interfaces)
+                return dict((handle, name) for handle, name in ret_dict.items()
+                            if canonical_interface_name(name) in names)
+
+        ret_dict = dict()
+        if interfaces is not None:
+            cmds = ['show im database interface {name} brief'.format(name=name) for name in interfaces]
+            outputs = _cli_exec_all(cli_handle, cmds, cli_pool, max_workers)
+            with profile_phase('parse'):
+                for output in outputs:
+                    _parse_handle_mapping(output, ret_dict)
+            return ret_dict
+
+        # executing CLI
+        output = _cli_exec(cli_handle, 'show im database brief location all')
+
+        # parsing each lines of the output and writing data into dictionaries
+        with profile_phase('parse'):
+            _parse_handle_mapping(output, ret_dict)
+
+        _handle_mapping_cache['time'] = time.time()
+        _handle_mapping_cache['mapping'] = ret_dict
+        if cache_file:
+            _write_handle_mapping_file(cache_file, ret_dict)
+        return ret_dict
+
 
-    # parsing each lines of the output and writing data into dictionaries
-    for line in result['output'].split('\n'):
+def _parse_handle_mapping(output, ret_dict):
+    """
+    Adds the handles of "show im database brief" output to ret_dict
+    """
+    for line in output.split('\n'):
         split_line = line.split(' ')
         if split_line[0].startswith('0x'):
             ret_dict[split_line[0]] = split_line[1]
-    return ret_dict
 
 
+def invalidate_interface_name_handle_mapping(cache_file=None):
+    """
+    Drop the cached interface handle to name mapping. To be called when
+    interfaces are created or deleted, eg: from an EEM script.
+    :param cache_file: Cache file to delete as well
+    :return: None
+    """
+    with _handle_mapping_lock:
+        _handle_mapping_cache['time'] = 0
+        _handle_mapping_cache['mapping'] = None
+        if cache_file:
+            try:
+                os.remove(cache_file)
+            except FileNotFoundError:
+                pass
+
+
+def _get_cached_handle_mapping(max_age, cache_file=None):
+    """
+    :return: cached mapping not older than max_age seconds or None
+    """
+    import json
+    if _handle_mapping_cache['mapping'] is not None and \
+            time.time() - _handle_mapping_cache['time'] <= max_age:
+        return _handle_mapping_cache['mapping']
+    if not cache_file:
+        return None
+    try:
+        with open(cache_file) as cache_fd:
+            cached = json.load(cache_fd)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached['time'] > max_age:
+        return None
+    _handle_mapping_cache['time'] = cached['time']
+    _handle_mapping_cache['mapping'] = cached['mapping']
+    return cached['mapping']
+
+
+def _write_handle_mapping_file(cache_file, mapping):
+    """
+    Atomically replace the cache file with the mapping passed
+    """
+    import json
+    tmp_file = '{cache_file}.{pid}.tmp'.format(cache_file=cache_file, pid=os.getpid())
+    try:
+        with open(tmp_file, 'w') as cache_fd:
+            json.dump({'time': _handle_mapping_cache['time'], 'mapping': mapping}, cache_fd)
+        os.replace(tmp_file, cache_file)
+    except OSError as err:
+        log.warning('Unable to write interface handle cache {cache_file}: {err}'.format(
+            cache_file=cache_file, err=err))
+
+
+# getters runnable by collect_all and the type of handle they need
+GETTERS = {
+    'controller-stats': (get_controller_stats, 'netconf'),
+    'controller-interface-stats': (get_controller_interface_stats, 'netconf'),
+    'npu-interfaces-stats': (get_controller_npu_interfaces_stats, 'netconf'),
+    'interfaces-status': (get_interfaces_status, 'netconf'),
+    'npu-traps-stats': (get_controller_npu_traps_stats, 'netconf'),
+    'hardware-drops': (get_hardware_drops, 'cli'),
+    'interface-policy-map': (get_interface_policy_map, 'cli'),
+    'interface-qos-stats': (get_interface_qos_stats, 'netconf'),
+    'interface-name-handle-mapping': (get_interface_name_handle_mapping, 'cli'),
+}
+
+
+class TransportError(Exception):
+    """
+    Failure of the netconf session or XR CLI helper handle a query was sent
+    on, as opposed to an error in the data it returned
+    """
+
+
+# errors after which a handle is not reused
+TRANSPORT_ERRORS = (TransportError, OSError, EOFError)
+
+
+class HandlePool(object):
+    """
+    Bounded pool of netconf sessions or XR CLI helper handles shared between
+    threads. Handles are created on demand, up to size of them.
+    Example:
+        nc_pool = HandlePool(new_netconf_session, size=4)
+        with nc_pool.handle() as nc_con:
+            stats = get_controller_stats(nc_con)
+        nc_pool.close()
+    """
+
+    def __init__(self, factory, size=4):
+        """
+        :param factory: Function returning a new handle ready to be used
+        :param size: Maximum number of handles open at the same time
+        """
+        self.factory = factory
+        self.size = size
+        # idle handles, the last released being lent first
+        self._idle = list()
+        self._cond = threading.Condition()
+        self._created = 0
+
+    @contextlib.contextmanager
+    def handle(self):
+        """
+        Context manager lending a handle of the pool, waiting for one to be
+        released, or for room to create one, if size handles are already in
+        use. A handle is closed and dropped from the pool if a transport
+        error (see TRANSPORT_ERRORS) is raised while it is lent, and put
+        back into the pool after any other exception.
+        """
+        handle = self._acquire()
+        discard = False
+        try:
+            yield handle
+        except TRANSPORT_ERRORS:
+            discard = True
+            raise
+        finally:
+            if discard:
+                self._discard(handle)
+            else:
+                self._release(handle)
+
+    def close(self):
+        """
+        Close all the handles not currently in use
+        :return: None
+        """
+        with self._cond:
+            handles, self._idle = self._idle, list()
+        for handle in handles:
+            self._discard(handle)
+
+    def _acquire(self):
+        with self._cond:
+            while not self._idle and self._created >= self.size:
+                self._cond.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, handle):
+        with self._cond:
+            self._idle.append(handle)
+            self._cond.notify()
+
+    def _discard(self, handle):
+        # the slot freed lets a waiting thread create a new handle
+        with self._cond:
+            self._created -= 1
+            self._cond.notify()
+        try:
+            if hasattr(handle, 'close'):
+                handle.close()
+        except Exception as err:
+            log.warning('Error closing handle: {err}'.format(err=err))
+
+
+def new_netconf_session():
+    """
+    Open a new netconf session to the router. Used as HandlePool factory.
+    :return: connected NetconfClient object
+    """
+    from iosxr.netconf.netconf_lib import NetconfClient
+    nc_con = NetconfClient()
+    nc_con.connect()
+    return nc_con
+
+
+def new_cli_handle():
+    """
+    Create a new XR CLI helper handle. Used as HandlePool factory.
+    :return: XrcliHelper object
+    """
+    from iosxr.xrcli.xrcli_helper import XrcliHelper
+    return XrcliHelper()
+
+
+class NetconfSessionManager(object):
+    """
+    Keeps one netconf session open for long running (process) scripts and
+    shares it between any number of monitors. The session is opened on first
+    use, checked with a cheap get after being idle and reopened, with an
+    exponential backoff between failed attempts, when it is found broken.
+    Example:
+        nc_manager = NetconfSessionManager()
+        while True:
+            with nc_manager.session() as nc_con:
+                stats = get_controller_stats(nc_con)
+            time.sleep(10)
+    """
+
+    # cheap query used to check an idle session is still alive
+    HEALTH_FILTER = """
+      <system-time xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-shellutil-oper">
+        <uptime/>
+      </system-time>
+    """
+
+    def __init__(self, factory=new_netconf_session, health_check_interval=60,
+                 backoff_initial=1, backoff_max=60):
+        """
+        :param factory: Function returning a new connected netconf session
+        :param health_check_interval: Seconds a session can stay idle before
+                                      being checked on its next use
+        :param backoff_initial: Seconds to wait after a first failed connect
+        :param backoff_max: Maximum seconds to wait between connect attempts
+        """
+        self.factory = factory
+        self.health_check_interval = health_check_interval
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        # sessions opened after the first one
+        self.reconnects = 0
+        self._connects = 0
+        self._nc_con = None
+        self._last_used = 0
+        self._backoff = backoff_initial
+        self._next_attempt = 0
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def session(self):
+        """
+        Context manager lending the netconf session, one user at a time.
+        The session is dropped, to be reopened on next use, if a transport
+        error (see TRANSPORT_ERRORS) is raised while it is lent. It is kept
+        after any other exception, eg: an error parsing the reply.
+        """
+        with self._lock:
+            nc_con = self._get_session()
+            try:
+                yield nc_con
+            except TRANSPORT_ERRORS:
+                self._drop_session()
+                raise
+            self._last_used = time.time()
+
+    def get(self, request):
+        """
+        Does a netconf get on the managed session
+        :param request: xml filter
+        :return: netconf reply xml data structure
+        """
+        with self.session() as nc_con:
+            try:
+                nc_con.rpc.get(request=request)
+            except Exception as err:
+                raise TransportError('Netconf get failed: {err}'.format(err=err)) from err
+            return nc_con.reply
+
+    def is_connected(self):
+        """
+        :return: True if a session is currently open
+        """
+        return self._nc_con is not None
+
+    def close(self):
+        """
+        Close the session
+        :return: None
+        """
+        with self._lock:
+            self._drop_session()
+
+    def _get_session(self):
+        if self._nc_con is not None and \
+                time.time() - self._last_used > self.health_check_interval:
+            try:
+                self._nc_con.rpc.get(request=self.HEALTH_FILTER)
+                self._last_used = time.time()
+            except Exception as err:
+                log.warning('Netconf session health check failed: {err}'.format(err=err))
+                self._drop_session()
+
+        if self._nc_con is None:
+            if time.time() < self._next_attempt:
+                raise Exception('Netconf session down, next connect attempt in {delay:.1f}s'.format(
+                    delay=self._next_attempt - time.time()))
+            try:
+                self._nc_con = self.factory()
+            except Exception as err:
+                self._next_attempt = time.time() + self._backoff
+                log.warning('Netconf connect failed, retrying in {delay}s: {err}'.format(
+                    delay=self._backoff, err=err))
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+                raise
+            if self._connects:
+                self.reconnects += 1
+            self._connects += 1
+            self._backoff = self.backoff_initial
+            self._last_used = time.time()
+        return self._nc_con
+
+    def _drop_session(self):
+        nc_con, self._nc_con = self._nc_con, None
+        if nc_con is not None:
+            try:
+                nc_con.close()
+            except Exception as err:
+                log.debug('Error closing netconf session: {err}'.format(err=err))
+
+
+def collect_all(collectors, nc_pool=None, cli_pool=None, max_workers=None):
+    """
+    Runs several collectors in parallel, each on a handle taken from the
+    pool of the type it needs. A collector failing does not stop the others.
+    Example:
+        results = collect_all(['controller-stats', 'interface-policy-map'],
+                              nc_pool=HandlePool(new_netconf_session, size=2),
+                              cli_pool=HandlePool(new_cli_handle, size=2))
+        if not results['controller-stats']['error']:
+            stats = results['controller-stats']['result']
+    :param collectors: list of names of GETTERS or registered yang collectors,
+                       or dict of {name: dict of keyword arguments of the getter}
+    :param nc_pool: HandlePool of netconf sessions
+    :param cli_pool: HandlePool of XR CLI helper handles
+    :param max_workers: Number of collectors run at the same time.
+                        Defaults to the total size of the pools
+    :return: dict of {name: {'result': getter return value or None,
+                             'error': error message or None,
+                             'latency': seconds the collector took}}
+    """
+    import concurrent.futures
+    if type(collectors) != dict:
+        collectors = dict((name, dict()) for name in collectors)
+    pools = {'netconf': nc_pool, 'cli': cli_pool}
+    if max_workers is None:
+        max_workers = sum(pool.size for pool in pools.values() if pool) or 1
+
+    def run_collector(name, kwargs):
+        ret_dict = {'result': None, 'error': None, 'latency': 0.0}
+        start_time = time.time()
+        try:
+            if name in GETTERS:
+                getter, handle_type = GETTERS[name]
+            elif name in COLLECTORS:
+                getter = functools.partial(collect, name=name)
+                handle_type = 'netconf'
+            else:
+                raise Exception('Unknown collector {name}'.format(name=name))
+            if pools[handle_type] is None:
+                raise Exception('No {handle_type} pool to run collector {name}'.format(
+                    handle_type=handle_type, name=name))
+            with pools[handle_type].handle() as handle:
+                start_time = time.time()
+                ret_dict['result'] = getter(handle, **kwargs)
+        except Exception as err:
+            log.error('Collector {name} failed: {err}'.format(name=name, err=err))
+            ret_dict['error'] = str(err)
+        ret_dict['latency'] = time.time() - start_time
+        log.debug('Collector {name} took {latency:.3f}s'.format(name=name, latency=ret_dict['latency']))
+        return ret_dict
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = dict((name, executor.submit(run_collector, name, kwargs))
+                       for name, kwargs in collectors.items())
+    return dict((name, future.result()) for name, future in futures.items())
+
+
+def join_interface_views(handle_mapping=None, npu_handle_stats=None,
+                         interfaces_status=None, controller_stats=None):
+    """
+    Joins the per interface data of several collectors into one view per
+    interface. Each source is indexed once by canonical interface name (see
+    canonical_interface_name), npu stats being mapped from their interface
+    handle to a name through handle_mapping, so the join takes linear time.
+    Every source is optional.
+    :param handle_mapping: dict of {handle: interface name} from
+                           get_interface_name_handle_mapping
+    :param npu_handle_stats: npu stats rows having node-name, npu-id and
+                             interface-handle. eg: collect(nc_con, 'npu-interface-handles-stats')
+    :param interfaces_status: rows from get_interfaces_status
+    :param controller_stats: rows from get_controller_stats
+    :return: dict of {canonical interface name: {'interface-name': name,
+                      'state': state or None, 'line-state': line state or None,
+                      'controller': controller stats dict or None,
+                      'npu': list of npu stats dicts of the interface}}
+    """
+    views = dict()
+
+    def get_view(name):
+        canonical_name = canonical_interface_name(name)
+        view = views.get(canonical_name)
+        if view is None:
+            view = views[canonical_name] = {'interface-name': name, 'state': None, 'line-state': None,
+                                            'controller': None, 'npu': list()}
+        return view
+
+    for status in interfaces_status or list():
+        view = get_view(status['interface-name'])
+        view['interface-name'] = status['interface-name']
+        view['state'] = status.get('state')
+        view['line-state'] = status.get('line-state')
+
+    for stats in controller_stats or list():
+        get_view(stats['interface-name'])['controller'] = stats
+
+    if npu_handle_stats:
+        handle_index = dict()
+        for handle, name in (handle_mapping or dict()).items():
+            handle_value = interface_handle_value(handle)
+            if handle_value is not None:
+                handle_index[handle_value] = name
+        unknown_handles = 0
+        for stats in npu_handle_stats:
+            name = handle_index.get(interface_handle_value(stats.get('interface-handle')))
+            if name is None:
+                unknown_handles += 1
+                continue
+            get_view(name)['npu'].append(stats)
+        if unknown_handles:
+            log.debug('{count} npu stats rows with an unknown interface handle'.format(count=unknown_handles))
+    return views
+
+
+def canonical_interface_name(name):
+    """
+    Canonical form of an interface name, used to match names across
+    collectors using full, normal or short forms (eg: HundredGigE0/0/0/0 and
+    Hu0/0/0/0). Names of other interface types are returned unchanged.
+    :param name: Interface name
+    :return: Interface name
+    """
+    try:
+        return gen_interface_type_name(name=name, name_format='name')
+    except Exception:
+        return name
+
+
+def interface_handle_value(handle):
+    """
+    Integer value of an interface handle. Handles are hexadecimal with or
+    without a leading 0x depending on the source.
+    :param handle: Interface handle string or integer
+    :return: integer or None if not a valid handle
+    """
+    if type(handle) == int:
+        return handle
+    try:
+        return int(handle, 16)
+    except (TypeError, ValueError):
+        return None
+
+
+@profiled
 def netconf_xml_to_dict(xml_output, xml_tag=None):
     """
     Converts netconf rpc request reply into a dict
@@ -394,13 +2042,110 @@ def netconf_xml_to_dict(xml_output, xml_tag=None):
                     "data" tag is used if empty.
     :return: dictionary equivalent of xml passed
     """
+    import xmltodict
     if xml_tag:
         pattern = '<data.*?>.*?(<%s.*?>.*</%s>).*</data>' % (xml_tag, xml_tag)
     else:
         pattern = '(<data>.*</data>)'
-    xml_output = xml_output.replace('\n', ' ')
-    xml_data_match = re.search(pattern, xml_output)
-    ret_dict = xmltodict.parse(xml_data_match.group(1))
+    _profile_bytes(len(xml_output))
+    with profile_phase('extract'):
+        xml_output = xml_output.replace('\n', ' ')
+        xml_data_match = re.search(pattern, xml_output)
+    with profile_phase('xmltodict'):
+        ret_dict = xmltodict.parse(xml_data_match.group(1))
+    return ret_dict
+
+
+def netconf_xml_iter(xml_output, path, context=None):
+    """
+    Incrementally parses a netconf rpc request reply and yields the list
+    entries found at path one at a time. Each entry is converted into the
+    dict structure netconf_xml_to_dict generates for it (except for the
+    namespace prefixes, see _element_to_dict) and is freed
+    from the parsed tree once yielded, so the memory used does not depend
+    on the number of entries in the reply.
+    :param xml_output: netconf reply xml data structure
+    :param path: '/' separated path of the list entries to yield, relative
+                 to the "data" tag. eg: 'ethernet-interface/statistics/statistic'
+    :param context: dict of {key: path} of leaves outside the entries whose
+                    value is added as key to every entry yielded after them.
+                    eg: {'node-name': 'ofa/stats/nodes/node/node-name'}
+    :return: generator of dictionaries. each dict is one list entry
+    """
+    import xml.etree.ElementTree as ElementTree
+    data_match = re.search(r'<data[\s/>]', xml_output)
+    data_end = xml_output.rfind('</data>')
+    if not data_match or data_end < 0:
+        return
+    data_end += len('</data>')
+
+    path = tuple(path.split('/'))
+    context_paths = dict((tuple(ctx_path.split('/')), key)
+                         for key, ctx_path in (context or {}).items())
+    context_values = dict()
+
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    # tag names (without namespace) and elements from "data" to the current element
+    names = list()
+    elems = list()
+    for offset in range(data_match.start(), data_end, NETCONF_PARSE_CHUNK):
+        parser.feed(xml_output[offset:min(offset + NETCONF_PARSE_CHUNK, data_end)])
+        for event, elem in parser.read_events():
+            if event == 'start':
+                names.append(elem.tag.rpartition('}')[2])
+                elems.append(elem)
+                continue
+
+            rel_path = tuple(names[1:])
+            if rel_path == path:
+                entry = _element_to_dict(elem)
+                entry.update(context_values)
+                yield entry
+            elif rel_path in context_paths:
+                context_values[context_paths[rel_path]] = (elem.text or '').strip()
+            else:
+                # leaving an element resets the context collected inside it
+                depth = len(rel_path)
+                for ctx_path, key in context_paths.items():
+                    if len(ctx_path) > depth and ctx_path[:depth] == rel_path:
+                        context_values.pop(key, None)
+
+            # free everything that is not part of an entry still being parsed
+            if len(elems) > 1 and not (len(rel_path) > len(path) and
+                                       rel_path[:len(path)] == path):
+                elems[-2].remove(elem)
+            names.pop()
+            elems.pop()
+    parser.close()
+
+
+def _element_to_dict(elem):
+    """
+    Converts an ElementTree element to the structure xmltodict.parse
+    generates for the same xml, except for the namespaces: element and
+    attribute keys have no namespace prefix ('c' and '@type' where xmltodict
+    has 'xc:c' and '@xc:type') and the xmlns declarations ('@xmlns',
+    '@xmlns:xc') are left out. The yang replies use unprefixed elements.
+    :param elem: ElementTree element
+    :return: dictionary or string equivalent of element
+    """
+    ret_dict = dict()
+    for attr_name, attr_value in elem.attrib.items():
+        ret_dict['@' + attr_name.rpartition('}')[2]] = attr_value
+    for child in elem:
+        child_name = child.tag.rpartition('}')[2]
+        child_value = _element_to_dict(child)
+        if child_name not in ret_dict:
+            ret_dict[child_name] = child_value
+        elif type(ret_dict[child_name]) == list:
+            ret_dict[child_name].append(child_value)
+        else:
+            ret_dict[child_name] = [ret_dict[child_name], child_value]
+    text = (elem.text or '').strip() or None
+    if not ret_dict:
+        return text
+    if text:
+        ret_dict['#text'] = text
     return ret_dict
 
 
@@ -412,14 +2157,22 @@ def get_interface_rsmp(intf):
     :param intf: Interface name
     :return: list of integers
     """
+    return list(interface_sort_key(intf))
+
+
+@functools.lru_cache(maxsize=65536)
+def interface_sort_key(intf):
+    """
+    Memoized tuple of the rack, slot, module, port etc integers of an interface
+    name, as in get_interface_rsmp. To be used as key for sorting interfaces.
+    :param intf: Interface name
+    :return: tuple of integers
+    """
     rsmp = list()
-    for item in re.split(r'/|\.', intf):
-        try:
-            rsmp_match = re.match(r'^[A-Za-z]*([0-9\.]+)', item)
-            rsmp.append(int(rsmp_match.group(1)))
-        except:
-            rsmp.append(0)
-    return rsmp
+    for item in RE_RSMP_SPLIT.split(intf):
+        rsmp_match = RE_RSMP_ITEM.match(item)
+        rsmp.append(int(rsmp_match.group(1)) if rsmp_match else 0)
+    return tuple(rsmp)
 
 
 def is_ignore_interface(interface_name):
@@ -436,73 +2189,39 @@ def gen_interface_type_name(bandwidth=0, name='', name_format='name'):
     """
     Generate the interface name in full/short/normal for
     for the bandwidth or interface name passed.
+    The interface type of the name can be in any of the full/short/normal
+    format. Names are looked up in INTF_SPEED_TABLE and memoized.
     :param bandwidth:  Bandwidth in kb
     :param name:  name of the interface
     :param name_format: [full,name,short] format of the name returned
     :return:
     """
-    names = dict()
-    rmsp = ''
+    return _gen_interface_type_name(int(bandwidth), name, name_format)
+
+
+@functools.lru_cache(maxsize=65536)
+def _gen_interface_type_name(bandwidth, name, name_format):
+    rsmp = ''
+    speed_row = INTF_TYPES_BY_BANDWIDTH.get(bandwidth)
     if name:
-        match = re.search(RE_INTF_PATTERN, name)
+        match = RE_INTF.search(name)
         if match:
-            name_type = match.group(1).lower()
+            type_row = INTF_TYPES_BY_TOKEN.get(match.group(1).lower())
             rsmp = match.group(2)
         else:
             raise Exception('Invalid interface name ({name}) passed as argument'.format(name=name))
+        # the row listed first wins when bandwidth and name disagree
+        if type_row is not None and (speed_row is None or type_row[0] < speed_row[0]):
+            speed_row = type_row
 
-    if int(bandwidth) == 1000000 or \
-        name_type == "gige":
-        names['full'] = "GigabitEthernet"
-        names['name'] = "GigE"
-        names['short'] = "Gi"
-    elif int(bandwidth) == 10000000 or \
-            name_type == "tengige":
-        names['full'] = "TenGigabitEthernet"
-        names['name'] = "TenGigE"
-        names['short'] = "Te"
-    elif int(bandwidth) == 25000000 or \
-            name_type == "twentyfivegige":
-        names['full'] = "TwentyFiveGigabitEthernet"
-        names['name'] = "TwentyFiveGigE"
-        names['short'] = "TF"
-    elif int(bandwidth) == 40000000 or \
-            name_type == "fortygige":
-        names['full'] = "FortyGigabitEthernet"
-        names['name'] = "FortyGigE"
-        names['short'] = "Fo"
-    elif int(bandwidth) == 50000000 or \
-            name_type == "fiftygige":
-        names['full'] = "FiftyGigabitEthernet"
-        names['name'] = "FiftyGigE"
-        names['short'] = "Fi"
-    elif int(bandwidth) == 100000000 or \
-            name_type == "hundredgige":
-        names['full'] = "HundredGigabitEthernet"
-        names['name'] = "HundredGigE"
-        names['short'] = "Hu"
-    elif int(bandwidth) == 200000000 or \
-            name_type == "twohundredgige":
-        names['full'] = "TwoHundredGigabitEthernet"
-        names['name'] = "TwoHundredGigE"
-        names['short'] = "TH"
-    elif int(bandwidth) == 400000000 or \
-            name_type == "fourhundredgige":
-        names['full'] = "FourHundredGigabitEthernet"
-        names['name'] = "FourHundredGigE"
-        names['short'] = "FH"
-    elif int(bandwidth) == 800000000 or \
-            name_type == "eighthundredgige":
-        names['full'] = "EightHundredGigabitEthernet"
-        names['name'] = "EightHundredGigE"
-        names['short'] = "EH"
-    else:
+    if speed_row is None:
         if name:
             raise Exception('Invalid interface name ({name}) passed as argument'.format(name=name))
         else:
-            raise Exception('Unknown interface bandwidth: {bw}'.format(bw=int(bandwidth)))
+            raise Exception('Unknown interface bandwidth: {bw}'.format(bw=bandwidth))
 
-    if name_format in ['full', 'name', 'short']:
-        return names[name_format]+rsmp
+    if name_format in INTF_NAME_FORMATS:
+        return speed_row[INTF_NAME_FORMATS[name_format]] + rsmp
     else:
         raise Exception('Invalid value for name_format. valid values are full,name, or short')
+
@@ -0,0 +1,236 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+"""
+Report engine of the report scripts. A report is made of tables described
+by their columns (see Table), each filled from an iterator of rows (dicts).
+The same rows are rendered as text tables, json, csv or NDJSON, written
+incrementally to a stream (eg: sys.stdout) so that the first rows are
+output before the whole report is generated and the report is never held
+in memory as a whole.
+
+Example:
+    table = xr_report.Table([xr_report.Column('Interface', 'interface-name', 16),
+                             xr_report.Column('Tx Pkts', 'transmitted-packets', 16, '>')],
+                            title='Output')
+    xr_report.write_report(sys.stdout, 'text', [(table, rows)])
+"""
+import csv
+import json
+import operator
+from collections import OrderedDict
+
+REPORT_FORMATS = ('text', 'json', 'csv', 'ndjson')
+
+
+class Column(object):
+    """
+    Column of a report table
+    """
+    __slots__ = ('name', 'key', 'width', 'align', 'text')
+
+    def __init__(self, name, key, width=0, align='<', text=True):
+        """
+        :param name: Header of the column in text tables
+        :param key: Key of the value of the column in the rows
+        :param width: Width of the column in text tables
+        :param align: Alignment of the column in text tables, '<' or '>'
+        :param text: If False the column is only in the json/csv/ndjson
+                     formats, eg: a column given by the title of the text table
+        """
+        self.name = name
+        self.key = key
+        self.width = width
+        self.align = align
+        self.text = text
+
+
+def _values_getter(keys):
+    """
+    :return: function returning the tuple of the values of keys in a row
+    """
+    get = operator.itemgetter(*keys)
+    if len(keys) == 1:
+        return lambda row: (get(row),)
+    return get
+
+
+class Table(object):
+    """
+    Columns of a report table. The text row format of the table is compiled
+    once, so formatting a row is a single call.
+    """
+
+    def __init__(self, columns, title=None, padding=4):
+        """
+        :param columns: list of Column
+        :param title: Title printed above the text table
+        :param padding: Characters added to the width of the separator lines
+        """
+        self.columns = list(columns)
+        self.title = title
+        self.keys = tuple(column.key for column in self.columns)
+        self._get = _values_getter(self.keys)
+
+        text_columns = [column for column in self.columns if column.text]
+        self.sline = '-' * (sum(column.width for column in text_columns) + padding)
+        self._format = ''.join('{{:{align}{width}}}'.format(align=column.align, width=column.width)
+                               for column in text_columns).format
+        self._get_text = _values_getter(tuple(column.key for column in text_columns))
+        self.header = self._format(*(column.name for column in text_columns))
+
+    def values(self, row):
+        """
+        :return: tuple of the values of the columns in row
+        """
+        return self._get(row)
+
+    def format_row(self, row):
+        """
+        :return: text line of row, without line end
+        """
+        return self._format(*self._get_text(row))
+
+    def row_dict(self, row):
+        """
+        :return: OrderedDict of the values of the columns in row
+        """
+        return OrderedDict(zip(self.keys, self._get(row)))
+
+
+class JsonWriter(object):
+    """
+    Writes items one at a time as a json array, formatted like
+    json.dumps(items, indent=indent), or as NDJSON (one json document per line)
+    """
+
+    def __init__(self, stream, ndjson=False, indent=4):
+        """
+        :param stream: File-like object written to
+        :param ndjson: If True each item is written on its own line, without
+                       enclosing array
+        :param indent: Indentation of the json array
+        """
+        self.stream = stream
+        self.ndjson = ndjson
+        self.indent = indent
+        self.prefix = ' ' * indent
+        self.count = 0
+
+    def write(self, item):
+        """
+        Writes an item of the array
+        :param item: json serializable item
+        :return: None
+        """
+        if self.ndjson:
+            self.stream.write(json.dumps(item) + '\n')
+        else:
+            text = json.dumps(item, indent=self.indent).replace('\n', '\n' + self.prefix)
+            self.stream.write(('[\n' if not self.count else ',\n') + self.prefix + text)
+        self.count += 1
+
+    def close(self):
+        """
+        Ends the json array
+        :return: None
+        """
+        if self.ndjson:
+            return
+        self.stream.write('\n]' if self.count else '[]')
+
+
+class ReportWriter(object):
+    """
+    Writes the tables of a report in a format, as they come, eg: a table
+    per sample of a watch loop. See write_report for the formats.
+    """
+
+    def __init__(self, stream, report_format):
+        """
+        :param stream: File-like object written to
+        :param report_format: One of REPORT_FORMATS
+        """
+        if report_format not in REPORT_FORMATS:
+            raise Exception('Invalid report format {report_format}'.format(report_format=report_format))
+        self.stream = stream
+        self.report_format = report_format
+        self.tables = 0
+        self._json_writer = None
+        self._csv_writer = None
+        # keys of the last csv header written
+        self._csv_keys = None
+        if report_format in ('json', 'ndjson'):
+            self._json_writer = JsonWriter(stream, ndjson=(report_format == 'ndjson'))
+        elif report_format == 'csv':
+            self._csv_writer = csv.writer(stream, lineterminator='\n')
+
+    def write_table(self, table, rows):
+        """
+        Writes a table, its rows being written as they are read from rows
+        :param table: Table
+        :param rows: iterator of row dicts
+        :return: number of rows written
+        """
+        count = 0
+        if self.report_format == 'text':
+            write = self.stream.write
+            write(table.sline + '\n' if self.tables == 0 else '\n')
+            if table.title:
+                write(table.title + '\n')
+            write(table.header + '\n')
+            write(table.sline + '\n')
+            format_row = table.format_row
+            for row in rows:
+                write(format_row(row) + '\n')
+                count += 1
+            write(table.sline + '\n')
+
+        elif self._json_writer is not None:
+            json_write = self._json_writer.write
+            row_dict = table.row_dict
+            for row in rows:
+                json_write(row_dict(row))
+                count += 1
+
+        else:
+            if table.keys != self._csv_keys:
+                self._csv_keys = table.keys
+                self._csv_writer.writerow(table.keys)
+            csv_write = self._csv_writer.writerow
+            values = table.values
+            for row in rows:
+                csv_write(values(row))
+                count += 1
+
+        self.tables += 1
+        return count
+
+    def close(self):
+        """
+        Ends the report
+        :return: None
+        """
+        if self._json_writer is not None:
+            self._json_writer.close()
+
+
+def write_report(stream, report_format, tables):
+    """
+    Writes the rows of the tables of a report in a format:
+    - text: a table per Table, with its title, header and separator lines
+    - json: an array of the rows of all the tables
+    - csv: a header line with the column keys, then a line per row. The
+           header is written again before a table with other columns
+    - ndjson: a json document per row
+    Rows are written as they are read from their iterator.
+    :param stream: File-like object written to
+    :param report_format: One of REPORT_FORMATS
+    :param tables: list of (Table, iterator of row dicts)
+    :return: number of rows written
+    """
+    report_writer = ReportWriter(stream, report_format)
+    count = 0
+    for table, rows in tables:
+        count += report_writer.write_table(table, rows)
+    report_writer.close()
+    return count
@@ -0,0 +1,448 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+"""
+Compact binary snapshots of the data collected by xr_data_collector.
+
+A snapshot stores the rows of one collector result (list of flat dicts or
+xr_data_collector.CounterTable) column by column: integer counters as
+64-bit values and every other value as an id in a table of unique strings.
+The type of the values of each column is recorded, so they are read back
+as they were written: integers, strings of digits, strings, or other json
+values (floats, booleans, nested lists and dicts).
+Rows are indexed by their key, so SnapshotReader memory maps the file and
+reads a single row without decoding the rest of the file.
+
+File layout (little endian):
+    header      : magic, version, row/column/string counts, timestamp,
+                  offsets of the sections below
+    key columns : string ids of the names of the key columns
+    columns     : per column, string id of its name, type, flags and data offset
+    strings     : offsets of each string then the utf-8 strings
+    index       : (key string id, row number) sorted by key string
+    column data : rows * uint64 for counters, followed by a bitmap of the rows
+                  having a value if some are missing, rows * uint32 string ids
+                  otherwise
+
+Example:
+    xr_snapshot.save_history_snapshot('/harddisk:/stats', 'controller-stats',
+                                      xr_data_collector.get_controller_stats(nc_con),
+                                      key='interface-name', keep=60)
+    with xr_snapshot.SnapshotReader(xr_snapshot.list_snapshots('/harddisk:/stats',
+                                                               'controller-stats')[0]) as snapshot:
+        old_stats = snapshot.row('HundredGigE0/0/0/0')
+"""
+import array
+import glob
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+
+log = logging.getLogger("xr_snapshot")
+
+SNAPSHOT_MAGIC = b'XRSN'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = '.xrsnap'
+# timestamp of the snapshots written by save_history_snapshot, and its glob pattern
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+SNAPSHOT_TIME_GLOB = '[0-9]' * 8 + '-' + '[0-9]' * 6
+
+# magic, version, key column count, row count, column count, string count, timestamp,
+# offsets of key columns, columns, strings, index and column data
+HEADER = struct.Struct('<4sHHIIId5Q')
+COLUMN_ENTRY = struct.Struct('<IBB2xQ')
+
+# column types: integers, strings, strings of digits stored as integers,
+# other values stored as json strings
+COLUMN_COUNTER = 0
+COLUMN_STRING = 1
+COLUMN_DIGITS = 2
+COLUMN_JSON = 3
+# column flag: the counters are followed by a bitmap of the rows having a value
+COLUMN_HAS_BITMAP = 1
+
+MAX_COUNTER = 2 ** 64 - 1
+# value of the missing cells of the array('Q') columns of a CounterTable
+# (xr_data_collector.MISSING_COUNTER), and of the version 1 counter columns
+MISSING_COUNTER = 2 ** 64 - 1
+# string id stored for missing values
+MISSING_STRING = 2 ** 32 - 1
+# separator of the values of multi column keys in the index
+KEY_SEPARATOR = '\x1f'
+# characters of the strings stored as counters, str.isdigit also accepting other unicode digits
+DIGITS = '0123456789'
+
+
+def write_snapshot(path, rows, key=None, timestamp=None):
+    """
+    Write a snapshot of collector rows to a file. The file is replaced atomically.
+    :param path: Snapshot file path
+    :param rows: list of flat dictionaries or CounterTable
+    :param key: Name of the column identifying a row, or tuple of names.
+                Defaults to the key of a CounterTable
+    :param timestamp: Time the rows were collected. Defaults to now
+    :return: Size of the file written in bytes
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    if key is None:
+        key = getattr(rows, 'key', None)
+    key_names = list(key) if type(key) == tuple else [key] if key else list()
+
+    columns, row_count = _rows_to_columns(rows)
+    strings = _StringTable()
+    key_ids = [strings.add(name) for name in key_names]
+
+    # column data
+    column_entries = list()
+    column_blobs = list()
+    for name, values in columns.items():
+        column_type = _column_type(values)
+        flags = 0
+        if column_type in (COLUMN_COUNTER, COLUMN_DIGITS):
+            if type(values) == array.array:
+                data = values
+                present = [value != MISSING_COUNTER for value in values] if MISSING_COUNTER in values else None
+            else:
+                data = array.array('Q', (0 if value is None else int(value) for value in values))
+                present = [value is not None for value in values] if None in values else None
+            blob = _to_bytes(data)
+            if present is not None:
+                flags |= COLUMN_HAS_BITMAP
+                blob += _bitmap(present)
+        else:
+            if column_type == COLUMN_JSON:
+                values = (None if value is None else json.dumps(value, sort_keys=True) for value in values)
+            data = array.array('I', (MISSING_STRING if value is None else strings.add(value)
+                                     for value in values))
+            blob = _to_bytes(data)
+        column_entries.append((strings.add(name), column_type, flags))
+        column_blobs.append(blob)
+
+    # key index sorted by key string
+    index = list()
+    if key_names:
+        key_columns = [columns.get(name) or [None] * row_count for name in key_names]
+        for row_num, key_values in enumerate(zip(*key_columns)):
+            index.append((KEY_SEPARATOR.join(_to_str(value) for value in key_values), row_num))
+        index.sort()
+    index_data = array.array('I')
+    for key_str, row_num in index:
+        index_data.append(strings.add(key_str))
+        index_data.append(row_num)
+
+    string_blob = strings.to_bytes()
+    key_offset = HEADER.size
+    columns_offset = key_offset + 4 * len(key_ids)
+    strings_offset = columns_offset + COLUMN_ENTRY.size * len(column_entries)
+    index_offset = strings_offset + len(string_blob)
+    data_offset = index_offset + 4 * len(index_data)
+    # 8 byte alignment of the column data
+    data_offset += -data_offset % 8
+
+    directory = b''
+    offset = data_offset
+    for (name_id, column_type, flags), blob in zip(column_entries, column_blobs):
+        directory += COLUMN_ENTRY.pack(name_id, column_type, flags, offset)
+        offset += len(blob) + (-len(blob) % 8)
+
+    tmp_path = '{path}.{pid}.tmp'.format(path=path, pid=os.getpid())
+    with open(tmp_path, 'wb') as snap_fd:
+        snap_fd.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(key_ids), row_count,
+                                  len(column_entries), len(strings), timestamp,
+                                  key_offset, columns_offset, strings_offset, index_offset, data_offset))
+        snap_fd.write(_to_bytes(array.array('I', key_ids)))
+        snap_fd.write(directory)
+        snap_fd.write(string_blob)
+        snap_fd.write(_to_bytes(index_data))
+        snap_fd.write(b'\0' * (data_offset - index_offset - 4 * len(index_data)))
+        for blob in column_blobs:
+            snap_fd.write(blob)
+            snap_fd.write(b'\0' * (-len(blob) % 8))
+        size = snap_fd.tell()
+    os.replace(tmp_path, path)
+    return size
+
+
+def read_snapshot(path):
+    """
+    Read all the rows of a snapshot
+    :param path: Snapshot file path
+    :return: list of dictionaries
+    """
+    with SnapshotReader(path) as snapshot:
+        return list(snapshot)
+
+
+class SnapshotReader(object):
+    """
+    Memory mapped snapshot reader. Only the header is decoded when opening,
+    rows and columns are decoded on access.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Snapshot file path
+        """
+        self.path = path
+        self._fd = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fd.close()
+            raise
+        (magic, self.version, key_count, self.row_count, column_count, self.string_count, self.timestamp,
+         key_offset, columns_offset, self._strings_offset, self._index_offset,
+         data_offset) = HEADER.unpack_from(self._map, 0)
+        # version 1 snapshots mark the missing counters with MISSING_COUNTER
+        if magic != SNAPSHOT_MAGIC or self.version not in (1, SNAPSHOT_VERSION):
+            self.close()
+            raise Exception('{path} is not a version {version} snapshot'.format(
+                path=path, version=SNAPSHOT_VERSION))
+        self._string_data = self._strings_offset + 4 * (self.string_count + 1)
+
+        self.key = tuple(self.string(string_id) for string_id in
+                         struct.unpack_from('<%dI' % key_count, self._map, key_offset))
+        # column name to (type, flags, data offset)
+        self.columns = dict()
+        for column_num in range(column_count):
+            name_id, column_type, flags, offset = COLUMN_ENTRY.unpack_from(
+                self._map, columns_offset + column_num * COLUMN_ENTRY.size)
+            self.columns[self.string(name_id)] = (column_type, flags, offset)
+
+    def string(self, string_id):
+        """
+        :return: string of the string table having the id passed
+        """
+        start, end = struct.unpack_from('<2I', self._map, self._strings_offset + 4 * string_id)
+        return self._map[self._string_data + start:self._string_data + end].decode('utf-8')
+
+    def value(self, row_num, name):
+        """
+        :return: value of a column in a row. None if the row has no value for it
+        """
+        column_type, flags, offset = self.columns[name]
+        if column_type in (COLUMN_COUNTER, COLUMN_DIGITS):
+            if flags & COLUMN_HAS_BITMAP and \
+                    not self._map[offset + 8 * self.row_count + (row_num >> 3)] >> (row_num & 7) & 1:
+                return None
+            value = struct.unpack_from('<Q', self._map, offset + 8 * row_num)[0]
+            if self.version == 1 and value == MISSING_COUNTER:
+                return None
+            return str(value) if column_type == COLUMN_DIGITS else value
+        string_id = struct.unpack_from('<I', self._map, offset + 4 * row_num)[0]
+        if string_id == MISSING_STRING:
+            return None
+        if column_type == COLUMN_JSON:
+            return json.loads(self.string(string_id))
+        return self.string(string_id)
+
+    def row_at(self, row_num):
+        """
+        :return: dictionary of a row by row number
+        """
+        ret_dict = dict()
+        for name in self.columns:
+            value = self.value(row_num, name)
+            if value is not None:
+                ret_dict[name] = value
+        return ret_dict
+
+    def find(self, key):
+        """
+        Binary search of the key index
+        :param key: Key value, or tuple of values for multi column keys
+        :return: row number or None
+        """
+        key_str = KEY_SEPARATOR.join(_to_str(value) for value in key) if type(key) == tuple else _to_str(key)
+        low, high = 0, self.row_count if self.key else 0
+        while low < high:
+            mid = (low + high) // 2
+            string_id, row_num = struct.unpack_from('<2I', self._map, self._index_offset + 8 * mid)
+            mid_str = self.string(string_id)
+            if mid_str == key_str:
+                return row_num
+            if mid_str < key_str:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def row(self, key, default=None):
+        """
+        :return: dictionary of the row having the key passed
+        """
+        row_num = self.find(key)
+        if row_num is None:
+            return default
+        return self.row_at(row_num)
+
+    def column(self, name):
+        """
+        :return: list of all the values of a column
+        """
+        return [self.value(row_num, name) for row_num in range(self.row_count)]
+
+    def __len__(self):
+        return self.row_count
+
+    def __iter__(self):
+        for row_num in range(self.row_count):
+            yield self.row_at(row_num)
+
+    def close(self):
+        self._map.close()
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def save_history_snapshot(directory, name, rows, key=None, keep=60, timestamp=None):
+    """
+    Write a timestamped snapshot in directory and delete the oldest snapshots
+    of the same name, so that at most keep of them use disk space
+    :param directory: Directory holding the snapshots
+    :param name: Name of the dataset. eg: 'controller-stats'
+    :param rows: list of flat dictionaries or CounterTable
+    :param key: Name of the column identifying a row, or tuple of names
+    :param keep: Number of snapshots of this name kept
+    :param timestamp: Time the rows were collected. Defaults to now
+    :return: Path of the snapshot written
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    path = os.path.join(directory, '{name}-{ts}{suffix}'.format(
+        name=name, ts=time.strftime(SNAPSHOT_TIME_FORMAT, time.gmtime(timestamp)), suffix=SNAPSHOT_SUFFIX))
+    write_snapshot(path, rows, key=key, timestamp=timestamp)
+    for old_path in list_snapshots(directory, name)[keep:]:
+        try:
+            os.remove(old_path)
+        except OSError as err:
+            log.warning('Unable to remove snapshot {path}: {err}'.format(path=old_path, err=err))
+    return path
+
+
+def list_snapshots(directory, name):
+    """
+    :return: paths of the snapshots of a dataset, newest first. The snapshots
+             of datasets whose name starts with name are left out.
+    """
+    pattern = glob.escape(name) + '-' + SNAPSHOT_TIME_GLOB + SNAPSHOT_SUFFIX
+    return sorted(glob.glob(os.path.join(glob.escape(directory), pattern)), reverse=True)
+
+
+class _StringTable(object):
+    """
+    Unique strings of a snapshot, identified by their position
+    """
+
+    def __init__(self):
+        self._ids = dict()
+        self._strings = list()
+
+    def add(self, string):
+        string_id = self._ids.get(string)
+        if string_id is None:
+            string_id = self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return string_id
+
+    def __len__(self):
+        return len(self._strings)
+
+    def to_bytes(self):
+        encoded = [string.encode('utf-8') for string in self._strings]
+        offsets = array.array('I', [0])
+        for data in encoded:
+            offsets.append(offsets[-1] + len(data))
+        return _to_bytes(offsets) + b''.join(encoded)
+
+
+def _rows_to_columns(rows):
+    """
+    :return: (dict of column name to list of values, number of rows)
+    """
+    if hasattr(rows, 'columns') and hasattr(rows, 'length'):
+        # CounterTable
+        return dict(rows.columns), len(rows)
+    columns = dict()
+    row_count = 0
+    for row in rows:
+        for name, value in row.items():
+            column = columns.get(name)
+            if column is None:
+                column = columns[name] = [None] * row_count
+            column.append(value)
+        row_count += 1
+        for column in columns.values():
+            if len(column) < row_count:
+                column.append(None)
+    return columns, row_count
+
+
+def _column_type(values):
+    """
+    :return: type of the column the values are stored in: COLUMN_COUNTER if
+             they are all integers, COLUMN_DIGITS if they are all strings of
+             digits read back unchanged as integers (no leading zero),
+             COLUMN_STRING if they are all strings and COLUMN_JSON otherwise
+    """
+    if type(values) == array.array:
+        return COLUMN_COUNTER
+    column_type = None
+    for value in values:
+        if value is None:
+            continue
+        if type(value) == int and 0 <= value <= MAX_COUNTER:
+            value_type = COLUMN_COUNTER
+        elif type(value) == str:
+            if value and not value.strip(DIGITS) and (value == '0' or value[0] != '0') and \
+                    int(value) <= MAX_COUNTER:
+                value_type = COLUMN_DIGITS
+            else:
+                value_type = COLUMN_STRING
+        else:
+            return COLUMN_JSON
+        if column_type is None or column_type == value_type:
+            column_type = value_type
+        elif {column_type, value_type} == {COLUMN_DIGITS, COLUMN_STRING}:
+            column_type = COLUMN_STRING
+        else:
+            return COLUMN_JSON
+    return COLUMN_STRING if column_type is None else column_type
+
+
+def _bitmap(present):
+    """
+    :return: bytes of a bitmap, the bit of a row being set if present is True for it
+    """
+    bits = bytearray((len(present) + 7) // 8)
+    for row_num, is_present in enumerate(present):
+        if is_present:
+            bits[row_num >> 3] |= 1 << (row_num & 7)
+    return bytes(bits)
+
+
+def _to_bytes(data):
+    """
+    :return: little endian bytes of an array
+    """
+    if sys.byteorder != 'little':
+        data = array.array(data.typecode, data)
+        data.byteswap()
+    return data.tobytes()
+
+
+def _to_str(value):
+    if type(value) == str:
+        return value
+    if type(value) in (dict, list):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
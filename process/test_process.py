@@ -1,7 +1,8 @@
 # Copyright (c) 2021 by Cisco Systems, Inc.
 # All rights reserved.
 """
-Script to check cpu utilization at regular intervals
+Script to check cpu utilization at regular intervals, alerting on single
+samples and on the hourly trend kept in a bounded in-memory history
 
 Arguments:
 threshold: int, threshold of cpu utilization
@@ -14,7 +15,7 @@ Step 2: Register the application with Appmgr
 Configuraton:
 appmgr process-script my-process-app
 executable test_process.py
-run-args <threshold-value>
+run-args <threshold-value> [--interval <seconds>]
 
 Step 3: Activate the registered application
 appmgr process-script activate name my-process-app
@@ -39,20 +40,25 @@ RP/0/RP0/CPU0:ios#appmgr process-script ?
 """ 
 
 import time
-import os
-import xmltodict
-import re
 import argparse
 
 from cisco.script_mgmt import xrlog
-from iosxr.netconf.netconf_lib import NetconfClient
+from cisco.script_mgmt import xr_utils
+# import xr_data_collector
+xr_data_collector = xr_utils.secure_import(module_file_name="xr_data_collector.py")
+# import xr_timeseries
+xr_timeseries = xr_utils.secure_import(module_file_name="xr_timeseries.py")
 
 log = xrlog.getScriptLogger('Sample')
 syslog = xrlog.getSysLogger('Sample')
 
-def cpu_memory_check(threshold):
+def cpu_memory_check(nc_manager, threshold, store=None):
     """
-    Check total routes in router
+    Check cpu utilization of the RP against the threshold
+    :param nc_manager: NetconfSessionManager sharing the netconf session
+    :param threshold: cpu utilization threshold
+    :param store: TimeSeriesStore keeping the history of the samples
+    :return: cpu utilization
     """
     filter_string = """
     <system-monitoring xmlns="http://cisco.com/ns/yang/Cisco-IOS-XR-wdsysmon-fd-oper">
@@ -61,47 +67,50 @@ def cpu_memory_check(threshold):
           <total-cpu-one-minute/>
       </cpu-utilization>
     </system-monitoring>"""
-    nc = NetconfClient(debug=True)
-    nc.connect()
-    do_get(nc, filter=filter_string)
-    ret_dict = _xml_to_dict(nc.reply, 'system-monitoring')
+    reply = nc_manager.get(filter_string)
+    ret_dict = xr_data_collector.netconf_xml_to_dict(reply, 'system-monitoring')
     total_cpu = int(ret_dict['system-monitoring']['cpu-utilization']['total-cpu-one-minute'])
     if total_cpu >= threshold:
         syslog.error("CPU utilization is %s, threshold value is %s" %(str(total_cpu),str(threshold)))
-    nc.close()
-    
-def _xml_to_dict(xml_output, xml_tag=None):
+    if store is not None:
+        store.add('cpu', '0/RP0/CPU0', total_cpu)
+    return total_cpu
+
+def cpu_trend_check(store, threshold, alerting):
     """
-    convert netconf rpc request to dict
-    :param xml_output:
-    :return:
+    Alert when the average cpu utilization of the last hour (1 minute tier)
+    crosses the threshold, once per crossing
+    :param store: TimeSeriesStore keeping the history of the samples
+    :param threshold: cpu utilization threshold
+    :param alerting: True if the trend is already above the threshold
+    :return: True if the trend is above the threshold
     """
-    if xml_tag:
-        pattern = "<data>\s+(<%s.*</%s>).*</data>" % (xml_tag, xml_tag)
-    else:
-        pattern = "(<data>.*</data>)"   
-    xml_output = xml_output.replace('\n', ' ')
-    xml_data_match = re.search(pattern, xml_output)
-    ret_dict = xmltodict.parse(xml_data_match.group(1))
-    return ret_dict
-
-def do_get(nc, filter=None, path=None):
-    try:
-        if path is not None:
-            nc.rpc.get(file=path)
-        elif filter is not None:
-            nc.rpc.get(request=filter)
-        else:
-            return False
-    except Exception as e:
-        return False
-    return True
+    average = store.average('cpu', '0/RP0/CPU0', tier=1)
+    if average is None:
+        return alerting
+    if average >= threshold and not alerting:
+        syslog.error("CPU utilization averaged %.1f over the last hour (max %.1f, p95 %.1f), threshold value is %s"
+                     % (average, store.max('cpu', '0/RP0/CPU0', tier=1),
+                        store.percentile('cpu', '0/RP0/CPU0', 95, tier=1), str(threshold)))
+    elif average < threshold and alerting:
+        syslog.info("CPU utilization hourly average back to %.1f, threshold value is %s" % (average, str(threshold)))
+    return average >= threshold
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument("threshold", help="cpu utilization threshold",type=int)
+    parser.add_argument("-i", "--interval", help="seconds between checks",type=int,default=30)
     args = parser.parse_args()
     threshold = args.threshold
+    # the netconf session is opened once and reopened only when it breaks
+    nc_manager = xr_data_collector.NetconfSessionManager()
+    # bounded history: raw samples, 1 minute and 15 minute averages
+    store = xr_timeseries.TimeSeriesStore()
+    alerting = False
     while(1):
-        cpu_memory_check(threshold)
-        time.sleep(30)
+        try:
+            cpu_memory_check(nc_manager, threshold, store)
+            alerting = cpu_trend_check(store, threshold, alerting)
+        except Exception as e:
+            log.error("CPU utilization check failed: %s" % str(e))
+        time.sleep(args.interval)
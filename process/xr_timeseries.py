@@ -0,0 +1,274 @@
+# Copyright (c) 2022 by Cisco Systems, Inc.
+# All rights reserved.
+"""
+Bounded in-memory time series for process script monitors.
+
+Samples are stored per metric and entity (eg: 'cpu' of '0/RP0/CPU0') in
+fixed capacity ring buffers backed by preallocated arrays, and downsampled
+into coarser tiers (by default raw samples, 1 minute and 15 minute
+averages). Rolling average, min, max and percentile estimates of a series
+are answered in constant time, and the memory used does not grow with the
+run time of the script.
+
+Example:
+    store = TimeSeriesStore()
+    while True:
+        store.add('cpu', '0/RP0/CPU0', get_cpu())
+        if store.average('cpu', '0/RP0/CPU0', tier=1) > threshold:
+            syslog.error('CPU above threshold for the last hour')
+        time.sleep(10)
+"""
+import array
+import bisect
+import collections
+import time
+
+# (resolution in seconds, capacity) of each tier. A resolution of 0 keeps raw samples
+DEFAULT_TIERS = ((0, 360), (60, 60), (900, 96))
+
+
+def geometric_edges(low=0.01, high=1e12, ratio=1.2):
+    """
+    Bucket edges growing by ratio from low to high, used by the percentile
+    estimate. The estimate is within the ratio of the actual value.
+    :return: tuple of floats
+    """
+    edges = [0.0, low]
+    while edges[-1] < high:
+        edges.append(edges[-1] * ratio)
+    return tuple(edges)
+
+
+DEFAULT_BUCKET_EDGES = geometric_edges()
+
+
+class RingSeries(object):
+    """
+    Fixed capacity ring buffer of (timestamp, value) samples keeping the
+    running sum, the window min/max (monotonic queues) and a histogram of
+    the values in the window, so that the rolling statistics are O(1).
+    """
+    __slots__ = ('capacity', 'times', 'values', 'start', 'count', 'total', 'seq',
+                 '_min_queue', '_max_queue', 'edges', 'histogram')
+
+    def __init__(self, capacity, bucket_edges=DEFAULT_BUCKET_EDGES):
+        """
+        :param capacity: Number of samples kept
+        :param bucket_edges: Sorted bucket edges of the percentile histogram
+        """
+        self.capacity = capacity
+        self.times = array.array('d', bytes(8 * capacity))
+        self.values = array.array('d', bytes(8 * capacity))
+        self.start = 0
+        self.count = 0
+        self.total = 0.0
+        # number of samples ever appended
+        self.seq = 0
+        # (seq, value) of the candidates to be the window min / max
+        self._min_queue = collections.deque()
+        self._max_queue = collections.deque()
+        self.edges = bucket_edges
+        self.histogram = array.array('L', bytes(array.array('L').itemsize * (len(bucket_edges) + 1)))
+
+    def append(self, timestamp, value):
+        """
+        Add a sample, evicting the oldest one when the buffer is full
+        :return: None
+        """
+        value = float(value)
+        if self.count == self.capacity:
+            old_value = self.values[self.start]
+            self.total -= old_value
+            self.histogram[bisect.bisect_right(self.edges, old_value)] -= 1
+            evicted_seq = self.seq - self.capacity
+            if self._min_queue and self._min_queue[0][0] == evicted_seq:
+                self._min_queue.popleft()
+            if self._max_queue and self._max_queue[0][0] == evicted_seq:
+                self._max_queue.popleft()
+            pos = self.start
+            self.start = (self.start + 1) % self.capacity
+        else:
+            pos = (self.start + self.count) % self.capacity
+            self.count += 1
+
+        self.times[pos] = timestamp
+        self.values[pos] = value
+        self.total += value
+        if pos == self.capacity - 1:
+            # limit the drift of the running sum, once per lap of the buffer
+            self.total = sum(self.values[:self.count])
+        self.histogram[bisect.bisect_right(self.edges, value)] += 1
+
+        while self._min_queue and self._min_queue[-1][1] >= value:
+            self._min_queue.pop()
+        self._min_queue.append((self.seq, value))
+        while self._max_queue and self._max_queue[-1][1] <= value:
+            self._max_queue.pop()
+        self._max_queue.append((self.seq, value))
+        self.seq += 1
+
+    def average(self):
+        """
+        :return: Average of the samples in the window or None if empty
+        """
+        return self.total / self.count if self.count else None
+
+    def min(self):
+        """
+        :return: Minimum of the samples in the window or None if empty
+        """
+        return self._min_queue[0][1] if self.count else None
+
+    def max(self):
+        """
+        :return: Maximum of the samples in the window or None if empty
+        """
+        return self._max_queue[0][1] if self.count else None
+
+    def percentile(self, percent):
+        """
+        Estimate of a percentile of the samples in the window, interpolated
+        within the histogram bucket it falls in
+        :param percent: Percentile, between 0 and 100
+        :return: Estimated value or None if empty
+        """
+        if not self.count:
+            return None
+        rank = percent / 100.0 * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.histogram):
+            if bucket_count and seen + bucket_count >= rank:
+                low = self.edges[bucket - 1] if bucket > 0 else self.min()
+                high = self.edges[bucket] if bucket < len(self.edges) else self.max()
+                estimate = low + (high - low) * (rank - seen) / bucket_count
+                return min(max(estimate, self.min()), self.max())
+            seen += bucket_count
+        return self.max()
+
+    def last(self):
+        """
+        :return: (timestamp, value) of the newest sample or None if empty
+        """
+        if not self.count:
+            return None
+        pos = (self.start + self.count - 1) % self.capacity
+        return self.times[pos], self.values[pos]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """
+        Samples from the oldest to the newest
+        """
+        for offset in range(self.count):
+            pos = (self.start + offset) % self.capacity
+            yield self.times[pos], self.values[pos]
+
+
+class TieredSeries(object):
+    """
+    One RingSeries per tier. Samples go to the raw tier and are averaged
+    over the resolution of each coarser tier before entering it.
+    """
+    __slots__ = ('tiers', 'resolutions', '_buckets')
+
+    def __init__(self, tiers=DEFAULT_TIERS, bucket_edges=DEFAULT_BUCKET_EDGES):
+        self.resolutions = [resolution for resolution, capacity in tiers]
+        self.tiers = [RingSeries(capacity, bucket_edges) for resolution, capacity in tiers]
+        # [bucket start time, sum, count] of the bucket being filled for each tier
+        self._buckets = [None] * len(tiers)
+
+    def append(self, timestamp, value):
+        for tier_num, resolution in enumerate(self.resolutions):
+            if not resolution:
+                self.tiers[tier_num].append(timestamp, value)
+                continue
+            bucket_start = timestamp - timestamp % resolution
+            bucket = self._buckets[tier_num]
+            if bucket is not None and bucket[0] != bucket_start:
+                self.tiers[tier_num].append(bucket[0], bucket[1] / bucket[2])
+                bucket = None
+            if bucket is None:
+                bucket = self._buckets[tier_num] = [bucket_start, 0.0, 0]
+            bucket[1] += value
+            bucket[2] += 1
+
+
+class TimeSeriesStore(object):
+    """
+    Tiered ring buffer series keyed by metric and entity. The number of
+    series can be bounded with max_series, which with the fixed tier
+    capacities gives a known memory ceiling.
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS, bucket_edges=DEFAULT_BUCKET_EDGES, max_series=None):
+        """
+        :param tiers: tuple of (resolution in seconds, capacity) of each tier
+        :param bucket_edges: Bucket edges of the percentile histograms
+        :param max_series: Maximum number of (metric, entity) series stored
+        """
+        self.tiers = tuple(tiers)
+        self.bucket_edges = bucket_edges
+        self.max_series = max_series
+        self._series = dict()
+
+    def add(self, metric, entity, value, timestamp=None):
+        """
+        Add a sample to a series, created on its first sample
+        :param metric: Name of the metric. eg: 'cpu'
+        :param entity: Name of the entity measured. eg: '0/RP0/CPU0'
+        :param value: Value of the sample
+        :param timestamp: Time of the sample. Defaults to now
+        :return: None
+        """
+        series = self._series.get((metric, entity))
+        if series is None:
+            if self.max_series is not None and len(self._series) >= self.max_series:
+                raise Exception('Time series store full ({max_series} series)'.format(
+                    max_series=self.max_series))
+            series = self._series[(metric, entity)] = TieredSeries(self.tiers, self.bucket_edges)
+        series.append(time.time() if timestamp is None else timestamp, value)
+
+    def series(self, metric, entity, tier=0):
+        """
+        :return: RingSeries of a tier of a series or None if not stored
+        """
+        series = self._series.get((metric, entity))
+        return series.tiers[tier] if series is not None else None
+
+    def average(self, metric, entity, tier=0):
+        series = self.series(metric, entity, tier)
+        return series.average() if series is not None else None
+
+    def min(self, metric, entity, tier=0):
+        series = self.series(metric, entity, tier)
+        return series.min() if series is not None else None
+
+    def max(self, metric, entity, tier=0):
+        series = self.series(metric, entity, tier)
+        return series.max() if series is not None else None
+
+    def percentile(self, metric, entity, percent, tier=0):
+        series = self.series(metric, entity, tier)
+        return series.percentile(percent) if series is not None else None
+
+    def last(self, metric, entity, tier=0):
+        series = self.series(metric, entity, tier)
+        return series.last() if series is not None else None
+
+    def keys(self):
+        """
+        :return: list of the (metric, entity) of the series stored
+        """
+        return list(self._series)
+
+    def remove(self, metric, entity):
+        """
+        Drop a series
+        :return: None
+        """
+        self._series.pop((metric, entity), None)
+
+    def __len__(self):
+        return len(self._series)